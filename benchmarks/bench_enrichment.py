@@ -0,0 +1,100 @@
+"""Benchmark del enriquecimiento: cuatro merges encadenados frente a LookupTable.
+
+Mide tiempo y pico de memoria (tracemalloc) de ambos motores sobre un
+DataFrame base sintético de 1M de filas usando las fuentes de referencia
+de ``src/static/data_sources``.
+
+Uso: python benchmarks/bench_enrichment.py [--rows 1000000]
+"""
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import enrichement  # noqa: E402
+from normalization import company_key, location_key, text_key, title_key  # noqa: E402
+
+
+def make_base_frame(rows, seed=0):
+    """DataFrame limpio sintético con empresas, títulos y ciudades repetidos"""
+    rng = np.random.default_rng(seed)
+    companies = np.array(["TechCorp GmbH", "DataSystems", "CloudNet Inc."]
+                         + [f"Company {i}" for i in range(997)], dtype=object)
+    titles = np.array(["Data Scientist (m/w/d)", "Software Engineer", "Cloud Architect"]
+                      + [f"Role {i}" for i in range(497)], dtype=object)
+    cities = np.array(["Berlin, Germany", "London", "New York", "Munich", "Hamburg"], dtype=object)
+    ids = np.arange(1, rows + 1)
+    return pd.DataFrame({
+        "id": ids,
+        "title": titles[rng.integers(0, len(titles), rows)],
+        "company_name": companies[rng.integers(0, len(companies), rows)],
+        "location": cities[rng.integers(0, len(cities), rows)],
+        "remote": rng.integers(0, 2, rows).astype(bool),
+        "url": pd.Series(ids).map("https://www.arbeitnow.com/jobs/job-{}".format),
+    })
+
+
+def merge_chain(base_df):
+    """Motor anterior: cuatro pd.merge encadenados y borrado de columnas auxiliares"""
+    df = base_df.assign(_company_key=company_key(base_df["company_name"]),
+                        _title_key=title_key(base_df["title"]),
+                        _location_key=location_key(base_df["location"]))
+    companies = enrichement.load_json_data()
+    df = df.merge(companies.assign(_company_key=company_key(companies["name"])),
+                  on="_company_key", how="left")
+    salary = enrichement.load_csv_data()
+    df = df.merge(salary.assign(_title_key=title_key(salary["job_title"])),
+                  on="_title_key", how="left")
+    locations = enrichement.load_excel_data()
+    df = df.merge(locations.assign(_location_key=location_key(locations["city"])),
+                  on="_location_key", how="left")
+    industry = enrichement.load_xml_data()
+    df = df.assign(_industry_key=text_key(df["industry"])).merge(
+        industry.assign(_industry_key=text_key(industry["industry_id"])),
+        on="_industry_key", how="left")
+    return df.drop(columns=["name", "job_title", "city", "industry_id", "_company_key",
+                            "_title_key", "_location_key", "_industry_key"])
+
+
+def lookup_engine(base_df):
+    return enrichement.enrich_data(base_df)[0]
+
+
+def measure(func, base_df):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(base_df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    base_df = make_base_frame(args.rows)
+    base_mb = base_df.memory_usage(deep=False).sum() / 1e6
+    print(f"filas base: {args.rows}  memoria base (sin objetos): {base_mb:.1f} MB")
+    results = {}
+    for name, func in (("merge", merge_chain), ("lookup", lookup_engine)):
+        result, elapsed, peak = measure(func, base_df)
+        results[name] = result
+        print(f"{name:>7}: {elapsed:7.2f} s  pico {peak / 1e6:8.1f} MB")
+    pd.testing.assert_frame_equal(results["merge"], results["lookup"])
+    print("resultados idénticos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Benchmark del emparejador aproximado (FuzzyMatcher).
+
+Empareja N ofertas sintéticas (con títulos muy repetidos, como en el job
+board) contra una tabla de referencia de M títulos y mide construcción del
+índice, tiempo de emparejado y tasa de coincidencia.
+
+Uso: python benchmarks/bench_matching.py [--postings 1000000] [--references 10000 100000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from matching import FuzzyMatcher  # noqa: E402
+from normalization import title_key  # noqa: E402
+
+WORDS = np.array(["data", "software", "cloud", "backend", "frontend", "platform", "security",
+                  "machine", "learning", "product", "sales", "marketing", "network", "mobile",
+                  "quality", "devops", "analytics", "finance", "support", "research"])
+ROLES = np.array(["engineer", "scientist", "architect", "developer", "analyst", "manager",
+                  "consultant", "specialist", "designer", "administrator"])
+PREFIXES = np.array(["", "senior ", "junior ", "lead ", "principal ", "werkstudent "])
+SUFFIXES = np.array(["", " (m/w/d)", " (f/m/x)", " - remote", " berlin"])
+
+
+def make_references(count, seed=0):
+    rng = np.random.default_rng(seed)
+    first = WORDS[rng.integers(0, len(WORDS), count)]
+    second = WORDS[rng.integers(0, len(WORDS), count)]
+    role = ROLES[rng.integers(0, len(ROLES), count)]
+    ids = np.arange(count).astype(str)
+    return pd.Series(first + " " + second + " " + role + " " + ids).drop_duplicates()
+
+
+def make_postings(references, count, distinct, seed=1):
+    rng = np.random.default_rng(seed)
+    base = references.to_numpy()[rng.integers(0, len(references), distinct)]
+    titles = (PREFIXES[rng.integers(0, len(PREFIXES), distinct)] + base
+              + SUFFIXES[rng.integers(0, len(SUFFIXES), distinct)])
+    return pd.Series(titles[rng.integers(0, distinct, count)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--postings", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=100_000,
+                        help="Títulos distintos entre las ofertas")
+    parser.add_argument("--references", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    for references in args.references:
+        reference_keys = title_key(make_references(references))
+        postings = title_key(make_postings(reference_keys, args.postings, args.distinct))
+
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(reference_keys.to_numpy())
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        positions, scores = matcher.match(postings)
+        match_s = time.perf_counter() - start
+        print(f"referencias {references:>7}  ofertas {args.postings:>8}  "
+              f"índice {build_s:6.2f} s  emparejado {match_s:7.2f} s  "
+              f"coincidencias {(positions >= 0).mean():6.1%}  "
+              f"puntuación media {np.nanmean(scores):.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Benchmark de escalado de la limpieza + enriquecimiento particionados.
+
+Crea una tabla ``jobs`` sintética (con duplicados, nulos y títulos que
+requieren emparejado aproximado) en una base de datos temporal y mide
+``partitioned.clean_and_enrich`` con 1, 2, 4 y 8 procesos frente al modo de
+un solo proceso (``clean_data`` + ``enrich_data``). Comprueba además que
+todas las ejecuciones producen exactamente el mismo DataFrame.
+
+Uso: python benchmarks/bench_partitioned.py [--rows 1000000] [--workers 1 2 4 8]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cleaning  # noqa: E402
+import enrichement  # noqa: E402
+import partitioned  # noqa: E402
+from dtypes import optimize_dtypes  # noqa: E402
+from bench_enrichment import make_base_frame  # noqa: E402
+
+
+def make_jobs_table(db_path, rows, seed=0):
+    """Tabla jobs con ~10% de URLs repetidas, ~5% de nulos y variantes de títulos"""
+    rng = np.random.default_rng(seed)
+    df = make_base_frame(rows, seed).drop(columns="id")
+    df["remote"] = df["remote"].astype(float)
+    for col in ("title", "location", "remote"):
+        df.loc[rng.random(rows) < 0.05, col] = None
+    df.loc[rng.random(rows) < 0.1, "url"] = df["url"].iloc[0]
+    variants = rng.random(rows) < 0.1
+    df.loc[variants, "title"] = df.loc[variants, "title"] + " Senior"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT, company_name TEXT, location TEXT, remote BOOLEAN, url TEXT
+            )
+        """)
+        df.to_sql("jobs", conn, if_exists="append", index=False)
+
+
+def single_process():
+    df, _ = optimize_dtypes(cleaning.load_data())
+    clean_df, _ = cleaning.clean_data(df)
+    enriched_df, _ = enrichement.enrich_data(clean_df)
+    return enriched_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cleaning.DB_PATH = Path(tmp_dir) / "jobs.db"
+        make_jobs_table(cleaning.DB_PATH, args.rows)
+        print(f"filas {args.rows}  núcleos disponibles {os.cpu_count()}")
+
+        start = time.perf_counter()
+        expected = single_process()
+        baseline_s = time.perf_counter() - start
+        print(f"un proceso (clean_data + enrich_data)  {baseline_s:7.2f} s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = partitioned.clean_and_enrich(workers=workers)[3]
+            elapsed = time.perf_counter() - start
+            pd.testing.assert_frame_equal(result, expected)
+            print(f"particionado, {workers} procesos        {elapsed:7.2f} s  "
+                  f"aceleración {baseline_s / elapsed:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Benchmark de la capa de consulta (``serving``).
+
+Con una salida enriquecida sintética de ``--rows`` ofertas mide:
+
+- la carga inicial de la base de consulta, un ``refresh`` sin cambios y uno
+  con ``--changed`` de las ofertas modificadas (y la mitad de esa
+  proporción borradas), que solo escribe esas filas y ajusta los agregados
+  con los triggers;
+- las consultas más comunes (ofertas por empresa, proporción de remotas por
+  ubicación, rango salarial por título y filtro por empresa) sobre la base
+  de consulta, frente a leer la salida completa en pandas y agregarla.
+
+Tras cada ``refresh`` comprueba que los agregados coinciden con los de pandas.
+
+Uso: python benchmarks/bench_serving.py [--rows 200000] [--changed 0.01]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import serving  # noqa: E402
+from stage_io import read_stage, write_stage  # noqa: E402
+
+QUERY_REPEATS = 100
+
+
+def make_enriched(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    min_salary = rng.integers(20_000, 80_000, rows).astype(float)
+    min_salary[rng.random(rows) < 0.3] = np.nan
+    return pd.DataFrame({
+        "id": np.arange(1, rows + 1),
+        "title": pd.Series([f"Role {i}" for i in rng.integers(0, 5_000, rows)], dtype=object),
+        "company_name": pd.Series([f"Company {i}" for i in rng.integers(0, 2_000, rows)],
+                                  dtype=object),
+        "location": pd.Series([f"City {i}" for i in rng.integers(0, 300, rows)], dtype=object),
+        "remote": rng.random(rows) < 0.2,
+        "url": [f"https://www.arbeitnow.com/jobs/job-{i}" for i in range(rows)],
+        "min_salary": min_salary,
+        "max_salary": min_salary + 20_000,
+        "industry_name": rng.choice(np.array([None, "IT", "Retail", "Finance"], dtype=object),
+                                    rows),
+    })
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def check_aggregates(store, df):
+    counts = df["company_name"].value_counts()
+    served = {row["value"]: row["records"]
+              for row in store.counts("company_name", limit=len(counts))}
+    assert served == counts.to_dict(), "job_counts no coincide con pandas"
+    salaries = df.groupby("title").agg(postings=("id", "size"), min_salary=("min_salary", "min"),
+                                       max_salary=("max_salary", "max"))
+    served = pd.DataFrame(store.salaries(limit=len(salaries))).set_index("title").sort_index()
+    pd.testing.assert_frame_equal(served, salaries, check_dtype=False, check_names=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--changed", type=float, default=0.01)
+    args = parser.parse_args(argv)
+    df = make_enriched(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "enriched_data.parquet"
+        write_stage(df, path)
+        with serving.ServingStore(Path(tmp_dir) / "enriched.db") as store:
+            for label in ("carga inicial", "sin cambios", f"{args.changed:.0%} modificadas"):
+                if label.endswith("modificadas"):
+                    rng = np.random.default_rng(1)
+                    changed = rng.random(len(df)) < args.changed
+                    df.loc[changed, "location"] = "City 0"
+                    df.loc[changed, "min_salary"] = 1_000.0
+                    df = df[rng.random(len(df)) >= args.changed / 2]
+                    write_stage(df, path)
+                elapsed, _ = timed(lambda: store.refresh({path.name: path}))
+                check_aggregates(store, df)
+                print(f"refresh ({label}): {elapsed:6.2f} s")
+
+            company, title = df["company_name"].iloc[0], df["title"].iloc[0]
+            queries = {
+                "ofertas por empresa": (
+                    lambda full: full["company_name"].value_counts().head(serving.DEFAULT_LIMIT),
+                    lambda: store.counts("company_name")),
+                "remotas por ubicación": (
+                    lambda full: full.groupby("location")["remote"].agg(["size", "mean"]),
+                    lambda: store.remote_share("location")),
+                "salario por título": (
+                    lambda full: full.loc[full["title"] == title, ["min_salary", "max_salary"]]
+                    .agg({"min_salary": "min", "max_salary": "max"}),
+                    lambda: store.salaries(title=title)),
+                "ofertas de una empresa": (
+                    lambda full: full[full["company_name"] == company].head(serving.DEFAULT_LIMIT),
+                    lambda: store.jobs(company=company)),
+            }
+            for label, (with_pandas, with_store) in queries.items():
+                pandas_s, _ = timed(lambda: with_pandas(read_stage(path)))
+                served_s, _ = timed(lambda: [with_store() for _ in range(QUERY_REPEATS)])
+                print(f"{label:>24}: pandas {pandas_s * 1000:8.1f} ms  "
+                      f"base de consulta {served_s / QUERY_REPEATS * 1000:6.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Benchmark del intercambio entre etapas: XLSX y CSV comprimido frente a Parquet/Feather.
+
+Mide tiempo de escritura + lectura y tamaño en disco para 1k, 100k y 1M
+filas con la forma de la tabla jobs limpia.
+
+Uso: python benchmarks/bench_stage_io.py [--rows 1000 100000 1000000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from stage_io import (CLEANED_JOBS_SCHEMA, CSV_GZIP, CSV_ZSTD, FEATHER, PARQUET, XLSX,  # noqa: E402
+                      read_stage, stage_path, write_stage)
+
+
+def make_jobs_frame(rows, seed=0):
+    """Genera un DataFrame sintético con el esquema de jobs limpio"""
+    rng = np.random.default_rng(seed)
+    companies = np.array([f"Company {i}" for i in range(max(rows // 50, 1))])
+    cities = np.array(["Berlin", "Munich", "Hamburg", "London", "New York", "Remote"])
+    ids = np.arange(1, rows + 1)
+    return pd.DataFrame({
+        "id": ids,
+        "title": [f"Data Engineer {i % 997}" for i in ids],
+        "company_name": companies[rng.integers(0, len(companies), rows)],
+        "location": cities[rng.integers(0, len(cities), rows)],
+        "remote": rng.integers(0, 2, rows).astype(bool),
+        "url": [f"https://www.arbeitnow.com/jobs/job-{i}" for i in ids],
+    })
+
+
+def bench(df, fmt, workdir):
+    path = stage_path(Path(workdir) / f"bench_{len(df)}", fmt)
+    start = time.perf_counter()
+    write_stage(df, path, fmt=fmt, schema=CLEANED_JOBS_SCHEMA)
+    write_s = time.perf_counter() - start
+    start = time.perf_counter()
+    back = read_stage(path, fmt=fmt)
+    read_s = time.perf_counter() - start
+    assert len(back) == len(df)
+    return write_s, read_s, path.stat().st_size, back["remote"].dtype
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=[XLSX, CSV_GZIP, CSV_ZSTD, PARQUET, FEATHER])
+    args = parser.parse_args(argv)
+
+    print(f"{'filas':>10} {'formato':>8} {'escritura_s':>12} {'lectura_s':>10} {'tamaño_MB':>10} remote")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            df = make_jobs_frame(rows)
+            for fmt in args.formats:
+                write_s, read_s, size, remote_dtype = bench(df, fmt, workdir)
+                print(f"{rows:>10} {fmt:>8} {write_s:>12.3f} {read_s:>10.3f} "
+                      f"{size / 1e6:>10.2f} {remote_dtype}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
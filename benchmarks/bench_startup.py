@@ -0,0 +1,131 @@
+"""Arranque en frío de las etapas sobre datos sintéticos, sin red.
+
+Mide en procesos nuevos (como un planificador que lanza el pipeline cada
+pocos minutos):
+
+- ``import``: importar todas las etapas, comprobando que no cargan pandas,
+  numpy, pyarrow, requests ni openpyxl y que no crean archivos;
+- ``noop_incremental``: ``python src/incremental.py`` sin ofertas nuevas
+  (manifiesto, firmas de las fuentes y ``MAX(id)``), tras una primera
+  ejecución que procesa la tabla completa;
+- ``noop_pipeline``: lo mismo a través del punto de entrada del planificador,
+  ``python src/pipeline.py run --skip-ingest --incremental`` (DAG de tareas
+  incluido).
+
+Los datos y artefactos van a una carpeta temporal a través de
+``BIGDATA_STATIC_DIR``. Con ``--check`` termina con código 1 si alguna
+importación pesada ocurre al importar o si alguna ejecución sin cambios
+supera ``--target`` segundos (la mejor de ``--repeat`` procesos).
+
+Uso: python benchmarks/bench_startup.py [--rows 10000] [--repeat 5] [--check] [--target 0.5]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from config import Config  # noqa: E402
+from synthetic import generate_jobs, generate_references, write_jobs_table, write_references  # noqa: E402
+
+DEFAULT_ROWS = 10_000
+DEFAULT_TARGET = 0.5
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "requests", "openpyxl")
+STAGE_MODULES = ("ingesta", "cleaning", "enrichement", "incremental", "partitioned", "pipeline",
+                 "serving")
+
+IMPORT_PROBE = f"""
+import json, sys
+sys.path.insert(0, {str(SRC_DIR)!r})
+import {", ".join(STAGE_MODULES)}
+print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))
+"""
+
+
+def prepare(static_dir, rows, seed=0):
+    """Base de datos, fuentes de referencia y reglas de limpieza en ``static_dir``"""
+    config = Config(static_dir)
+    references = generate_references(seed=seed)
+    write_references(references, config.data_sources_dir)
+    config.db_path.parent.mkdir(parents=True, exist_ok=True)
+    write_jobs_table(config.db_path, generate_jobs(rows, references, seed=seed))
+    shutil.copytree(SRC_DIR / "static" / "config", config.config_dir)
+    return config
+
+
+def timed_run(args, env, cwd):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], env=env, cwd=cwd,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} falló:\n{result.stderr}")
+    return elapsed, result.stdout
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Procesos por medición; se toma el más rápido")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true",
+                        help="Falla si se importan dependencias pesadas o se supera --target")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET,
+                        help="Segundos máximos de cada ejecución incremental sin cambios")
+    args = parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        config = prepare(tmp_dir / "static", args.rows, args.seed)
+        env = {**os.environ, "BIGDATA_STATIC_DIR": str(config.static_dir),
+               "BIGDATA_LOG_DIR": str(tmp_dir / "logs")}
+        work_dir = tmp_dir / "work"
+        work_dir.mkdir()
+
+        import_s, stdout = min(timed_run(["-c", IMPORT_PROBE], env, work_dir)
+                               for _ in range(args.repeat))
+        heavy = json.loads(stdout)
+        created = sorted(path.name for path in work_dir.iterdir())
+        print(f"  {'import':20} {import_s:8.3f} s")
+        if heavy:
+            failures.append(f"importar las etapas carga {', '.join(heavy)}")
+        if created:
+            failures.append(f"importar las etapas crea {', '.join(created)}")
+
+        incremental = [str(SRC_DIR / "incremental.py")]
+        first_s, _ = timed_run(incremental, env, work_dir)
+        print(f"  {'first_incremental':20} {first_s:8.3f} s  ({args.rows} ofertas)")
+        # Ambos puntos de entrada comparten manifiesto: tras la primera ejecución
+        # ninguno tiene ofertas nuevas
+        pipeline = [str(SRC_DIR / "pipeline.py"), "run", "--skip-ingest", "--incremental"]
+        noop_runs = {"noop_incremental": incremental, "noop_pipeline": pipeline}
+        for name, command in noop_runs.items():
+            noop_s = min(timed_run(command, env, work_dir)[0] for _ in range(args.repeat))
+            print(f"  {name:20} {noop_s:8.3f} s  (objetivo {args.target:.3f} s)")
+            if noop_s > args.target:
+                failures.append(f"{name}: la ejecución sin cambios tarda {noop_s:.3f} s "
+                                f"(objetivo {args.target:.3f} s)")
+
+    if args.check:
+        for failure in failures:
+            print(f"REGRESIÓN: {failure}")
+        if failures:
+            return 1
+        print("\nArranque dentro del objetivo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Benchmark del almacenamiento SQLite de la ingesta.
+
+Compara la configuración anterior (conexión con los ajustes por defecto y
+solo el índice único de la URL) con la de ``storage`` (WAL,
+synchronous=NORMAL, mmap, caché e índices de empresa y ubicación):
+
+- throughput del upsert masivo por lotes de ``WRITE_BATCH_SIZE`` (una
+  transacción por lote, como el hilo escritor de la ingesta), creando los
+  índices de consulta al final de la carga (como ``ingest_from_api``) o
+  con ellos ya creados (ejecuciones incrementales);
+- consultas de reporte: conteo por empresa y filtro por ubicación, cargando
+  la tabla en pandas frente a resolverlas en SQLite.
+
+Uso: python benchmarks/bench_storage.py [--rows 200000]
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import ingesta  # noqa: E402
+import storage  # noqa: E402
+
+
+def make_jobs(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    companies = [f"Company {i}" for i in rng.integers(0, 2_000, rows)]
+    cities = [f"City {i}" for i in rng.integers(0, 300, rows)]
+    return [
+        {"title": f"Role {i % 5_000}", "company_name": company, "location": city,
+         "remote": bool(i % 2), "url": f"https://www.arbeitnow.com/jobs/job-{i}",
+         "created_at": 1_700_000_000 + i}
+        for i, (company, city) in enumerate(zip(companies, cities))
+    ]
+
+
+def bulk_insert(conn, jobs, batch_size=ingesta.WRITE_BATCH_SIZE):
+    start = time.perf_counter()
+    for offset in range(0, len(jobs), batch_size):
+        ingesta._upsert_jobs(conn, jobs[offset:offset + batch_size])
+    return time.perf_counter() - start
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args(argv)
+    jobs = make_jobs(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for label in ("antes", "después", "después (índices ya creados)"):
+            ingesta.DB_PATH = Path(tmp_dir) / f"{len(results)}.db"
+            ingesta.create_database()
+            storage.close_connections()
+            if label == "antes":
+                # Ajustes por defecto de sqlite3 y solo el índice de la clave natural
+                conn = sqlite3.connect(str(ingesta.DB_PATH))
+                conn.execute("PRAGMA journal_mode = DELETE")
+            else:
+                conn = storage.connect(ingesta.DB_PATH)
+                if label != "después":
+                    storage.ensure_indexes(conn)
+            elapsed = bulk_insert(conn, jobs)
+            if label == "después":
+                # Como ingest_from_api: los índices de consulta se crean al final
+                index_s, _ = timed(lambda: storage.ensure_indexes(conn))
+                elapsed += index_s
+            print(f"{label:>29}: upsert de {args.rows} filas en {elapsed:6.2f} s "
+                  f"({args.rows / elapsed:,.0f} filas/s)")
+            results[label] = conn
+
+        # Consultas de reporte: tabla completa en pandas frente a SQLite
+        old = results["antes"]
+        ingesta.DB_PATH = Path(tmp_dir) / "1.db"
+        full_s, expected = timed(lambda: pd.read_sql_query("SELECT * FROM jobs", old)
+                                 ["company_name"].value_counts())
+        pushdown_s, counts = timed(lambda: storage.count_by("company_name", path=ingesta.DB_PATH))
+        assert expected.sort_index().equals(counts.sort_index().rename("count")
+                                            .rename_axis("company_name"))
+        print(f"conteo por empresa: pandas {full_s:6.3f} s  SQLite {pushdown_s:6.3f} s")
+
+        full_s, expected = timed(lambda: pd.read_sql_query("SELECT * FROM jobs", old)
+                                 .query("location == 'City 7'"))
+        pushdown_s, filtered = timed(lambda: storage.read_jobs(
+            where="location = ?", params=("City 7",), path=ingesta.DB_PATH))
+        assert len(expected) == len(filtered)
+        print(f"filtro por ubicación: pandas {full_s:6.3f} s  SQLite {pushdown_s:6.3f} s")
+
+        for conn in results.values():
+            conn.close()
+        storage.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Suite de benchmarks reproducible sobre datos sintéticos, sin red.
+
+Para cada tamaño (10k, 100k y 1M ofertas por defecto) genera datos con
+``synthetic.py`` y mide, con las métricas por etapa de ``metrics``:
+
+- ``ingest``: ingesta en streaming (``ingest_from_api`` servido por
+  ``PagedSession``) sobre una base de datos vacía;
+- ``clean_data`` sobre una tabla jobs con duplicados y nulos;
+- ``merge[<fuente>]``: cada merge de ``enrich_data``;
+- ``cleaning_artifacts`` y ``enrichment_artifacts``: ``generate_artifacts``
+  de cada etapa (Parquet, muestra XLSX y reporte).
+
+Los tiempos se guardan también normalizados por una carga de calibración
+medida en la misma ejecución, para que la comparación con la línea base
+dependa poco de la máquina. Con ``--check`` la suite termina con código 1
+si alguna etapa es más lenta que su línea base en más de ``--tolerance``
+(tiempo normalizado); ``--save-baseline`` actualiza ``baselines.json``.
+
+Uso: python benchmarks/bench_suite.py [--rows 10000 100000 1000000] [--repeat 3]
+     [--check | --save-baseline] [--tolerance 0.5]
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cleaning  # noqa: E402
+import enrichement  # noqa: E402
+import ingesta  # noqa: E402
+import metrics  # noqa: E402
+import storage  # noqa: E402
+from dtypes import optimize_dtypes  # noqa: E402
+from synthetic import (PagedSession, generate_jobs, generate_references,  # noqa: E402
+                       write_jobs_table, write_references)
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+DEFAULT_TOLERANCE = 0.5
+# Por debajo de este tiempo el ruido domina: no se consideran regresiones
+MIN_SECONDS = 0.05
+
+# Etapa de la suite -> etapa registrada por ``metrics``
+STAGES = {
+    "ingest": "ingesta.ingest_from_api",
+    "clean_data": "cleaning.clean_data",
+    **{f"merge[{source}]": f"enrichement.merge[{source}]"
+       for source in enrichement.ENRICHMENT_SOURCES},
+    "cleaning_artifacts": "cleaning.generate_artifacts",
+    "enrichment_artifacts": "enrichement.generate_artifacts",
+}
+
+
+def calibrate(repeat=3):
+    """Tiempo de una carga fija de numpy, pandas y Python puro (el mínimo de ``repeat``)"""
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 1_000, 2_000_000)
+    words = [f"word {i % 5_000}" for i in range(200_000)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pd.Series(values).groupby(values % 97).sum()
+        np.sort(values)
+        sorted(words)
+        {word: len(word) for word in words}
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _redirect_outputs(tmp_dir):
+    """Artefactos y bases de datos de las etapas dentro de ``tmp_dir``"""
+    tmp_dir = Path(tmp_dir)
+    cleaning.CLEANED_DATA_PATH = tmp_dir / "cleaned_data.parquet"
+    cleaning.CLEANED_SAMPLE_PATH = tmp_dir / "cleaned_data.xlsx"
+    cleaning.AUDIT_PATH = tmp_dir / "cleaning_report.txt"
+    enrichement.CLEANED_DATA_PATH = cleaning.CLEANED_DATA_PATH
+    enrichement.ENRICHED_DATA_PATH = tmp_dir / "enriched_data.parquet"
+    enrichement.ENRICHED_SAMPLE_PATH = tmp_dir / "enriched_data.xlsx"
+    enrichement.AUDIT_PATH = tmp_dir / "enriched_report.txt"
+    enrichement.DATA_SOURCES_DIR = tmp_dir / "data_sources"
+    enrichement.USE_REFERENCE_CACHE = False
+    ingesta.AUDIT_PATH = tmp_dir / "ingestion.txt"
+    ingesta.SAMPLE_PATH = tmp_dir / "ingestion.xlsx"
+
+
+def run_once(tmp_dir, references, api_jobs):
+    """Una pasada de todas las etapas; devuelve segundos por etapa de la suite"""
+    tmp_dir = Path(tmp_dir)
+    storage.close_connections()
+    ingesta.DB_PATH = tmp_dir / f"ingest-{time.perf_counter_ns()}.db"
+    cleaning.DB_PATH = tmp_dir / "jobs.db"
+
+    with metrics.record_run("bench", metrics_dir=tmp_dir / "metrics") as metrics_run:
+        ingesta.create_database()
+        ingesta.ingest_from_api(session=PagedSession(api_jobs), incremental=False)
+
+        df, _ = optimize_dtypes(cleaning.load_data())
+        analysis = cleaning.analyze_data(df)
+        clean_df, cleaning_report = cleaning.clean_data(df)
+        cleaning.generate_artifacts(clean_df, analysis, cleaning_report)
+
+        enriched_df, enrichment_report = enrichement.enrich_data(clean_df,
+                                                                 source_frames=references)
+        enrichement.generate_artifacts(enriched_df, enrichment_report)
+
+    seconds = {}
+    for record in metrics_run.stages:
+        for name, recorded in STAGES.items():
+            if record["stage"] == recorded:
+                seconds[name] = seconds.get(name, 0.0) + record["wall_s"]
+    return seconds
+
+
+def run_suite(rows_list, repeat=3, seed=0):
+    """Mejor tiempo (de ``repeat`` pasadas) por tamaño y etapa"""
+    results = {}
+    for rows in rows_list:
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp_dir:
+            _redirect_outputs(tmp_dir)
+            references = generate_references(seed=seed)
+            write_references(references, Path(tmp_dir) / "data_sources")
+            api_jobs = generate_jobs(rows, references, seed=seed)
+            table_jobs = generate_jobs(rows, references, seed=seed, null_value=None)
+            write_jobs_table(Path(tmp_dir) / "jobs.db", table_jobs)
+
+            best = {}
+            for _ in range(repeat):
+                for name, elapsed in run_once(tmp_dir, references, api_jobs).items():
+                    best[name] = min(best.get(name, float("inf")), elapsed)
+            storage.close_connections()
+        results[str(rows)] = best
+    return results
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"results": {}}
+
+
+def save_baselines(results, calibration_s, path=BASELINES_PATH):
+    baselines = load_baselines(path)
+    for rows, stages in results.items():
+        baselines["results"][rows] = {
+            name: {"seconds": round(seconds, 4), "normalized": round(seconds / calibration_s, 4)}
+            for name, seconds in stages.items()
+        }
+    baselines["calibration_s"] = round(calibration_s, 4)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2)
+    return path
+
+
+def find_regressions(results, calibration_s, baselines, tolerance=DEFAULT_TOLERANCE):
+    """Etapas cuyo tiempo normalizado supera la línea base en más de ``tolerance``"""
+    regressions = []
+    for rows, stages in results.items():
+        base_stages = baselines["results"].get(rows, {})
+        for name, seconds in stages.items():
+            base = base_stages.get(name)
+            if base is None or seconds < MIN_SECONDS:
+                continue
+            ratio = (seconds / calibration_s) / base["normalized"]
+            if ratio > 1 + tolerance:
+                regressions.append((rows, name, seconds, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Pasadas por tamaño; se toma la mejor (la primera paga importaciones)")
+    parser.add_argument("--seed", type=int, default=0)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true",
+                      help="Falla si alguna etapa es más lenta que su línea base")
+    mode.add_argument("--save-baseline", action="store_true",
+                      help="Guarda los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    calibration_s = calibrate()
+    print(f"calibración {calibration_s:.3f} s")
+    results = run_suite(args.rows, args.repeat, args.seed)
+    baselines = load_baselines(args.baselines)
+    for rows, stages in results.items():
+        base_stages = baselines["results"].get(rows, {})
+        print(f"\n{rows} ofertas")
+        for name, seconds in stages.items():
+            line = f"  {name:34} {seconds:8.3f} s"
+            if name in base_stages:
+                ratio = (seconds / calibration_s) / base_stages[name]["normalized"]
+                line += f"  ({ratio:4.2f}x línea base)"
+            print(line)
+
+    if args.save_baseline:
+        print(f"\nLínea base guardada en {save_baselines(results, calibration_s, args.baselines)}")
+    if args.check:
+        regressions = find_regressions(results, calibration_s, baselines, args.tolerance)
+        for rows, name, seconds, ratio in regressions:
+            print(f"REGRESIÓN {rows} ofertas, {name}: {seconds:.3f} s ({ratio:.2f}x línea base)")
+        if regressions:
+            return 1
+        print("\nSin regresiones de rendimiento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
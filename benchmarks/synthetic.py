@@ -0,0 +1,240 @@
+"""Generador de datos sintéticos con la forma de Arbeitnow.
+
+Produce ofertas como las del API (``slug``, ``company_name``, ``title``,
+``description``, ``remote``, ``url``, ``tags``, ``job_types``,
+``location``, ``created_at``) y las cuatro fuentes de referencia de
+``DATA_SOURCES_DIR`` con claves compatibles, controlando:
+
+- ``rows``: número de ofertas;
+- ``duplicate_rate``: proporción de ofertas que repiten una anterior (misma URL);
+- ``null_rate``: proporción de títulos, empresas y ubicaciones vacíos;
+- ``match_rate``: proporción de ofertas cuyas empresa, título y ubicación
+  existen en las fuentes de referencia (con variantes de escritura:
+  sufijos societarios, marcadores de género y país tras la ciudad).
+
+``PagedSession`` sirve las ofertas por páginas con la interfaz que usa la
+ingesta (``get`` + ``json``), para ejecutarla sin red.
+
+Uso: python benchmarks/synthetic.py --output DIR [--rows 100000] [--duplicate-rate 0.1]
+     [--null-rate 0.05] [--match-rate 0.5] [--seed 0]
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ingesta import JOB_COLUMNS  # noqa: E402
+
+BASE_URL = "https://www.arbeitnow.com/jobs"
+API_URL = "https://www.arbeitnow.com/api/job-board-api"
+PAGE_SIZE = 100
+FIRST_CREATED_AT = 1_700_000_000
+
+COMPANY_SUFFIXES = np.array(["", " GmbH", " Inc.", " AG", " Ltd"], dtype=object)
+TITLE_SUFFIXES = np.array(["", " (m/w/d)", " (f/m/x)"], dtype=object)
+INDUSTRIES = ["tech", "data", "cloud", "finance", "health", "retail"]
+COUNTRIES = {"Germany": "Europe", "UK": "Europe", "USA": "North America",
+             "Netherlands": "Europe", "Canada": "North America"}
+
+
+def generate_references(companies=200, titles=100, cities=50, seed=0):
+    """Fuentes de referencia sintéticas, con las columnas que devuelven sus cargadores"""
+    rng = np.random.default_rng(seed)
+    countries = list(COUNTRIES)
+    city_countries = [countries[i] for i in rng.integers(0, len(countries), cities)]
+    min_salary = rng.integers(40, 100, titles) * 1000
+    return {
+        "companies_info.json": pd.DataFrame({
+            "name": [f"Company {i}" for i in range(companies)],
+            "founded_year": rng.integers(1950, 2024, companies),
+            "employees": rng.integers(10, 50_000, companies),
+            "industry": [INDUSTRIES[i] for i in rng.integers(0, len(INDUSTRIES), companies)],
+        }),
+        "salary_ranges.csv": pd.DataFrame({
+            "job_title": [f"Role {i}" for i in range(titles)],
+            "min_salary": min_salary,
+            "max_salary": min_salary + rng.integers(10, 60, titles) * 1000,
+            "currency": "USD",
+        }),
+        "locations.xlsx": pd.DataFrame({
+            "city": [f"City {i}" for i in range(cities)],
+            "country": city_countries,
+            "continent": [COUNTRIES[country] for country in city_countries],
+            "cost_of_living_index": rng.integers(40, 120, cities),
+        }),
+        "industry_data.xml": pd.DataFrame({
+            "industry_id": INDUSTRIES,
+            "industry_name": [industry.title() for industry in INDUSTRIES],
+            "growth_rate": rng.uniform(1, 15, len(INDUSTRIES)).round(1),
+            "avg_salary": (rng.integers(50, 120, len(INDUSTRIES)) * 1000).astype(float),
+        }),
+    }
+
+
+def write_references(references, directory):
+    """Escribe las fuentes en los formatos de ``DATA_SOURCES_DIR``"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    companies = references["companies_info.json"]
+    with open(directory / "companies_info.json", "w", encoding="utf-8") as f:
+        json.dump(json.loads(companies.to_json(orient="records")), f, indent=4)
+    references["salary_ranges.csv"].to_csv(directory / "salary_ranges.csv", index=False)
+    references["locations.xlsx"].to_excel(directory / "locations.xlsx", index=False)
+    lines = ["<industries>"]
+    for row in references["industry_data.xml"].itertuples(index=False):
+        lines.extend([
+            "    <industry>",
+            f"        <id>{escape(row.industry_id)}</id>",
+            f"        <name>{escape(row.industry_name)}</name>",
+            f"        <growth_rate>{row.growth_rate}</growth_rate>",
+            f"        <avg_salary>{row.avg_salary:.0f}</avg_salary>",
+            "    </industry>",
+        ])
+    lines.append("</industries>")
+    (directory / "industry_data.xml").write_text("\n".join(lines), encoding="utf-8")
+    return directory
+
+
+def _pick(rng, matched, reference_values, suffixes, unmatched_prefix, rows):
+    """Valores de referencia con variantes de escritura o valores sin referencia"""
+    reference_values = np.asarray(reference_values, dtype=object)
+    known = (reference_values[rng.integers(0, len(reference_values), rows)]
+             + suffixes[rng.integers(0, len(suffixes), rows)])
+    numbers = rng.integers(0, 10_000, rows).astype(str)
+    unknown = np.char.add(unmatched_prefix, numbers).astype(object)
+    return np.where(matched, known, unknown)
+
+
+def generate_jobs(rows, references=None, duplicate_rate=0.1, null_rate=0.05, match_rate=0.5,
+                  seed=0, null_value=""):
+    """Ofertas sintéticas con la forma del API, de la más reciente a la más antigua.
+
+    Los valores vacíos toman ``null_value``: ``""`` para el API (la tabla
+    jobs no admite nulos) o ``None`` para construir una tabla con nulos.
+    """
+    references = references or generate_references(seed=seed)
+    rng = np.random.default_rng(seed)
+    matched = rng.random(rows) < match_rate
+    cities = references["locations.xlsx"]
+    countries = np.array([""] + [f", {country}" for country in COUNTRIES], dtype=object)
+    titles = _pick(rng, matched, references["salary_ranges.csv"]["job_title"], TITLE_SUFFIXES,
+                   "Position ", rows)
+    companies = _pick(rng, matched, references["companies_info.json"]["name"], COMPANY_SUFFIXES,
+                      "Unlisted ", rows)
+    locations = _pick(rng, matched, cities["city"], countries, "Town ", rows)
+
+    # Las repeticiones copian una oferta anterior completa (misma URL)
+    source = np.arange(rows)
+    repeated = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    repeated = repeated[repeated > 0]
+    source[repeated] = (rng.random(len(repeated)) * repeated).astype(int)
+    while (source[source] != source).any():
+        source = source[source]  # una repetición de una repetición apunta al original
+    for values in (titles, companies, locations):
+        values[rng.random(rows) < null_rate] = null_value
+        values[:] = values[source]
+
+    remote = rng.random(rows) < 0.3
+    created_at = FIRST_CREATED_AT + (rows - np.arange(rows)) * 60
+    jobs = []
+    for i in range(rows):
+        original = source[i]
+        slug = f"job-{original}"
+        jobs.append({
+            "slug": slug,
+            "company_name": companies[i],
+            "title": titles[i],
+            "description": f"<p>Synthetic posting {original}</p>",
+            "remote": bool(remote[original]),
+            "url": f"{BASE_URL}/{slug}",
+            "tags": [],
+            "job_types": ["full time"],
+            "location": locations[i],
+            "created_at": int(created_at[original]),
+        })
+    return jobs
+
+
+def jobs_frame(jobs):
+    """DataFrame con las columnas de la tabla jobs (``id`` en orden de inserción)"""
+    df = pd.DataFrame(jobs, columns=list(JOB_COLUMNS))
+    df.insert(0, "id", np.arange(1, len(df) + 1))
+    return df
+
+
+def write_jobs_table(db_path, jobs):
+    """Tabla jobs como la de la ingesta pero sin NOT NULL, para conservar los nulos"""
+    df = jobs_frame(jobs)
+    df["remote"] = df["remote"].astype(int)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT, company_name TEXT, location TEXT, remote BOOLEAN, url TEXT
+            )
+        """)
+        df.to_sql("jobs", conn, if_exists="append", index=False)
+    return db_path
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class PagedSession:
+    """Sesión HTTP sin red que sirve ``jobs`` por páginas como el API"""
+
+    def __init__(self, jobs, page_size=PAGE_SIZE, url=API_URL):
+        self.jobs = jobs
+        self.page_size = page_size
+        self.url = url
+
+    def get(self, url, timeout=None):
+        page = int(url.rsplit("page=", 1)[1]) if "page=" in url else 1
+        start = (page - 1) * self.page_size
+        end = start + self.page_size
+        next_url = f"{self.url}?page={page + 1}" if end < len(self.jobs) else None
+        return _Response({"data": self.jobs[start:end], "links": {"next": next_url}})
+
+    def close(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, required=True,
+                        help="Carpeta donde se escriben jobs.db y las fuentes de referencia")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--match-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    references = generate_references(seed=args.seed)
+    write_references(references, args.output / "data_sources")
+    jobs = generate_jobs(args.rows, references, args.duplicate_rate, args.null_rate,
+                         args.match_rate, args.seed, null_value=None)
+    db_path = args.output / "jobs.db"
+    db_path.unlink(missing_ok=True)
+    write_jobs_table(db_path, jobs)
+    print(f"{len(jobs)} ofertas en {db_path}; fuentes en {args.output / 'data_sources'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
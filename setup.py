@@ -16,6 +16,7 @@ setup(
         'scikit-learn',
         'joblib',             
         "openpyxl",
+        "pyarrow",
         "requests"
     ],    
     
@@ -1,30 +1,59 @@
-import pandas as pd
-import sqlite3
 import logging
 from pathlib import Path
-import os
-
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("data_cleaning.log"),
-        logging.StreamHandler(),
-    ],
-)
-logger = logging.getLogger(__name__)
-
-# Configuración de rutas
-BASE_DIR = Path(os.getcwd())  # Usa el directorio actual en lugar de __file__
-DB_PATH = BASE_DIR / "src" / "static" / "db" / "ingestion.db"
-CLEANED_DATA_PATH = BASE_DIR / "src" / "static" / "cleaned_data" / "cleaned_data.xlsx"
-AUDIT_PATH = BASE_DIR / "src" / "static" / "auditoria" / "cleaning_report.txt"
+from collections import Counter
+import argparse
+
+import config
+from dedup import (DEFAULT_DEDUP_KEY, DedupIndex, MemoryDedupIndex, deduplicate, key_hashes,
+                   new_run_id)
+import storage
+from metrics import add_arguments as add_metrics_arguments, instrument, record_run
+from profiling import profile_frame, profile_stage, profile_table
+from dtypes import memory_report_lines, optimize_dtypes
+from lazy import lazy_import
+from rules import RULES_PATH, load_rules
+from stage_cache import STAGE_CACHE, file_fingerprint
+from stage_io import (CLEANED_JOBS_SCHEMA, DEFAULT_STAGE_FORMAT, XLSX_SAMPLE_ROWS, BackgroundWriter,
+                      StageWriter, export_xlsx_sample, iter_chunks, stage_path, write_report)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
-# Asegurar que los directorios existan
-for path in [DB_PATH.parent, CLEANED_DATA_PATH.parent, AUDIT_PATH.parent]:
-    os.makedirs(path, exist_ok=True)
+logger = logging.getLogger(__name__)
 
+# Configuración de rutas (ver config.py)
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = storage.DB_PATH
+_config = config.active_config()
+CLEANED_DATA_PATH = stage_path(_config.cleaned_dir / "cleaned_data", DEFAULT_STAGE_FORMAT)
+CLEANED_SAMPLE_PATH = _config.cleaned_dir / "cleaned_data.xlsx"
+AUDIT_PATH = _config.audit_dir / "cleaning_report.txt"
+
+# Modo por bloques: filas por bloque por defecto y copias de trabajo estimadas
+# por bloque (lectura, limpieza y conversión a Arrow) para respetar el límite de memoria
+DEFAULT_CHUNKSIZE = 50_000
+CHUNK_MEMORY_FACTOR = 3
+# Las pasadas por bloques alinean ``keep_mask`` por posición: todas leen en orden
+# de rowid, aunque SQLite prefiera recorrer un índice que cubra las columnas
+JOBS_QUERY = "SELECT * FROM jobs ORDER BY rowid"
+
+
+def cache_key(dedup_key=DEFAULT_DEDUP_KEY, rules_path=RULES_PATH):
+    """Clave de la caché de etapas: versión de jobs, reglas y clave de duplicados"""
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"La base de datos no existe en {DB_PATH}")
+    return STAGE_CACHE.key("cleaning", {
+        "jobs": storage.table_version(storage.get_connection(DB_PATH)),
+        "rules": file_fingerprint(rules_path),
+        "dedup_key": dedup_key,
+    })
+
+
+def cache_outputs(checkpoint=True):
+    """Artefactos de la limpieza que guarda la caché (sin checkpoint, solo el reporte)"""
+    return [CLEANED_DATA_PATH, CLEANED_SAMPLE_PATH, AUDIT_PATH] if checkpoint else [AUDIT_PATH]
+
+@instrument
 def load_data():
     """Carga datos desde la base de datos SQLite"""
     try:
@@ -34,10 +63,7 @@ def load_data():
         if not DB_PATH.exists():
             raise FileNotFoundError(f"La base de datos no existe en {DB_PATH}")
 
-        # Conectar a la base de datos
-        with sqlite3.connect(str(DB_PATH)) as conn:
-            query = "SELECT * FROM jobs"
-            df = pd.read_sql_query(query, conn)
+        df = storage.read_jobs(path=DB_PATH)
 
         logger.info(f"Datos cargados correctamente. Registros: {len(df)}")
         return df
@@ -46,130 +72,445 @@ def load_data():
         logger.exception("Error al cargar datos")
         raise
 
-def analyze_data(df):
-    """Realiza análisis exploratorio de los datos"""
+@instrument
+def analyze_data(df=None, memory_usage=None, conn=None):
+    """Realiza análisis exploratorio de los datos.
+
+    Sin ``df`` se perfila la tabla jobs con agregados SQL, sin cargarla (y
+    sin repetir el cálculo si la base de datos no cambió); con ``df`` se
+    perfila ese DataFrame. ``conn`` permite perfilar otra base de datos.
+    ``memory_usage`` es el resultado de
+    ``optimize_dtypes`` y se incluye en el reporte de auditoría.
+    """
+    if df is None:
+        profile = profile_table(conn=conn or storage.get_connection(DB_PATH))
+    else:
+        profile = profile_frame(df)
     analysis = {
-        "initial_records": len(df),
-        "null_counts": df.isnull().sum().to_dict(),
-        "duplicates": df.duplicated().sum(),
-        "data_types": df.dtypes.to_dict(),
+        "initial_records": profile["records"],
+        "null_counts": profile["null_counts"],
+        "distinct_counts": profile["distinct_counts"],
+        "duplicates": profile["duplicates"],
+        "data_types": profile["data_types"],
     }
+    if memory_usage is not None:
+        analysis["memory_usage"] = memory_usage
 
     logger.info("Análisis exploratorio completado")
     return analysis
 
-def clean_data(df):
-    """Realiza la limpieza y transformación de datos"""
-    df_clean = df.copy()
-    cleaning_report = {"duplicates_removed": 0, "null_handling": {}, "type_conversions": {}, "transformations": {}}
-
-    # 1. Eliminar duplicados
-    initial_count = len(df_clean)
-    df_clean.drop_duplicates(inplace=True)
-    cleaning_report["duplicates_removed"] = initial_count - len(df_clean)
-
-    # 2. Manejo de valores nulos
-    for col in df_clean.columns:
-        null_count = df_clean[col].isnull().sum()
-        if null_count > 0:
-            if pd.api.types.is_numeric_dtype(df_clean[col]):
-                fill_value = df_clean[col].median()
-            else:
-                mode_values = df_clean[col].mode()
-                fill_value = mode_values[0] if not mode_values.empty else ""
-
-            df_clean[col].fillna(fill_value, inplace=True)
-            cleaning_report["null_handling"][col] = f"Rellenados {null_count} nulos con {fill_value}"
-
-    # 3. Corrección de tipos de datos
-    if "remote" in df_clean.columns:
-        df_clean["remote"] = df_clean["remote"].astype(bool)
-        cleaning_report["type_conversions"]["remote"] = "Convertido a booleano"
-
-    # 4. Transformaciones adicionales
-    if "company_name" in df_clean.columns:
-        df_clean["company_name"] = df_clean["company_name"].str.title()
-        cleaning_report["transformations"]["company_name"] = "Normalizado a título case"
+def _duplicates_report(cleaning_report, counts):
+    cleaning_report["duplicates_within_batch"] = counts["within_batch"]
+    cleaning_report["duplicates_history"] = counts["history"]
+    cleaning_report["duplicates_removed"] = counts["within_batch"] + counts["history"]
+
+
+@instrument
+def clean_data(df, dedup_key=DEFAULT_DEDUP_KEY, dedup_index=None, run_id=None, rules=None):
+    """Realiza la limpieza y transformación de datos.
+
+    Los duplicados se eliminan por ``dedup_key``; si se pasa ``dedup_index``
+    también se descartan las claves ya vistas en ejecuciones anteriores.
+    Relleno de nulos, tipos, validación y transformaciones siguen las reglas
+    por columna de ``rules`` (por defecto, las del archivo de configuración).
+    """
+    rules = rules or load_rules()
+    cleaning_report = {"duplicates_removed": 0}
+
+    # 1. Eliminar duplicados por clave (dentro del lote y contra el histórico)
+    df_clean, counts = deduplicate(df, dedup_key, index=dedup_index, run_id=run_id)
+    _duplicates_report(cleaning_report, counts)
+
+    # 2. Conversión y validación: se descartan las filas con valores inválidos
+    df_clean, invalid, rejected = rules.validate(df_clean)
+    if invalid.any():
+        df_clean = df_clean[~invalid]
+
+    # 3. Relleno de nulos, tipos de destino y transformaciones en una pasada
+    null_counts = df_clean.isnull().sum()
+    fill_values = rules.fill_values(df_clean, null_counts)
+    df_clean = rules.apply(df_clean, fill_values)
+    cleaning_report.update(rules.report(df_clean.columns, null_counts, fill_values,
+                                        {"rows": int(invalid.sum()), "by_column": rejected}))
+
+    # 4. Representación compacta de la salida
+    df_clean, _ = optimize_dtypes(df_clean)
 
     logger.info("Limpieza de datos completada")
     return df_clean, cleaning_report
 
-def generate_artifacts(clean_df, analysis, cleaning_report):
-    """Genera los archivos de salida"""
-    try:
-        # Guardar datos limpios
-        clean_df.to_excel(CLEANED_DATA_PATH, index=False)
-        logger.info(f"Datos limpios guardados en: {CLEANED_DATA_PATH}")
+def _median_from_counter(counter):
+    """Mediana exacta a partir de un contador de valores"""
+    total = sum(counter.values())
+    if total == 0:
+        return float("nan")
+    values = sorted(counter)
+    lower_pos, upper_pos = (total - 1) // 2, total // 2
+    lower = upper = None
+    cumulative = 0
+    for value in values:
+        cumulative += counter[value]
+        if lower is None and cumulative > lower_pos:
+            lower = value
+        if cumulative > upper_pos:
+            upper = value
+            break
+    return (lower + upper) / 2
+
+
+def _mode_from_counter(counter):
+    """Moda como ``Series.mode()[0]``: el menor de los valores más frecuentes"""
+    if not counter:
+        return ""
+    top = max(counter.values())
+    return sorted(value for value, count in counter.items() if count == top)[0]
+
+
+def estimate_chunksize(memory_limit_mb, conn, probe_rows=1000):
+    """Calcula filas por bloque para no superar ``memory_limit_mb`` por bloque"""
+    probe = pd.read_sql_query(f"{JOBS_QUERY} LIMIT {probe_rows}", conn)
+    if probe.empty:
+        return DEFAULT_CHUNKSIZE
+    bytes_per_row = probe.memory_usage(deep=True).sum() / len(probe)
+    rows = int(memory_limit_mb * 1024 * 1024 / (bytes_per_row * CHUNK_MEMORY_FACTOR))
+    return max(rows, 1)
+
+
+@instrument
+def compute_global_stats(conn, chunksize=DEFAULT_CHUNKSIZE, dedup_key=DEFAULT_DEDUP_KEY,
+                         dedup_index=None, run_id=None, in_memory=False, rules=None):
+    """Primera pasada: estadísticas globales necesarias para limpiar por bloques.
+
+    Toma el análisis inicial del perfil SQL de la tabla (``profile_table``)
+    y calcula la máscara de filas que sobreviven a la deduplicación por
+    ``dedup_key`` y a la validación de ``rules`` y, sobre esas filas, los
+    nulos y el tipo de cada columna. Los hashes vistos se guardan en un
+    índice en disco (``dedup_index`` o uno temporal), así la memoria no
+    crece con el número de claves. Solo si alguna columna tiene nulos se relee
+    esa columna para contar valores y obtener la mediana o la moda exactas.
+    Con ``in_memory`` los índices temporales se mantienen en memoria.
+    """
+    rules = rules or load_rules()
+    run_id = run_id or new_run_id()
+    temporary_index = MemoryDedupIndex if in_memory else DedupIndex.temporary
+    key_index = dedup_index or temporary_index(dedup_key)
+    keep_masks = []
+    dedup_counts = {"within_batch": 0, "history": 0}
+    rejected = {"rows": 0, "by_column": Counter()}
+    nulls = Counter()
+    numeric = {}
+    dtypes = {}
+    columns = []
 
-        # Generar reporte de auditoría
-        report_content = [
-            "=== REPORTE DE LIMPIEZA DE DATOS ===",
-            f"Fecha: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-            "=== ESTADO INICIAL ===",
-            f"Total de registros: {analysis['initial_records']}",
-            f"Registros duplicados: {analysis['duplicates']}",
-            "Valores nulos por columna:",
-        ]
-
-        for col, count in analysis["null_counts"].items():
+    try:
+        for chunk in pd.read_sql_query(JOBS_QUERY, conn, chunksize=chunksize):
+            if not columns:
+                columns = list(chunk.columns)
+            seen_run, seen_history = key_index.check_and_add(key_hashes(chunk, dedup_key), run_id)
+            dedup_counts["within_batch"] += int(seen_run.sum())
+            dedup_counts["history"] += int((seen_history & ~seen_run).sum())
+            keep = ~(seen_run | seen_history)
+            unique, invalid, rejected_by_column = rules.validate(chunk[keep])
+            if invalid.any():
+                keep[np.flatnonzero(keep)[invalid]] = False
+                unique = unique[~invalid]
+                rejected["rows"] += int(invalid.sum())
+                rejected["by_column"].update(rejected_by_column)
+            keep_masks.append(keep)
+            nulls.update(unique.isnull().sum().to_dict())
+            for col in columns:
+                values = unique[col].dropna()
+                if not values.empty:
+                    numeric[col] = numeric.get(col, True) and pd.api.types.is_numeric_dtype(values)
+                    dtypes.setdefault(col, set()).add(values.dtype)
+    finally:
+        if dedup_index is None:
+            key_index.close()
+
+    keep_mask = np.concatenate(keep_masks) if keep_masks else np.array([], dtype=bool)
+    stats = {
+        "analysis": analyze_data(conn=conn),
+        "columns": columns,
+        "keep_mask": keep_mask,
+        "dedup_counts": dedup_counts,
+        "rejected": rejected,
+        "rules": rules,
+        "null_counts": {col: nulls[col] for col in columns},
+        "dtypes": {},
+        "fill_values": {},
+    }
+    for col in columns:
+        if numeric.get(col, False):
+            dtype = np.result_type(*dtypes[col])
+            if nulls[col] and dtype.kind in "iub":
+                dtype = np.dtype("float64")
+        else:
+            dtype = np.dtype("object")
+        stats["dtypes"][col] = dtype
+
+    strategies = {col: rules.rule(col).strategy(numeric.get(col, False))
+                  for col in columns if nulls[col]}
+    for col, strategy in strategies.items():
+        if strategy == "value":
+            stats["fill_values"][col] = rules.rule(col).value
+    counted = [col for col, strategy in strategies.items() if strategy in ("median", "mode")]
+    if counted:
+        counters = {col: Counter() for col in counted}
+        query = f"SELECT {', '.join(counted)} FROM jobs ORDER BY rowid"
+        offset = 0
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunksize):
+            unique = rules.parse(chunk[keep_mask[offset:offset + len(chunk)]])
+            offset += len(chunk)
+            for col in counted:
+                counters[col].update(unique[col].dropna().value_counts(sort=False).to_dict())
+        for col in counted:
+            stats["fill_values"][col] = (
+                _median_from_counter(counters[col]) if strategies[col] == "median"
+                else _mode_from_counter(counters[col])
+            )
+    # Mismo orden de columnas que el relleno de ``clean_data``
+    stats["fill_values"] = {col: stats["fill_values"][col] for col in columns
+                            if col in stats["fill_values"]}
+    return stats
+
+
+def stats_cleaning_report(stats):
+    """Reporte de limpieza equivalente al de ``clean_data`` a partir de las estadísticas globales"""
+    cleaning_report = {"duplicates_removed": 0}
+    _duplicates_report(cleaning_report, stats["dedup_counts"])
+    cleaning_report.update(stats["rules"].report(stats["columns"], stats["null_counts"],
+                                                 stats["fill_values"], stats["rejected"]))
+    return cleaning_report
+
+
+def apply_global_stats(chunk, stats):
+    """Limpia un bloque ya deduplicado con los valores de relleno y tipos globales.
+
+    Aplica las mismas reglas que ``clean_data``; como las medianas, modas
+    y tipos vienen de ``compute_global_stats``, el resultado no depende de
+    cómo se parta la tabla.
+    """
+    return stats["rules"].apply(chunk, stats["fill_values"], stats["dtypes"])
+
+
+@instrument
+def clean_data_chunked(output_path=None, chunksize=None, memory_limit_mb=None,
+                       dedup_key=DEFAULT_DEDUP_KEY, dedup_index=None, run_id=None, rules=None):
+    """Limpieza fuera de memoria en dos pasadas sobre ``jobs``.
+
+    La primera pasada calcula las estadísticas globales (``compute_global_stats``);
+    la segunda elimina duplicados, rellena nulos y aplica las transformaciones
+    de ``clean_data`` bloque a bloque, escribiendo cada bloque en
+    ``output_path``. El resultado coincide con ``clean_data`` sobre la tabla
+    completa. Con ``memory_limit_mb`` el tamaño de bloque se ajusta para no
+    superar ese techo por bloque. ``dedup_key``, ``dedup_index``, ``run_id``
+    y ``rules`` tienen el mismo significado que en ``clean_data``.
+    """
+    output_path = output_path or CLEANED_DATA_PATH
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"La base de datos no existe en {DB_PATH}")
+
+    conn = storage.get_connection(DB_PATH)
+    if chunksize is None:
+        chunksize = (estimate_chunksize(memory_limit_mb, conn) if memory_limit_mb
+                     else DEFAULT_CHUNKSIZE)
+    logger.info(f"Limpieza por bloques de {chunksize} registros")
+
+    stats = compute_global_stats(conn, chunksize, dedup_key, dedup_index, run_id, rules=rules)
+    cleaning_report = stats_cleaning_report(stats)
+
+    keep_mask = stats["keep_mask"]
+    offset = 0
+    sample = None
+    # Cada bloque se escribe en un hilo aparte mientras se limpia el siguiente
+    with BackgroundWriter(StageWriter(output_path, schema=CLEANED_JOBS_SCHEMA)) as writer:
+        for chunk in pd.read_sql_query(JOBS_QUERY, conn, chunksize=chunksize):
+            rows = len(chunk)
+            chunk = apply_global_stats(chunk[keep_mask[offset:offset + rows]], stats)
+            offset += rows
+
+            if sample is None or len(sample) < XLSX_SAMPLE_ROWS:
+                sample = chunk if sample is None else pd.concat([sample, chunk])
+                sample = sample.head(XLSX_SAMPLE_ROWS)
+            writer.write(chunk)
+
+    # Nulos finales desde los metadatos de los row groups escritos
+    final_state = profile_stage(output_path)
+    logger.info("Limpieza de datos por bloques completada")
+    return stats["analysis"], cleaning_report, final_state, sample
+
+
+@instrument
+def write_cleaning_report(analysis, cleaning_report, final_state):
+    """Escribe el reporte de auditoría de la limpieza"""
+    report_content = [
+        "=== REPORTE DE LIMPIEZA DE DATOS ===",
+        f"Fecha: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "=== ESTADO INICIAL ===",
+        f"Total de registros: {analysis['initial_records']}",
+        f"Registros duplicados: {analysis['duplicates']}",
+        "Valores nulos por columna:",
+    ]
+
+    for col, count in analysis["null_counts"].items():
+        report_content.append(f"- {col}: {count}")
+
+    if "distinct_counts" in analysis:
+        report_content.append("Valores distintos por columna:")
+        for col, count in analysis["distinct_counts"].items():
             report_content.append(f"- {col}: {count}")
 
-        report_content.extend([
-            "",
-            "=== OPERACIONES REALIZADAS ===",
-            f"Registros duplicados eliminados: {cleaning_report['duplicates_removed']}",
-            "Manejo de valores nulos:",
-        ])
-
-        for col, msg in cleaning_report["null_handling"].items():
+    if "memory_usage" in analysis:
+        report_content.append("Memoria por columna (antes -> después de optimizar tipos):")
+        report_content.extend(memory_report_lines(analysis["memory_usage"]))
+
+    report_content.extend([
+        "",
+        "=== OPERACIONES REALIZADAS ===",
+        f"Registros duplicados eliminados: {cleaning_report['duplicates_removed']}",
+        f"- Dentro del lote: {cleaning_report.get('duplicates_within_batch', 0)}",
+        f"- Contra el histórico: {cleaning_report.get('duplicates_history', 0)}",
+        f"Registros rechazados por validación: {cleaning_report.get('rejected_rows', 0)}",
+    ])
+
+    for col, count in cleaning_report.get("rejected_by_column", {}).items():
+        report_content.append(f"- {col}: {count}")
+
+    report_content.append("Manejo de valores nulos:")
+    for col, msg in cleaning_report["null_handling"].items():
+        report_content.append(f"- {col}: {msg}")
+
+    report_content.append("Conversiones de tipo y transformaciones:")
+    for section in ("type_conversions", "transformations"):
+        for col, msg in cleaning_report.get(section, {}).items():
             report_content.append(f"- {col}: {msg}")
 
-        report_content.append("\n=== ESTADO FINAL ===")
-        report_content.append(f"Total de registros: {len(clean_df)}")
-        report_content.append("Valores nulos por columna:")
+    report_content.append("\n=== ESTADO FINAL ===")
+    report_content.append(f"Total de registros: {final_state['records']}")
+    report_content.append("Valores nulos por columna:")
 
-        for col, count in clean_df.isnull().sum().items():
-            report_content.append(f"- {col}: {count}")
+    for col, count in final_state["null_counts"].items():
+        report_content.append(f"- {col}: {count}")
+
+    # Escribir reporte
+    write_report(AUDIT_PATH, "\n".join(report_content))
 
-        # Escribir reporte
-        with open(AUDIT_PATH, "w", encoding="utf-8") as f:
-            f.write("\n".join(report_content))
+    logger.info(f"Reporte de auditoría generado en: {AUDIT_PATH}")
+
+
+@instrument
+def generate_artifacts(clean_df, analysis, cleaning_report):
+    """Genera los archivos de salida"""
+    try:
+        # Guardar datos limpios (formato columnar) en segundo plano mientras
+        # se exporta la muestra en Excel
+        with BackgroundWriter(StageWriter(CLEANED_DATA_PATH, schema=CLEANED_JOBS_SCHEMA)) as writer:
+            for chunk in iter_chunks(clean_df):
+                writer.write(chunk)
+            export_xlsx_sample(clean_df, CLEANED_SAMPLE_PATH)
+        logger.info(f"Datos limpios guardados en: {CLEANED_DATA_PATH}")
+        logger.info(f"Muestra de datos limpios guardada en: {CLEANED_SAMPLE_PATH}")
 
-        logger.info(f"Reporte de auditoría generado en: {AUDIT_PATH}")
+        # Estado final desde los metadatos del archivo recién escrito
+        final_profile = profile_stage(CLEANED_DATA_PATH)
+        write_cleaning_report(analysis, cleaning_report, {
+            "records": final_profile["records"],
+            "null_counts": final_profile["null_counts"],
+        })
 
     except Exception as e:
         logger.exception("Error al generar artefactos")
         raise
 
-def main():
+def main(chunksize=None, memory_limit_mb=None, dedup_key=DEFAULT_DEDUP_KEY, dedup_history=False,
+         rules_path=RULES_PATH, use_cache=True):
+    run_id = new_run_id()
+    dedup_index = None
+    # Con el índice histórico el resultado depende de ejecuciones anteriores
+    use_cache = use_cache and not dedup_history
     try:
         logger.info("Iniciando proceso de limpieza de datos")
-
-        # 1. Cargar datos
-        df = load_data()
-
-        # 2. Análisis inicial
-        initial_analysis = analyze_data(df)
+        if use_cache:
+            key = cache_key(dedup_key, rules_path)
+            if STAGE_CACHE.restore(key, cache_outputs()):
+                logger.info("Proceso de limpieza completado (resultado en caché)")
+                return 0
+
+        rules = load_rules(rules_path)
+        if dedup_history:
+            # Índice persistente: descarta claves ya procesadas en ejecuciones anteriores
+            dedup_index = DedupIndex(key=dedup_key)
+
+        if chunksize or memory_limit_mb:
+            # Modo fuera de memoria: dos pasadas por bloques sobre la base de datos
+            initial_analysis, cleaning_report, final_state, sample = clean_data_chunked(
+                chunksize=chunksize, memory_limit_mb=memory_limit_mb,
+                dedup_key=dedup_key, dedup_index=dedup_index, run_id=run_id, rules=rules,
+            )
+            logger.info(f"Datos limpios guardados en: {CLEANED_DATA_PATH}")
+            if sample is not None:
+                export_xlsx_sample(sample, CLEANED_SAMPLE_PATH)
+            write_cleaning_report(initial_analysis, cleaning_report, final_state)
+            if use_cache:
+                STAGE_CACHE.store(key, "cleaning", cache_outputs())
+            logger.info("Proceso de limpieza completado exitosamente")
+            return 0
+
+        # 1. Cargar datos en su representación compacta
+        df, memory_usage = optimize_dtypes(load_data())
+
+        # 2. Análisis inicial (agregados SQL sobre la tabla)
+        initial_analysis = analyze_data(memory_usage=memory_usage)
 
         # 3. Limpieza de datos
-        clean_df, cleaning_report = clean_data(df)
+        clean_df, cleaning_report = clean_data(df, dedup_key, dedup_index, run_id, rules)
 
         # 4. Generar artefactos
         generate_artifacts(clean_df, initial_analysis, cleaning_report)
+        if use_cache:
+            STAGE_CACHE.store(key, "cleaning", cache_outputs())
 
         logger.info("Proceso de limpieza completado exitosamente")
         return 0
 
     except Exception as e:
         logger.exception("Error en el proceso de limpieza")
+        if dedup_index is not None:
+            dedup_index.discard_run(run_id)
         return 1
 
+    finally:
+        if dedup_index is not None:
+            dedup_index.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limpieza de la tabla jobs")
+    parser.add_argument("--chunksize", type=int, help="Limpia por bloques de N registros")
+    parser.add_argument("--memory-limit-mb", type=float,
+                        help="Limpia por bloques ajustando su tamaño a este techo de memoria")
+    parser.add_argument("--dedup-key", default=DEFAULT_DEDUP_KEY,
+                        help="Clave de duplicados: url, posting o columnas separadas por coma")
+    parser.add_argument("--dedup-history", action="store_true",
+                        help="Descarta también las claves vistas en ejecuciones anteriores")
+    parser.add_argument("--rules", type=Path,
+                        default=RULES_PATH,
+                        help="Archivo JSON de reglas de limpieza por columna")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recalcula aunque las entradas no hayan cambiado")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    config.setup(log_file="data_cleaning.log")
+
     # Debug: mostrar rutas importantes
     logger.info(f"Directorio base: {BASE_DIR}")
     logger.info(f"Ruta de la base de datos: {DB_PATH}")
     logger.info(f"Ruta de salida de datos limpios: {CLEANED_DATA_PATH}")
     logger.info(f"Ruta del reporte de auditoría: {AUDIT_PATH}")
 
-    exit(main())
\ No newline at end of file
+    with record_run("cleaning", args.trace_memory, args.profile) as metrics_run:
+        exit_code = main(chunksize=args.chunksize, memory_limit_mb=args.memory_limit_mb,
+                         dedup_key=args.dedup_key, dedup_history=args.dedup_history,
+                         rules_path=args.rules, use_cache=not args.no_cache)
+        metrics_run.status = "ok" if exit_code == 0 else "error"
+    exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""Configuración explícita de las etapas: rutas de trabajo y logging.
+
+Importar una etapa no configura el logging ni crea carpetas. Cada punto de
+entrada (``python src/cleaning.py``, ``pipeline.py``...) llama a ``setup``,
+que prepara el logging y crea las carpetas de salida de la configuración
+activa; un planificador o un benchmark que importe las etapas hace lo mismo
+o configura su propio logging.
+
+Las rutas de cada etapa se toman de la configuración activa al importarla.
+Por defecto salen de las variables de entorno (``Config.from_env``):
+
+- ``BIGDATA_STATIC_DIR``: carpeta de datos (por defecto ``src/static``);
+- ``BIGDATA_DB_PATH``: base de datos de ingesta (``<static>/db/ingestion.db``);
+- ``BIGDATA_LOG_DIR`` y ``BIGDATA_LOG_LEVEL``: carpeta de los ``.log`` (la
+  carpeta actual) y nivel de logging (``INFO``).
+
+Para usar otra configuración desde código, ``setup(Config(...))`` debe
+llamarse antes de importar las etapas.
+"""
+import logging
+import os
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_active = None
+
+
+class Config:
+    """Rutas y logging de una ejecución"""
+
+    def __init__(self, static_dir=STATIC_DIR, db_path=None, log_dir=".", log_level="INFO"):
+        self.static_dir = Path(static_dir)
+        self.db_path = Path(db_path) if db_path else self.static_dir / "db" / "ingestion.db"
+        self.log_dir = Path(log_dir)
+        self.log_level = log_level
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(
+            static_dir=environ.get("BIGDATA_STATIC_DIR") or STATIC_DIR,
+            db_path=environ.get("BIGDATA_DB_PATH") or None,
+            log_dir=environ.get("BIGDATA_LOG_DIR") or ".",
+            log_level=environ.get("BIGDATA_LOG_LEVEL") or "INFO",
+        )
+
+    @property
+    def data_sources_dir(self):
+        return self.static_dir / "data_sources"
+
+    @property
+    def cleaned_dir(self):
+        return self.static_dir / "cleaned_data"
+
+    @property
+    def enriched_dir(self):
+        return self.static_dir / "enriched_data"
+
+    @property
+    def audit_dir(self):
+        return self.static_dir / "auditoria"
+
+    @property
+    def xlsx_dir(self):
+        return self.static_dir / "xlsx"
+
+    @property
+    def config_dir(self):
+        return self.static_dir / "config"
+
+    @property
+    def cache_dir(self):
+        return self.static_dir / "cache"
+
+    @property
+    def metrics_dir(self):
+        return self.static_dir / "metrics"
+
+    def output_dirs(self):
+        """Carpetas que las etapas escriben (se crean en ``setup``)"""
+        return [self.db_path.parent, self.cleaned_dir, self.enriched_dir, self.audit_dir,
+                self.xlsx_dir]
+
+
+def active_config():
+    """Configuración activa (la de las variables de entorno si nadie la fijó)"""
+    global _active
+    if _active is None:
+        _active = Config.from_env()
+    return _active
+
+
+def setup(config=None, log_file=None):
+    """Fija la configuración activa, configura el logging y crea las carpetas.
+
+    ``log_file`` es el nombre del ``.log`` de la etapa dentro de ``log_dir``;
+    sin él solo se registra en la consola.
+    """
+    global _active
+    if config is not None:
+        _active = config
+    config = active_config()
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        config.log_dir.mkdir(parents=True, exist_ok=True)
+        handlers.insert(0, logging.FileHandler(config.log_dir / log_file, encoding="utf-8"))
+    logging.basicConfig(level=config.log_level, format=LOG_FORMAT, handlers=handlers)
+
+    for path in config.output_dirs():
+        path.mkdir(parents=True, exist_ok=True)
+    return config
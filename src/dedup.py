@@ -0,0 +1,237 @@
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from config import active_config
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Índice persistente de duplicados
+DEDUP_INDEX_PATH = active_config().db_path.parent / "dedup_index.db"
+
+# Claves de deduplicación disponibles. "url" identifica la publicación en
+# Arbeitnow; "posting" agrupa la misma oferta publicada con URLs distintas.
+DEDUP_KEYS = {
+    "url": ("url",),
+    "posting": ("title", "company_name", "location"),
+}
+DEFAULT_DEDUP_KEY = "url"
+# Claves cuyos textos se normalizan antes de calcular el hash
+NORMALIZED_KEYS = {"posting"}
+
+# Filas por sentencia al consultar/insertar en el índice
+INDEX_BATCH_SIZE = 50_000
+
+
+def resolve_key(key):
+    """Devuelve el nombre y las columnas de una clave (nombre o lista de columnas)"""
+    if isinstance(key, str) and key in DEDUP_KEYS:
+        return key, DEDUP_KEYS[key]
+    columns = tuple(key.split(",")) if isinstance(key, str) else tuple(key)
+    return "+".join(columns), columns
+
+
+def _is_text(values):
+    return (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+            or isinstance(values.dtype, pd.CategoricalDtype))
+
+
+def key_hashes(df, key=DEFAULT_DEDUP_KEY):
+    """Hash de 64 bits por fila sobre las columnas de la clave.
+
+    Los textos de las claves de ``NORMALIZED_KEYS`` (object, string o
+    category) se normalizan (minúsculas y espacios colapsados) y los
+    numéricos se llevan a float64, de modo que el hash es estable entre
+    bloques y ejecuciones aunque cambie el dtype inferido.
+    """
+    name, columns = resolve_key(key)
+    normalize_text = name in NORMALIZED_KEYS
+    normalized = pd.DataFrame(index=df.index)
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            values = values.astype("float64")
+        elif normalize_text and _is_text(values):
+            # category y string[pyarrow] pasan por str para normalizarse igual que object
+            text = values.astype(str).where(values.notna())
+            values = text.str.casefold().str.split().str.join(" ")
+        normalized[col] = values
+    # SQLite almacena enteros con signo: se reinterpretan los uint64
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy().view(np.int64)
+
+
+class DedupIndex:
+    """Índice en disco (SQLite) de hashes de clave ya vistos.
+
+    Cada hash guarda la ejecución en la que apareció por primera vez, lo que
+    permite distinguir los duplicados dentro de la ejecución actual (entre
+    bloques) de los que ya existían en ejecuciones anteriores.
+    """
+
+    def __init__(self, path=DEDUP_INDEX_PATH, key=DEFAULT_DEDUP_KEY):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.key_name, _ = resolve_key(key)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_keys (
+                key_name TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                run_id TEXT NOT NULL,
+                PRIMARY KEY (key_name, hash)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS batch_hashes (pos INTEGER PRIMARY KEY, hash INTEGER)"
+        )
+        self.conn.commit()
+
+    @classmethod
+    def temporary(cls, key=DEFAULT_DEDUP_KEY):
+        """Índice desechable para deduplicar entre bloques de una sola ejecución"""
+        tmpdir = tempfile.TemporaryDirectory(prefix="dedup_")
+        index = cls(Path(tmpdir.name) / "dedup_index.db", key=key)
+        # Si el proceso falla el índice se descarta: no hace falta durabilidad
+        index.conn.execute("PRAGMA journal_mode = OFF")
+        index.conn.execute("PRAGMA synchronous = OFF")
+        index._tmpdir = tmpdir
+        return index
+
+    def check_and_add(self, hashes, run_id):
+        """Registra los hashes nuevos y clasifica las filas del lote.
+
+        Devuelve dos máscaras booleanas: filas ya vistas en esta ejecución
+        (incluidas repeticiones dentro del propio lote) y filas vistas en
+        ejecuciones anteriores.
+        """
+        hashes = np.asarray(hashes, dtype=np.int64)
+        seen_run = pd.Series(hashes).duplicated().to_numpy()
+        seen_history = np.zeros(len(hashes), dtype=bool)
+        with self.conn:
+            for start in range(0, len(hashes), INDEX_BATCH_SIZE):
+                chunk = hashes[start:start + INDEX_BATCH_SIZE]
+                self.conn.execute("DELETE FROM batch_hashes")
+                self.conn.executemany(
+                    "INSERT INTO batch_hashes (pos, hash) VALUES (?, ?)",
+                    zip(range(start, start + len(chunk)), chunk.tolist()),
+                )
+                for pos, run in self.conn.execute("""
+                    SELECT b.pos, s.run_id FROM batch_hashes b
+                    JOIN seen_keys s ON s.key_name = ? AND s.hash = b.hash
+                """, (self.key_name,)):
+                    if run == run_id:
+                        seen_run[pos] = True
+                    else:
+                        seen_history[pos] = True
+                self.conn.execute("""
+                    INSERT OR IGNORE INTO seen_keys (key_name, hash, run_id)
+                    SELECT ?, hash, ? FROM batch_hashes
+                """, (self.key_name, run_id))
+        return seen_run, seen_history
+
+    def discard_run(self, run_id):
+        """Elimina los hashes registrados por una ejecución fallida"""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM seen_keys WHERE key_name = ? AND run_id = ?", (self.key_name, run_id)
+            )
+
+    def retain_runs(self, run_ids):
+        """Elimina los hashes de ejecuciones que no están en ``run_ids``.
+
+        Sirve para limpiar los que dejó una ejecución interrumpida antes de
+        poder llamar a ``discard_run`` (por ejemplo, un proceso terminado).
+        """
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS kept_runs (run_id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM kept_runs")
+            self.conn.executemany("INSERT OR IGNORE INTO kept_runs (run_id) VALUES (?)",
+                                  ((run_id,) for run_id in run_ids))
+            removed = self.conn.execute("""
+                DELETE FROM seen_keys
+                WHERE key_name = ? AND run_id NOT IN (SELECT run_id FROM kept_runs)
+            """, (self.key_name,)).rowcount
+        return removed
+
+    def close(self):
+        self.conn.close()
+        tmpdir = getattr(self, "_tmpdir", None)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryDedupIndex:
+    """Índice en memoria de hashes vistos en una sola ejecución.
+
+    Misma interfaz que ``DedupIndex.temporary`` para cuando la memoria no es
+    el límite (8 bytes por clave): evita escribir cada hash en SQLite. No
+    conoce ejecuciones anteriores, así que ``seen_history`` siempre es falso.
+
+    Los hashes vistos se guardan en bloques ordenados y disjuntos de tamaño
+    decreciente. Cada bloque nuevo se fusiona con el anterior mientras no
+    sea menor que su mitad: quedan O(log n) bloques y cada hash se copia
+    O(log n) veces en total, en lugar de rehacer el conjunto en cada bloque.
+    """
+
+    def __init__(self, key=DEFAULT_DEDUP_KEY):
+        self.key_name, _ = resolve_key(key)
+        self.blocks = []
+
+    def check_and_add(self, hashes, run_id=None):
+        hashes = np.asarray(hashes, dtype=np.int64)
+        seen_run = pd.Series(hashes).duplicated().to_numpy()
+        for block in self.blocks:
+            pos = np.searchsorted(block, hashes).clip(max=len(block) - 1)
+            seen_run |= block[pos] == hashes
+        new = np.sort(hashes[~seen_run])
+        if len(new):
+            self.blocks.append(new)
+            while len(self.blocks) > 1 and 2 * len(self.blocks[-1]) >= len(self.blocks[-2]):
+                last = self.blocks.pop()
+                self.blocks[-1] = np.sort(np.concatenate((self.blocks[-1], last)))
+        return seen_run, np.zeros(len(hashes), dtype=bool)
+
+    def discard_run(self, run_id):
+        self.blocks = []
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+
+def deduplicate(df, key=DEFAULT_DEDUP_KEY, index=None, run_id=None):
+    """Elimina duplicados por clave; con ``index`` también contra el histórico.
+
+    Devuelve el DataFrame sin duplicados y los conteos ``within_batch`` y
+    ``history``.
+    """
+    hashes = key_hashes(df, key)
+    if index is None:
+        seen_run = pd.Series(hashes).duplicated().to_numpy()
+        seen_history = np.zeros(len(hashes), dtype=bool)
+    else:
+        seen_run, seen_history = index.check_and_add(hashes, run_id or new_run_id())
+    drop = seen_run | seen_history
+    counts = {
+        "within_batch": int(seen_run.sum()),
+        "history": int((seen_history & ~seen_run).sum()),
+    }
+    return df[~drop], counts
@@ -0,0 +1,158 @@
+import logging
+
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Tipos compactos admitidos en el esquema
+CATEGORY = "category"
+ARROW_STRING = "string[pyarrow]"
+BOOLEAN = "boolean"
+INTEGER = "integer"  # entero reducido al menor ancho que admite sus valores
+
+# Esquema de las ofertas: empresas y ubicaciones se repiten mucho (category);
+# títulos y URLs son casi únicos, así que se guardan como cadenas de Arrow
+JOB_DTYPES = {
+    "id": INTEGER,
+    "title": ARROW_STRING,
+    "company_name": CATEGORY,
+    "location": CATEGORY,
+    "remote": BOOLEAN,
+    "url": ARROW_STRING,
+}
+# Columnas de texto fuera del esquema (p. ej. las del enriquecimiento): pasan a
+# category si la proporción de valores distintos no supera este umbral
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _is_text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    if pd.api.types.is_string_dtype(series.dtype):
+        return pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+    return False
+
+
+def _to_category(series):
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(CATEGORY)
+    # Categorías sin usar (tras filtrar filas) y en orden, como al crearlas:
+    # así dos caminos que llegan a los mismos valores producen el mismo tipo
+    series = series.cat.remove_unused_categories()
+    try:
+        return series.cat.reorder_categories(series.cat.categories.sort_values())
+    except TypeError:
+        return series
+
+
+def optimize_series(series, kind):
+    """Convierte una columna al tipo compacto ``kind`` si sus valores lo permiten.
+
+    Las columnas cuyo contenido no encaja (p. ej. un ``remote`` con valores
+    distintos de 0/1) se devuelven sin cambios.
+    """
+    if kind == CATEGORY:
+        if _is_text(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            return _to_category(series)
+    elif kind == ARROW_STRING:
+        if _is_text(series):
+            return series.astype(ARROW_STRING)
+    elif kind == BOOLEAN:
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return series.astype(BOOLEAN)
+        if pd.api.types.is_numeric_dtype(series.dtype) and series.dropna().isin((0, 1)).all():
+            return series.astype(BOOLEAN)
+    elif kind == INTEGER:
+        # Solo enteros de numpy: los nullables (Int64) ya no ocupan por valor
+        if (pd.api.types.is_integer_dtype(series.dtype)
+                and not pd.api.types.is_extension_array_dtype(series.dtype)):
+            return pd.to_numeric(series, downcast="integer")
+    else:
+        raise ValueError(f"Tipo compacto desconocido: {kind}")
+    return series
+
+
+def infer_kind(series, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Tipo compacto para una columna que no figura en el esquema (o None)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return CATEGORY
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return INTEGER
+    if _is_text(series) and len(series):
+        return CATEGORY if series.nunique() <= category_max_ratio * len(series) else None
+    return None
+
+
+def optimize_dtypes(df, schema=JOB_DTYPES, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Representación compacta en memoria de un DataFrame.
+
+    Las columnas del ``schema`` reciben su tipo; las demás se infieren con
+    ``infer_kind``. Los valores no cambian. Devuelve el DataFrame optimizado
+    y, por columna, la memoria (bytes) y el tipo antes y después.
+    """
+    columns = {}
+    memory_usage = {}
+    before = df.memory_usage(deep=True, index=False)
+    for col in df.columns:
+        kind = schema.get(col) or infer_kind(df[col], category_max_ratio)
+        columns[col] = optimize_series(df[col], kind) if kind else df[col]
+    optimized = pd.DataFrame(columns, index=df.index, copy=False)
+    after = optimized.memory_usage(deep=True, index=False)
+    for col in df.columns:
+        memory_usage[col] = {
+            "before": int(before[col]),
+            "after": int(after[col]),
+            "dtype_before": str(df[col].dtype),
+            "dtype_after": str(optimized[col].dtype),
+        }
+    logger.info(f"Tipos optimizados: {_megabytes(before.sum())} -> {_megabytes(after.sum())}")
+    return optimized, memory_usage
+
+
+def fill_nulls(series, value):
+    """``fillna`` que conserva el tipo compacto de la columna.
+
+    En ``category`` el valor se añade como categoría si no existía; en
+    ``boolean`` se rellena con su valor de verdad (igual que rellenar un
+    entero y convertirlo después a ``bool``).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if pd.notna(value) and value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+    elif isinstance(series.dtype, pd.BooleanDtype):
+        value = bool(value)
+    return series.fillna(value)
+
+
+def str_method(series, method):
+    """Aplica un método de ``Series.str`` conservando el tipo de la columna.
+
+    En ``category`` el método se aplica una sola vez por categoría.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return getattr(series.str, method)()
+    categories = getattr(series.cat.categories.str, method)()
+    if categories.is_unique:
+        return _to_category(series.cat.rename_categories(categories))
+    # Dos categorías colapsan en el mismo valor: se vuelve a factorizar
+    return getattr(series.astype(object).str, method)().astype(CATEGORY)
+
+
+def _megabytes(value):
+    return f"{value / (1024 * 1024):.2f} MB"
+
+
+def memory_report_lines(memory_usage):
+    """Líneas de reporte de auditoría con la memoria por columna antes/después"""
+    lines = []
+    for col, usage in memory_usage.items():
+        lines.append(
+            f"- {col}: {_megabytes(usage['before'])} ({usage['dtype_before']}) -> "
+            f"{_megabytes(usage['after'])} ({usage['dtype_after']})"
+        )
+    total_before = sum(usage["before"] for usage in memory_usage.values())
+    total_after = sum(usage["after"] for usage in memory_usage.values())
+    lines.append(f"Total: {_megabytes(total_before)} -> {_megabytes(total_after)}")
+    return lines
@@ -1,4 +1,4 @@
-import pandas as pd
+import argparse
 import json
 import xml.etree.ElementTree as ET
 from pathlib import Path
@@ -6,36 +6,41 @@ import logging
 from datetime import datetime
 import os
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("enrichment.log"),
-        logging.StreamHandler()
-    ]
-)
+import config
+from dtypes import memory_report_lines, optimize_dtypes
+from lazy import lazy_import
+from lookup import LookupTable, assemble
+from metrics import add_arguments as add_metrics_arguments, instrument, record_run, stage
+from reference_cache import ReferenceCache
+from stage_cache import STAGE_CACHE, file_fingerprint
+from normalization import company_key, location_key, text_key, title_key
+from stage_io import (DEFAULT_STAGE_FORMAT, BackgroundWriter, StageWriter, export_xlsx_sample,
+                      iter_chunks, read_stage, stage_path, write_report)
+
+pd = lazy_import("pandas")
+
 logger = logging.getLogger(__name__)
 
-# Configuración de rutas
+# Configuración de rutas (ver config.py)
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_SOURCES_DIR = BASE_DIR / "src" / "static" / "data_sources"
-CLEANED_DATA_PATH = BASE_DIR / "src" / "static" / \
-    "cleaned_data" / "cleaned_data.xlsx"
-ENRICHED_DATA_PATH = BASE_DIR / "src" / "static" / \
-    "enriched_data" / "enriched_data.xlsx"
-AUDIT_PATH = BASE_DIR / "src" / "static" / "auditoria" / "enriched_report.txt"
+_config = config.active_config()
+DATA_SOURCES_DIR = _config.data_sources_dir
+CLEANED_DATA_PATH = stage_path(_config.cleaned_dir / "cleaned_data", DEFAULT_STAGE_FORMAT)
+ENRICHED_DATA_PATH = stage_path(_config.enriched_dir / "enriched_data", DEFAULT_STAGE_FORMAT)
+ENRICHED_SAMPLE_PATH = _config.enriched_dir / "enriched_data.xlsx"
+AUDIT_PATH = _config.audit_dir / "enriched_report.txt"
 
-# Asegurar que los directorios existan
-os.makedirs(ENRICHED_DATA_PATH.parent, exist_ok=True)
-os.makedirs(AUDIT_PATH.parent, exist_ok=True)
+# Caché compilada de las fuentes de referencia (se invalida por mtime/tamaño/hash)
+REFERENCE_CACHE = ReferenceCache()
+USE_REFERENCE_CACHE = True
 
 
+@instrument
 def load_clean_data():
     """Carga los datos limpios de la actividad anterior"""
     try:
         logger.info(f"Cargando datos limpios desde: {CLEANED_DATA_PATH}")
-        df = pd.read_excel(CLEANED_DATA_PATH)
+        df, _ = optimize_dtypes(read_stage(CLEANED_DATA_PATH))
         logger.info(f"Datos limpios cargados. Registros: {len(df)}")
         return df
     except Exception as e:
@@ -43,14 +48,26 @@ def load_clean_data():
         raise
 
 
+def _load_source(path, parse):
+    """Carga una fuente de referencia a través de la caché compilada"""
+    if USE_REFERENCE_CACHE:
+        return REFERENCE_CACHE.load(path, parse)
+    return parse(path)
+
+
+def _parse_json(json_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return pd.DataFrame(data)
+
+
+@instrument
 def load_json_data():
     """Carga datos adicionales desde archivo JSON"""
     json_path = DATA_SOURCES_DIR / "companies_info.json"
     try:
         logger.info(f"Cargando datos JSON desde: {json_path}")
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        df = pd.DataFrame(data)
+        df = _load_source(json_path, _parse_json)
         logger.info(f"Datos JSON cargados. Registros: {len(df)}")
         return df
     except Exception as e:
@@ -58,12 +75,13 @@ def load_json_data():
         raise
 
 
+@instrument
 def load_csv_data():
     """Carga datos adicionales desde archivo CSV"""
     csv_path = DATA_SOURCES_DIR / "salary_ranges.csv"
     try:
         logger.info(f"Cargando datos CSV desde: {csv_path}")
-        df = pd.read_csv(csv_path)
+        df = _load_source(csv_path, pd.read_csv)
         logger.info(f"Datos CSV cargados. Registros: {len(df)}")
         return df
     except Exception as e:
@@ -71,6 +89,24 @@ def load_csv_data():
         raise
 
 
+def _parse_excel(excel_path):
+    # Intentar con diferentes motores como fallback
+    try:
+        df = pd.read_excel(excel_path, engine='openpyxl')
+    except Exception as e:
+        logger.warning(f"Error con openpyxl, intentando con xlrd: {str(e)}")
+        try:
+            df = pd.read_excel(excel_path, engine='xlrd')
+        except Exception as e:
+            logger.error("Ambos motores fallaron")
+            raise
+
+    if df.empty:
+        raise ValueError("El DataFrame cargado está vacío")
+    return df
+
+
+@instrument
 def load_excel_data():
     """Carga datos adicionales desde archivo Excel"""
     excel_path = DATA_SOURCES_DIR / "locations.xlsx"
@@ -87,20 +123,8 @@ def load_excel_data():
         
         if os.path.getsize(excel_path) == 0:
             raise ValueError("El archivo Excel está vacío")
-        
-        # Intentar con diferentes motores como fallback
-        try:
-            df = pd.read_excel(excel_path, engine='openpyxl')
-        except Exception as e:
-            logger.warning(f"Error con openpyxl, intentando con xlrd: {str(e)}")
-            try:
-                df = pd.read_excel(excel_path, engine='xlrd')
-            except Exception as e:
-                logger.error("Ambos motores fallaron")
-                raise
-        
-        if df.empty:
-            raise ValueError("El DataFrame cargado está vacío")
+
+        df = _load_source(excel_path, _parse_excel)
             
         logger.info(f"Datos Excel cargados. Registros: {len(df)}")
         return df
@@ -114,26 +138,30 @@ def load_excel_data():
         raise
 
 
+def _parse_xml(xml_path):
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
+
+    data = []
+    for item in root.findall('industry'):
+        record = {
+            'industry_id': item.find('id').text,
+            'industry_name': item.find('name').text,
+            'growth_rate': float(item.find('growth_rate').text),
+            'avg_salary': float(item.find('avg_salary').text)
+        }
+        data.append(record)
+
+    return pd.DataFrame(data)
+
+
+@instrument
 def load_xml_data():
     """Carga datos adicionales desde archivo XML"""
     xml_path = DATA_SOURCES_DIR / "industry_data.xml"
     try:
         logger.info(f"Cargando datos XML desde: {xml_path}")
-
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-
-        data = []
-        for item in root.findall('industry'):
-            record = {
-                'industry_id': item.find('id').text,
-                'industry_name': item.find('name').text,
-                'growth_rate': float(item.find('growth_rate').text),
-                'avg_salary': float(item.find('avg_salary').text)
-            }
-            data.append(record)
-
-        df = pd.DataFrame(data)
+        df = _load_source(xml_path, _parse_xml)
         logger.info(f"Datos XML cargados. Registros: {len(df)}")
         return df
     except Exception as e:
@@ -141,8 +169,43 @@ def load_xml_data():
         raise
 
 
-def enrich_data(base_df):
-    """Realiza el proceso de enriquecimiento con todas las fuentes"""
+# Fuentes de enriquecimiento en orden de aplicación: cargador, columna clave
+# de la fuente, normalizador de la clave, columna base de la que sale la
+# clave (la de industria la aporta companies_info.json) y columna de
+# puntuación si la fuente admite coincidencias aproximadas
+ENRICHMENT_SOURCES = {
+    'companies_info.json': (load_json_data, 'name', company_key, 'company_name', None),
+    'salary_ranges.csv': (load_csv_data, 'job_title', title_key, 'title', 'salary_match_score'),
+    'locations.xlsx': (load_excel_data, 'city', location_key, 'location', 'location_match_score'),
+    'industry_data.xml': (load_xml_data, 'industry_id', text_key, 'industry', None),
+}
+
+
+def operation_message(source, info):
+    """Línea de operaciones del reporte para una fuente"""
+    if 'fuzzy_matches' in info:
+        exact = info['matched_records'] - info['fuzzy_matches']
+        return (f"Lookup con {source}: {info['matched_records']} registros coincidentes "
+                f"({exact} exactos, {info['fuzzy_matches']} aproximados)")
+    return f"Lookup con {source}: {info['matched_records']} registros coincidentes"
+
+
+@instrument
+def enrich_data(base_df, sources=None, fuzzy=True, source_frames=None, lookup_tables=None,
+                optimize=True):
+    """Realiza el proceso de enriquecimiento con todas las fuentes.
+
+    ``sources`` limita el enriquecimiento a las fuentes indicadas; las demás
+    no se cargan. Con ``fuzzy`` las fuentes que lo admiten (salarios y
+    ubicaciones) completan con coincidencias aproximadas las claves que no
+    coinciden exactamente y añaden una columna con la puntuación.
+    ``source_frames`` permite pasar fuentes ya cargadas (por nombre), por
+    ejemplo cuando el orquestador las carga en paralelo con la limpieza.
+    ``lookup_tables`` es un diccionario donde se guardan (y reutilizan) las
+    tablas indexadas, útil al enriquecer varias particiones seguidas.
+    Con ``optimize`` el resultado pasa por ``optimize_dtypes`` y el reporte
+    incluye la memoria por columna antes y después.
+    """
     enrichment_report = {
         'base_records': len(base_df),
         'sources': {},
@@ -150,79 +213,60 @@ def enrich_data(base_df):
     }
 
     try:
-        # 1. Enriquecer con información de empresas (JSON)
-        companies_df = load_json_data()
-        enriched_df = pd.merge(
-            base_df,
-            companies_df,
-            left_on='company_name',
-            right_on='name',
-            how='left'
-        )
-        matches = len(enriched_df[~enriched_df['name'].isna()])
-        enrichment_report['sources']['companies_info.json'] = {
-            'matched_records': matches,
-            'new_columns': list(companies_df.columns.difference(base_df.columns))
-        }
-        enrichment_report['operations'].append(
-            f"Merge con companies_info.json: {matches} registros coincidentes"
-        )
-
-        # 2. Enriquecer con rangos salariales (CSV)
-        salary_df = load_csv_data()
-        enriched_df = pd.merge(
-            enriched_df,
-            salary_df,
-            left_on='title',
-            right_on='job_title',
-            how='left'
-        )
-        matches = len(enriched_df[~enriched_df['job_title'].isna()])
-        enrichment_report['sources']['salary_ranges.csv'] = {
-            'matched_records': matches,
-            'new_columns': list(salary_df.columns.difference(enriched_df.columns))
-        }
-        enrichment_report['operations'].append(
-            f"Merge con salary_ranges.csv: {matches} registros coincidentes"
-        )
-
-        # 3. Enriquecer con ubicaciones (Excel)
-        locations_df = load_excel_data()
-        enriched_df = enriched_df.merge(
-            locations_df,
-            left_on='location',
-            right_on='city',
-            how='left'
-        )
-        matches = len(enriched_df[~enriched_df['city'].isna()])
-        enrichment_report['sources']['locations.xlsx'] = {
-            'matched_records': matches,
-            'new_columns': list(locations_df.columns.difference(enriched_df.columns))
-        }
-        enrichment_report['operations'].append(
-            f"Merge con locations.xlsx: {matches} registros coincidentes"
-        )
-
-        # 4. Enriquecer con datos de industria (XML)
-        industry_df = load_xml_data()
-        enriched_df = enriched_df.merge(
-            industry_df,
-            left_on='industry',
-            right_on='industry_id',
-            how='left'
-        )
-        matches = len(enriched_df[~enriched_df['industry_id'].isna()])
-        enrichment_report['sources']['industry_data.xml'] = {
-            'matched_records': matches,
-            'new_columns': list(industry_df.columns.difference(enriched_df.columns))
-        }
-        enrichment_report['operations'].append(
-            f"Merge con industry_data.xml: {matches} registros coincidentes"
-        )
-
-        # Limpieza post-enriquecimiento
-        enriched_df.drop(columns=['name', 'job_title', 'city',
-                         'industry_id'], inplace=True, errors='ignore')
+        new_columns = {}
+        for source, (loader, key_column, key_func, base_column, score_column) in ENRICHMENT_SOURCES.items():
+            if sources is not None and source not in sources:
+                continue
+            if base_column in base_df.columns:
+                base_values = base_df[base_column]
+            elif base_column in new_columns:
+                base_values = pd.Series(new_columns[base_column], index=base_df.index, dtype=object)
+            else:
+                logger.warning(f"Se omite {source}: falta la columna {base_column}")
+                continue
+
+            # Cada merge se mide como una etapa (filas coincidentes como salida)
+            with stage(f"enrichement.merge[{source}]", rows_in=len(base_df)) as record:
+                # La fuente se carga (vía caché) solo cuando se necesita y se
+                # indexa una vez por su clave canónica
+                table = (lookup_tables or {}).get(source)
+                if table is None:
+                    source_df = (source_frames or {}).get(source)
+                    if source_df is None:
+                        source_df = loader()
+                    table = LookupTable.from_frame(source, source_df, key_column, key_func)
+                    if lookup_tables is not None:
+                        lookup_tables[source] = table
+                use_fuzzy = fuzzy and score_column is not None
+                keys = key_func(base_values)
+                # Las exactas se cuentan antes del respaldo aproximado: una
+                # coincidencia aproximada también puede puntuar 1.0
+                exact_positions = table.positions(keys)
+                exact_matches = int((exact_positions >= 0).sum())
+                positions, scores = table.match(keys, fuzzy=use_fuzzy, positions=exact_positions)
+                matches = int((positions >= 0).sum())
+                added = [col for col in table.columns
+                         if col not in base_df.columns and col not in new_columns]
+                new_columns.update({col: values for col, values in table.gather(positions).items()
+                                    if col in added})
+                if use_fuzzy:
+                    new_columns[score_column] = scores
+                    added.append(score_column)
+                enrichment_report['sources'][source] = {
+                    'matched_records': matches,
+                    'new_columns': added
+                }
+                if use_fuzzy:
+                    enrichment_report['sources'][source]['fuzzy_matches'] = matches - exact_matches
+                enrichment_report['operations'].append(
+                    operation_message(source, enrichment_report['sources'][source])
+                )
+                record['rows_out'] = matches
+
+        # Ensamblado del resultado en una sola asignación
+        enriched_df = assemble(base_df, new_columns)
+        if optimize:
+            enriched_df, enrichment_report['memory_usage'] = optimize_dtypes(enriched_df)
 
         enrichment_report['final_records'] = len(enriched_df)
         enrichment_report['new_columns_total'] = len(
@@ -236,18 +280,33 @@ def enrich_data(base_df):
         raise
 
 
+@instrument
 def generate_artifacts(enriched_df, report):
     """Genera los archivos de salida"""
     try:
-        # Guardar datos enriquecidos
-        enriched_df.to_excel(ENRICHED_DATA_PATH, index=False)
+        # Guardar datos enriquecidos (formato columnar) en segundo plano
+        # mientras se exportan la muestra en Excel y el reporte
+        with BackgroundWriter(StageWriter(ENRICHED_DATA_PATH)) as writer:
+            for chunk in iter_chunks(enriched_df):
+                writer.write(chunk)
+            export_xlsx_sample(enriched_df, ENRICHED_SAMPLE_PATH)
+            write_enrichment_report(enriched_df, report)
         logger.info(f"Datos enriquecidos guardados en: {ENRICHED_DATA_PATH}")
+        logger.info(f"Muestra de datos enriquecidos guardada en: {ENRICHED_SAMPLE_PATH}")
+
+    except Exception as e:
+        logger.error(f"Error al generar artefactos: {str(e)}")
+        raise
+
 
-        # Generar reporte de auditoría
+@instrument
+def write_enrichment_report(enriched_df, report, base_path=None):
+    """Genera el reporte de auditoría del enriquecimiento"""
+    try:
         report_content = [
             "=== REPORTE DE ENRIQUECIMIENTO DE DATOS ===",
             f"Fecha de generación: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            f"Dataset base: {CLEANED_DATA_PATH}",
+            f"Dataset base: {base_path or CLEANED_DATA_PATH}",
             f"Registros iniciales: {report['base_records']}",
             f"Registros finales: {report['final_records']}",
             f"Columnas añadidas: {report['new_columns_total']}",
@@ -259,10 +318,20 @@ def generate_artifacts(enriched_df, report):
             report_content.extend([
                 f"Fuente: {source}",
                 f"- Registros coincidentes: {info['matched_records']}",
+            ])
+            if 'fuzzy_matches' in info:
+                report_content.append(f"- Coincidencias aproximadas: {info['fuzzy_matches']}")
+            report_content.extend([
                 f"- Columnas añadidas: {', '.join(info['new_columns'])}",
                 ""
             ])
 
+        if 'memory_usage' in report:
+            report_content.extend(
+                ["=== MEMORIA POR COLUMNA (antes -> después de optimizar tipos) ==="]
+                + memory_report_lines(report['memory_usage']) + [""]
+            )
+
         report_content.extend([
             "=== OPERACIONES REALIZADAS ==="
         ] + report['operations'] + [
@@ -274,19 +343,42 @@ def generate_artifacts(enriched_df, report):
             f"Columnas añadidas: {report['new_columns_total']}"
         ])
 
-        with open(AUDIT_PATH, 'w', encoding='utf-8') as f:
-            f.write("\n".join(report_content))
+        write_report(AUDIT_PATH, "\n".join(report_content))
 
         logger.info(f"Reporte de auditoría generado en: {AUDIT_PATH}")
 
     except Exception as e:
-        logger.error(f"Error al generar artefactos: {str(e)}")
+        logger.error(f"Error al generar el reporte: {str(e)}")
         raise
 
 
-def main():
+def cache_key(clean_fingerprint=None, fuzzy=True):
+    """Clave de la caché de etapas: datos limpios y fuentes de referencia.
+
+    ``clean_fingerprint`` identifica los datos limpios; por defecto es el
+    hash de ``CLEANED_DATA_PATH`` (el pipeline pasa la clave de la limpieza).
+    """
+    return STAGE_CACHE.key("enrichment", {
+        "clean": clean_fingerprint or file_fingerprint(CLEANED_DATA_PATH),
+        "references": {name: file_fingerprint(DATA_SOURCES_DIR / name)
+                       for name in ENRICHMENT_SOURCES},
+        "fuzzy": fuzzy,
+    })
+
+
+def cache_outputs():
+    """Artefactos del enriquecimiento que guarda la caché"""
+    return [ENRICHED_DATA_PATH, ENRICHED_SAMPLE_PATH, AUDIT_PATH]
+
+
+def main(use_cache=True):
     try:
         logger.info("Iniciando proceso de enriquecimiento de datos")
+        if use_cache:
+            key = cache_key()
+            if STAGE_CACHE.restore(key, cache_outputs()):
+                logger.info("Proceso de enriquecimiento completado (resultado en caché)")
+                return 0
 
         # 1. Cargar datos base
         base_df = load_clean_data()
@@ -296,6 +388,8 @@ def main():
 
         # 3. Generar artefactos
         generate_artifacts(enriched_df, enrichment_report)
+        if use_cache:
+            STAGE_CACHE.store(key, "enrichment", cache_outputs())
 
         logger.info("Proceso de enriquecimiento completado exitosamente")
         return 0
@@ -306,11 +400,20 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enriquecimiento de los datos limpios")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recalcula aunque las entradas no hayan cambiado")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    config.setup(log_file="enrichment.log")
+
     # Debug: mostrar información de rutas
     logger.info(f"Directorio base: {BASE_DIR}")
     logger.info(f"Directorio de fuentes: {DATA_SOURCES_DIR}")
     logger.info(f"Ruta de datos limpios: {CLEANED_DATA_PATH}")
     logger.info(f"Ruta de salida enriquecida: {ENRICHED_DATA_PATH}")
 
-    exit_code = main()
+    with record_run("enrichment", args.trace_memory, args.profile) as metrics_run:
+        exit_code = main(use_cache=not args.no_cache)
+        metrics_run.status = "ok" if exit_code == 0 else "error"
     exit(exit_code)
@@ -0,0 +1,250 @@
+"""Limpieza + enriquecimiento incrementales (captura de cambios por marca de agua).
+
+Cada ejecución procesa solo las ofertas de ``jobs`` con ``id`` mayor que la
+marca de agua de la ejecución anterior y escribe el resultado como una parte
+nueva (``part-<primer id>-<último id>.parquet``) en las carpetas de partes de
+datos limpios y enriquecidos, así que el coste crece con las ofertas nuevas y
+no con el histórico.
+
+El manifiesto (``_manifest.json`` en la carpeta de partes enriquecidas)
+guarda la marca de agua, las partes escritas, la clave de duplicados y las
+firmas de las fuentes de referencia y de las reglas de limpieza. La
+deduplicación entre ejecuciones usa un índice persistente propio de las
+partes, de modo que una oferta repetida en una ejecución posterior se
+descarta igual que en una limpieza completa.
+
+Las medianas y modas de relleno se calculan sobre el lote nuevo. La recarga
+completa (``--full-refresh``) borra las partes y vuelve a procesar la tabla
+entera; se aplica sola si cambian las fuentes de referencia, las reglas de
+limpieza o la clave de duplicados. Las ofertas ya procesadas que el API
+actualice no cambian su ``id``: para reflejarlas también hace falta una
+recarga completa.
+
+Uso: python src/incremental.py [--full-refresh] [--dedup-key url]
+"""
+import argparse
+import json
+import logging
+import shutil
+import sys
+from pathlib import Path
+
+import cleaning
+import config
+import enrichement
+import rules
+import storage
+from dedup import DEFAULT_DEDUP_KEY, DedupIndex, new_run_id
+from dtypes import optimize_dtypes
+from lazy import lazy_import
+from metrics import add_arguments as add_metrics_arguments, instrument, record_run
+from profiling import profile_stage
+from stage_io import (CLEANED_JOBS_SCHEMA, DEFAULT_STAGE_FORMAT, export_xlsx_sample, read_stage,
+                      stage_path, write_stage)
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_PARTS_DIR = config.active_config().cleaned_dir / "parts"
+ENRICHED_PARTS_DIR = config.active_config().enriched_dir / "parts"
+# El prefijo "_" hace que pyarrow ignore estos archivos al leer la carpeta como dataset
+MANIFEST_NAME = "_manifest.json"
+DEDUP_INDEX_NAME = "_dedup_index.db"
+
+
+def file_signature(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def reference_fingerprints():
+    """Firmas (tamaño y mtime) de las fuentes de referencia del enriquecimiento"""
+    return {
+        name: file_signature(enrichement.DATA_SOURCES_DIR / name)
+        for name in enrichement.ENRICHMENT_SOURCES
+    }
+
+
+def part_name(first_id, last_id):
+    return stage_path(f"part-{first_id:012d}-{last_id:012d}", DEFAULT_STAGE_FORMAT).name
+
+
+def load_manifest(parts_dir=ENRICHED_PARTS_DIR):
+    try:
+        with open(Path(parts_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(manifest, parts_dir=ENRICHED_PARTS_DIR):
+    path = Path(parts_dir) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(path)
+
+
+def _write_part(df, path, schema=None):
+    # write_stage escribe a un temporal y renombra: una parte nunca queda a medias
+    write_stage(df, path, fmt=DEFAULT_STAGE_FORMAT, schema=schema)
+
+
+def _remove_unlisted_parts(manifest, parts_dirs):
+    """Borra partes de una ejecución que falló antes de guardar el manifiesto"""
+    listed = {part["name"] for part in manifest["parts"]}
+    for parts_dir in parts_dirs:
+        for path in Path(parts_dir).glob("part-*"):
+            if path.name not in listed:
+                logger.warning(f"Se elimina la parte sin registrar: {path}")
+                path.unlink()
+
+
+def _remove_unlisted_runs(manifest, dedup_index):
+    """Borra del índice los hashes de ejecuciones que no llegaron al manifiesto"""
+    removed = dedup_index.retain_runs(part["run_id"] for part in manifest["parts"])
+    if removed:
+        logger.warning(f"Se eliminan {removed} claves de ejecuciones sin registrar")
+
+
+def reset_parts(cleaned_dir=CLEANED_PARTS_DIR, enriched_dir=ENRICHED_PARTS_DIR):
+    """Elimina partes, manifiesto e índice de duplicados (recarga completa)"""
+    for parts_dir in (cleaned_dir, enriched_dir):
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def read_parts(parts_dir=ENRICHED_PARTS_DIR, manifest_dir=ENRICHED_PARTS_DIR):
+    """Une las partes registradas en el manifiesto, en orden de ``id``"""
+    manifest = load_manifest(manifest_dir)
+    parts = [read_stage(Path(parts_dir) / part["name"])
+             for part in (manifest["parts"] if manifest else [])]
+    if not parts:
+        return pd.DataFrame()
+    df, _ = optimize_dtypes(pd.concat(parts, ignore_index=True))
+    return df
+
+
+def _refresh_reason(manifest, dedup_key, references, full_refresh):
+    if full_refresh:
+        return "solicitada"
+    if manifest is None:
+        return None
+    if manifest["references"] != references:
+        return "cambiaron las fuentes de referencia"
+    if manifest["dedup_key"] != dedup_key:
+        return f"cambió la clave de duplicados ({manifest['dedup_key']} -> {dedup_key})"
+    if manifest.get("rules") != file_signature(rules.RULES_PATH):
+        return "cambiaron las reglas de limpieza"
+    return None
+
+
+@instrument
+def process_increment(full_refresh=False, dedup_key=DEFAULT_DEDUP_KEY, fuzzy=True,
+                      source_frames=None, load_sources=None, cleaned_dir=CLEANED_PARTS_DIR,
+                      enriched_dir=ENRICHED_PARTS_DIR):
+    """Limpia y enriquece las ofertas nuevas desde la última marca de agua.
+
+    ``source_frames`` permite pasar las fuentes de referencia ya cargadas
+    (como ``enrich_data``); ``load_sources`` es la alternativa perezosa: una
+    función que las devuelve y que solo se llama si hay ofertas nuevas.
+    Devuelve la parte enriquecida de esta ejecución (``None`` si no había
+    ofertas nuevas).
+    """
+    if not cleaning.DB_PATH.exists():
+        raise FileNotFoundError(f"La base de datos no existe en {cleaning.DB_PATH}")
+    cleaned_dir, enriched_dir = Path(cleaned_dir), Path(enriched_dir)
+
+    manifest = load_manifest(enriched_dir)
+    references = reference_fingerprints()
+    reason = _refresh_reason(manifest, dedup_key, references, full_refresh)
+    if reason:
+        logger.info(f"Recarga completa: {reason}")
+        reset_parts(cleaned_dir, enriched_dir)
+        manifest = None
+    if manifest is None:
+        manifest = {"watermark": 0, "dedup_key": dedup_key, "references": references,
+                    "rules": file_signature(rules.RULES_PATH), "parts": []}
+    _remove_unlisted_parts(manifest, (cleaned_dir, enriched_dir))
+    with DedupIndex(enriched_dir / DEDUP_INDEX_NAME, key=dedup_key) as dedup_index:
+        _remove_unlisted_runs(manifest, dedup_index)
+
+    watermark = manifest["watermark"]
+    conn = storage.get_connection(cleaning.DB_PATH)
+    last_id = conn.execute("SELECT MAX(id) FROM jobs").fetchone()[0] or 0
+    if last_id <= watermark:
+        logger.info(f"Sin ofertas nuevas desde el id {watermark}")
+        return None
+
+    # Rango sobre la clave primaria: solo se leen las filas nuevas
+    df, memory_usage = optimize_dtypes(storage.read_jobs(
+        where="id > ? AND id <= ?", params=(watermark, last_id), path=cleaning.DB_PATH,
+    ))
+    logger.info(f"Procesando {len(df)} ofertas nuevas (id {watermark + 1} a {last_id})")
+    analysis = cleaning.analyze_data(df, memory_usage)
+    if load_sources is not None:
+        source_frames = load_sources()
+
+    run_id = new_run_id()
+    with DedupIndex(enriched_dir / DEDUP_INDEX_NAME, key=dedup_key) as dedup_index:
+        try:
+            clean_df, cleaning_report = cleaning.clean_data(df, dedup_key, dedup_index, run_id)
+            enriched_df, enrichment_report = enrichement.enrich_data(
+                clean_df, fuzzy=fuzzy, source_frames=source_frames
+            )
+
+            name = part_name(watermark + 1, last_id)
+            cleaned_path, enriched_path = cleaned_dir / name, enriched_dir / name
+            cleaned_dir.mkdir(parents=True, exist_ok=True)
+            _write_part(clean_df, cleaned_path, schema=CLEANED_JOBS_SCHEMA)
+            _write_part(enriched_df, enriched_path)
+            # El manifiesto se guarda al final: hasta entonces la ejecución no cuenta
+            manifest["parts"].append({
+                "name": name, "first_id": watermark + 1, "last_id": last_id,
+                "records": len(enriched_df), "run_id": run_id,
+            })
+            manifest["watermark"] = last_id
+            save_manifest(manifest, enriched_dir)
+        except BaseException:
+            # También ante KeyboardInterrupt/SystemExit; si el proceso muere sin
+            # llegar aquí, _remove_unlisted_runs limpia en la siguiente ejecución
+            dedup_index.discard_run(run_id)
+            raise
+
+    # Muestras y reportes del lote procesado
+    export_xlsx_sample(clean_df, cleaning.CLEANED_SAMPLE_PATH)
+    cleaning.write_cleaning_report(analysis, cleaning_report, profile_stage(cleaned_path))
+    export_xlsx_sample(enriched_df, enrichement.ENRICHED_SAMPLE_PATH)
+    enrichement.write_enrichment_report(enriched_df, enrichment_report, base_path=cleaned_path)
+    logger.info(f"Parte guardada en: {enriched_path} "
+                f"({len(manifest['parts'])} partes, marca de agua {last_id})")
+    return enriched_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Limpieza y enriquecimiento incrementales")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Borra las partes y vuelve a procesar la tabla completa")
+    parser.add_argument("--dedup-key", default=DEFAULT_DEDUP_KEY,
+                        help="Clave de duplicados: url, posting o columnas separadas por coma")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    config.setup(log_file="incremental.log")
+
+    try:
+        with record_run("incremental", args.trace_memory, args.profile):
+            process_increment(full_refresh=args.full_refresh, dedup_key=args.dedup_key)
+        logger.info("Proceso incremental completado exitosamente")
+        return 0
+    except Exception:
+        logger.exception("Error en el proceso incremental")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,111 @@
-import requests
-import sqlite3
-import pandas as pd
+import argparse
+import queue
+import threading
 from pathlib import Path
 
-# Configuración de rutas
+import config
+import storage
+from lazy import lazy_import
+from metrics import add_arguments as add_metrics_arguments, instrument, record_run
+from stage_io import export_xlsx_sample, write_report
+
+# requests y urllib3 solo se cargan al crear la sesión HTTP
+requests = lazy_import("requests")
+requests_adapters = lazy_import("requests.adapters")
+urllib3_retry = lazy_import("urllib3.util.retry")
+
+# Configuración de rutas (ver config.py)
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "static" / "db" / "ingestion.db"
-AUDIT_PATH = BASE_DIR / "static" / "auditoria" / "ingestion.txt"
-SAMPLE_PATH = BASE_DIR / "static" / "xlsx" / "ingestion.xlsx"
+DB_PATH = storage.DB_PATH
+AUDIT_PATH = config.active_config().audit_dir / "ingestion.txt"
+SAMPLE_PATH = config.active_config().xlsx_dir / "ingestion.xlsx"
 
 # Configuración de la API de Arbeitnow
 ARBEITNOW_API_URL = "https://www.arbeitnow.com/api/job-board-api"
 
+# Columnas de la tabla jobs (sin el id autoincremental)
+JOB_COLUMNS = ("title", "company_name", "location", "remote", "url")
+# Clave natural de una oferta: la URL es única por publicación en Arbeitnow
+NATURAL_KEY = "url"
+# Nombre de la marca de agua persistida en ingestion_state
+HIGH_WATER_MARK_KEY = "last_created_at"
+
+# Reintentos del cliente HTTP: códigos transitorios y backoff exponencial
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+REQUEST_TIMEOUT = 30
+
+# Escritura en streaming: páginas en vuelo y tamaño de cada transacción
+QUEUE_MAX_PAGES = 4
+WRITE_BATCH_SIZE = 500
+# Límite conservador de parámetros por sentencia en SQLite
+SQLITE_MAX_PARAMS = 900
+_END_OF_STREAM = object()
+
 # 1. Extraer datos del API de Arbeitnow
-def fetch_data_from_api():
-    response = requests.get(ARBEITNOW_API_URL)
-    if response.status_code == 200:
-        return response.json()["data"]
-    else:
-        raise Exception(f"Error al conectar al API: {response.status_code}")
+def create_session(max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_size=4):
+    """Crea una sesión HTTP con pool de conexiones y reintentos con backoff"""
+    retry = urllib3_retry.Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = requests_adapters.HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def iter_job_batches(url=ARBEITNOW_API_URL, session=None, high_water_mark=None, max_pages=None):
+    """Recorre todas las páginas del API siguiendo ``links.next``.
+
+    Genera una lista de ofertas por página, de modo que la escritura puede
+    empezar mientras se descargan las siguientes. El API devuelve primero las
+    ofertas más recientes: si una página completa es anterior a la marca de
+    agua, las siguientes ya fueron ingeridas y se detiene la paginación. Por
+    eso una oferta antigua editada en el API solo se actualiza si está en
+    una página recorrida; una ejecución completa (``incremental=False`` en
+    ``ingest_from_api``) las revisa todas.
+    """
+    own_session = session is None
+    if own_session:
+        session = create_session()
+    try:
+        pages = 0
+        while url:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 200:
+                raise Exception(f"Error al conectar al API: {response.status_code}")
+            payload = response.json()
+            batch = payload.get("data", [])
+            yield batch
+
+            pages += 1
+            if max_pages is not None and pages >= max_pages:
+                break
+            if high_water_mark is not None and batch and all(
+                job.get("created_at") is not None and job["created_at"] < high_water_mark
+                for job in batch
+            ):
+                break
+            url = (payload.get("links") or {}).get("next")
+    finally:
+        if own_session:
+            session.close()
+
+@instrument
+def fetch_data_from_api(url=ARBEITNOW_API_URL, session=None):
+    """Descarga todas las páginas del API y devuelve la lista completa de ofertas"""
+    return [job for batch in iter_job_batches(url, session=session) for job in batch]
 
 # 2. Crear y almacenar datos en SQLite
+@instrument
 def create_database():
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.get_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
@@ -34,49 +117,241 @@ def create_database():
             url TEXT NOT NULL
         )
     """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    # Las ejecuciones anteriores insertaban todo el payload en cada corrida;
+    # se conserva la primera aparición de cada URL antes de crear el índice único
+    cursor.execute("""
+        DELETE FROM jobs
+        WHERE id NOT IN (SELECT MIN(id) FROM jobs GROUP BY url)
+    """)
     conn.commit()
-    conn.close()
+    # Índice único de la URL (clave del upsert); los de consulta se crean tras la carga
+    storage.ensure_indexes(conn, indexes=storage.KEY_INDEXES)
+    # Versión de la tabla para la caché de etapas
+    storage.ensure_table_version(conn)
+
+def get_high_water_mark():
+    """Devuelve la marca de agua (created_at máximo ingerido) o None"""
+    row = storage.get_connection(DB_PATH).execute(
+        "SELECT value FROM ingestion_state WHERE key = ?", (HIGH_WATER_MARK_KEY,)
+    ).fetchone()
+    return int(row[0]) if row else None
+
+def save_high_water_mark(high_water_mark, conn=None):
+    """Guarda la marca de agua si es mayor que la actual.
+
+    Solo se llama cuando el recorrido de páginas terminó: si una ejecución
+    falla a medias, la siguiente debe volver a recorrer las páginas que
+    faltaron en lugar de detenerse en una marca que no las cubre.
+    """
+    conn = conn or storage.get_connection(DB_PATH)
+    with conn:
+        conn.execute(
+            "INSERT INTO ingestion_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value "
+            "WHERE CAST(excluded.value AS INTEGER) > CAST(value AS INTEGER)",
+            (HIGH_WATER_MARK_KEY, str(high_water_mark)),
+        )
 
+def _max_created_at(jobs, current=None):
+    timestamps = [job["created_at"] for job in jobs if job.get("created_at") is not None]
+    if current is not None:
+        timestamps.append(current)
+    return max(timestamps) if timestamps else None
+
+def _job_to_row(job):
+    return tuple(job[col] for col in JOB_COLUMNS)
+
+def _existing_keys(conn, keys):
+    """Devuelve las claves naturales de ``keys`` que ya existen en jobs"""
+    found = set()
+    keys = list(keys)
+    for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+        chunk = keys[start:start + SQLITE_MAX_PARAMS]
+        placeholders = ", ".join("?" for _ in chunk)
+        found.update(row[0] for row in conn.execute(
+            f"SELECT {NATURAL_KEY} FROM jobs WHERE {NATURAL_KEY} IN ({placeholders})", chunk
+        ))
+    return found
+
+@instrument(name="ingesta.upsert_batch", rows_arg=1)
+def _upsert_jobs(conn, data):
+    """Aplica el upsert de un lote sobre una conexión abierta (una transacción).
+
+    Las ofertas sin cambios no se reescriben (``WHERE`` del upsert), así que
+    también las anteriores a la marca de agua se comparan: si el API las
+    editó, se actualizan.
+    """
+    update_columns = [col for col in JOB_COLUMNS if col != NATURAL_KEY]
+    assignments = ", ".join(f"{col} = excluded.{col}" for col in update_columns)
+    changed = " OR ".join(f"{col} IS NOT excluded.{col}" for col in update_columns)
+    upsert_sql = f"""
+        INSERT INTO jobs ({", ".join(JOB_COLUMNS)})
+        VALUES ({", ".join("?" for _ in JOB_COLUMNS)})
+        ON CONFLICT({NATURAL_KEY}) DO UPDATE SET {assignments}
+        WHERE {changed}
+    """
+
+    with conn:  # una sola transacción para todo el lote
+        keys = {job[NATURAL_KEY] for job in data}
+        # Conteo por clave usando el índice único, sin recorrer la tabla completa
+        inserted = len(keys - _existing_keys(conn, keys))
+        cursor = conn.executemany(upsert_sql, (_job_to_row(job) for job in data))
+        written = max(cursor.rowcount, 0)
+
+    return {
+        "received": len(data),
+        "inserted": inserted,
+        "updated": written - inserted,
+        "unchanged": len(data) - written,
+    }
+
+@instrument
 def insert_data_into_db(data):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    for job in data:
-        cursor.execute("""
-            INSERT INTO jobs (title, company_name, location, remote, url)
-            VALUES (?, ?, ?, ?, ?)
-        """, (job["title"], job["company_name"], job["location"], job["remote"], job["url"]))
-    conn.commit()
-    conn.close()
+    """Inserta o actualiza las ofertas usando la URL como clave natural.
+
+    Devuelve un diccionario con los conteos ``inserted``, ``updated`` y
+    ``unchanged``. No mueve la marca de agua: eso lo hace ``ingest_from_api``
+    al terminar el recorrido.
+    """
+    return _upsert_jobs(storage.get_connection(DB_PATH), data)
+
+def _db_writer(pages, stats, errors, batch_size):
+    """Hilo escritor: consume páginas de la cola y confirma lotes de ``batch_size``"""
+    conn = None
+    buffer = []
+    done = False
+    try:
+        # Conexión propia: vive lo que vive el hilo escritor
+        conn = storage.connect(DB_PATH)
+        while True:
+            page = pages.get()
+            if page is _END_OF_STREAM:
+                done = True
+                break
+            if errors:
+                continue  # se drena la cola para no bloquear al productor
+            buffer.extend(page)
+            while len(buffer) >= batch_size:
+                _accumulate(stats, _upsert_jobs(conn, buffer[:batch_size]))
+                del buffer[:batch_size]
+        if buffer and not errors:
+            _accumulate(stats, _upsert_jobs(conn, buffer))
+    except Exception as e:
+        errors.append(e)
+        # Si el fallo fue en el último lote el fin de la cola ya se consumió
+        while not done and pages.get() is not _END_OF_STREAM:
+            pass
+    finally:
+        if conn is not None:
+            conn.close()
+
+def _accumulate(stats, batch_stats):
+    for key, value in batch_stats.items():
+        stats[key] += value
 
 # 3. Generar archivo de muestra con Pandas
+@instrument
 def generate_sample_file():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM jobs LIMIT 10", conn)  # Muestra de 10 registros
-    df.to_excel(SAMPLE_PATH, index=False)
-    conn.close()
+    df = storage.query("SELECT * FROM jobs LIMIT 10", path=DB_PATH)  # Muestra de 10 registros
+    export_xlsx_sample(df, SAMPLE_PATH)
+
+@instrument
+def ingest_from_api(url=ARBEITNOW_API_URL, session=None, incremental=True,
+                    batch_size=WRITE_BATCH_SIZE, queue_size=QUEUE_MAX_PAGES):
+    """Ingesta en streaming: descarga páginas y las escribe en un hilo aparte.
+
+    Las páginas pasan por una cola acotada (``queue_size``) hacia el hilo
+    escritor, que confirma transacciones de ``batch_size`` ofertas. La memoria
+    queda limitada a unas pocas páginas sin importar el volumen total.
+
+    Con ``incremental`` la paginación se detiene en la marca de agua de la
+    ejecución anterior. La marca nueva se guarda una sola vez, cuando todas
+    las páginas se descargaron y escribieron sin errores. Devuelve los
+    conteos acumulados de la ejecución.
+    """
+    high_water_mark = get_high_water_mark() if incremental else None
+    stats = {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    errors = []
+    pages = queue.Queue(maxsize=queue_size)
+    writer = threading.Thread(
+        target=_db_writer,
+        args=(pages, stats, errors, batch_size),
+        name="ingestion-writer",
+    )
+    writer.start()
+    newest = None
+    try:
+        for batch in iter_job_batches(url, session=session, high_water_mark=high_water_mark):
+            if errors:
+                break
+            newest = _max_created_at(batch, newest)
+            pages.put(batch)
+    finally:
+        pages.put(_END_OF_STREAM)
+        writer.join()
+    if errors:
+        raise errors[0]
+    if newest is not None:
+        save_high_water_mark(newest)
+    # Índices de empresa y ubicación (solo se construyen si aún no existen)
+    storage.ensure_indexes(storage.get_connection(DB_PATH))
+    return stats
+
+def count_jobs():
+    """Cuenta los registros de jobs sin materializar la tabla"""
+    return storage.get_connection(DB_PATH).execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+def count_distinct(columns=("company_name", "location")):
+    """Valores distintos por columna, resueltos sobre los índices de SQLite"""
+    selects = ", ".join(f"COUNT(DISTINCT {col})" for col in columns)
+    row = storage.get_connection(DB_PATH).execute(f"SELECT {selects} FROM jobs").fetchone()
+    return dict(zip(columns, row))
 
 # 4. Generar archivo de auditoría
-def generate_audit_file(api_data):
-    conn = sqlite3.connect(DB_PATH)
-    db_data = pd.read_sql_query("SELECT * FROM jobs", conn)
-    conn.close()
+@instrument
+def generate_audit_file(stats, stored_before):
+    """Reporte de la ejecución.
 
-    with open(AUDIT_PATH, "w") as file:
-        file.write(f"Registros extraídos del API: {len(api_data)}\n")
-        file.write(f"Registros almacenados en la base de datos: {len(db_data)}\n")
-        file.write("Comparación de integridad: OK\n" if len(api_data) == len(db_data) else "Comparación de integridad: ERROR\n")
+    La comparación de integridad contrasta los insertados que contó el upsert
+    con lo que creció la tabla (``stored_before`` es ``count_jobs()`` antes de
+    la ingesta): un lote perdido o contado dos veces da ERROR.
+    """
+    stored = count_jobs()
+    distinct = count_distinct()
+    integrity = "OK" if stored - stored_before == stats["inserted"] else "ERROR"
+    write_report(AUDIT_PATH, "".join([
+        f"Registros extraídos del API: {stats['received']}\n",
+        f"Registros insertados: {stats['inserted']}\n",
+        f"Registros actualizados: {stats['updated']}\n",
+        f"Registros sin cambios: {stats['unchanged']}\n",
+        f"Registros almacenados en la base de datos: {stored} (antes: {stored_before})\n",
+        f"Empresas distintas: {distinct['company_name']}\n",
+        f"Ubicaciones distintas: {distinct['location']}\n",
+        f"Comparación de integridad: {integrity}\n",
+    ]))
 
 # Ejecución principal
 if __name__ == "__main__":
-    # Extraer datos del API
-    api_data = fetch_data_from_api()
-
-    # Crear base de datos e insertar datos
-    create_database()
-    insert_data_into_db(api_data)
+    parser = argparse.ArgumentParser(description="Ingesta de ofertas desde el API de Arbeitnow")
+    parser.add_argument("--full", action="store_true",
+                        help="Recorre todas las páginas aunque sean anteriores a la marca de agua")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    config.setup()
+    with record_run("ingesta", args.trace_memory, args.profile):
+        # Crear base de datos, extraer datos del API e insertarlos por páginas
+        create_database()
+        stored_before = count_jobs()
+        stats = ingest_from_api(incremental=not args.full)
 
-    # Generar archivos de evidencia
-    generate_sample_file()
-    generate_audit_file(api_data)
+        # Generar archivos de evidencia
+        generate_sample_file()
+        generate_audit_file(stats, stored_before)
 
     print("Proceso de ingesta completado con éxito.")
\ No newline at end of file
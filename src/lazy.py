@@ -0,0 +1,27 @@
+import importlib
+import threading
+import types
+
+# Las tareas del pipeline corren en hilos: si dos piden a la vez el mismo
+# módulo, uno podría verlo a medio inicializar. Se cargan de uno en uno.
+_import_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Módulo que se importa al usar por primera vez uno de sus atributos.
+
+    Tras la importación sus atributos se copian al proxy, así que los accesos
+    siguientes no pasan por ``__getattr__``.
+    """
+
+    def __getattr__(self, name):
+        with _import_lock:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def lazy_import(name):
+    """Equivalente diferido de ``import name``: pandas, numpy, pyarrow o
+    requests solo se cargan cuando una etapa los usa de verdad."""
+    return LazyModule(name)
@@ -0,0 +1,87 @@
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class LookupTable:
+    """Fuente de referencia indexada por una clave canónica.
+
+    Reemplaza a un ``pd.merge(how='left')``: en lugar de copiar el DataFrame
+    base en cada unión, se resuelve la posición de cada clave en el índice y
+    las columnas de la fuente se recogen con ``take``. Si la fuente repite una
+    clave se usa la primera fila, de modo que el número de registros base
+    nunca cambia.
+    """
+
+    def __init__(self, name, keys, values):
+        self.name = name
+        unique = ~keys.duplicated().to_numpy() & keys.notna().to_numpy()
+        self.index = pd.Index(keys[unique].to_numpy())
+        self.values = values[unique].reset_index(drop=True)
+        self._matcher = None
+
+    @classmethod
+    def from_frame(cls, name, df, key_column, key_func, drop_columns=()):
+        """Construye la tabla desde un DataFrame de referencia.
+
+        ``key_func`` genera la clave canónica a partir de ``key_column``; las
+        columnas aportadas son todas las demás salvo ``drop_columns``.
+        """
+        value_columns = [col for col in df.columns
+                         if col != key_column and col not in drop_columns]
+        return cls(name, key_func(df[key_column]), df[value_columns])
+
+    @property
+    def columns(self):
+        return list(self.values.columns)
+
+    def positions(self, keys):
+        """Posición de cada clave en la tabla (-1 si no hay coincidencia).
+
+        Se buscan solo los valores distintos y el resultado se expande por
+        sus códigos, así el coste de búsqueda depende de la cardinalidad.
+        """
+        codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+        found = np.append(self.index.get_indexer(uniques), -1)
+        return found.take(codes)
+
+    def match(self, keys, fuzzy=False, positions=None):
+        """Posiciones y puntuación de coincidencia para cada clave.
+
+        Las coincidencias exactas puntúan 1.0. Con ``fuzzy`` las claves sin
+        coincidencia exacta se resuelven con ``FuzzyMatcher`` contra las claves
+        de la tabla (el emparejador se construye una sola vez); una
+        coincidencia aproximada también puede puntuar 1.0. ``positions``
+        reutiliza el resultado de ``positions(keys)`` si ya se calculó.
+        """
+        positions = self.positions(keys) if positions is None else positions.copy()
+        scores = np.where(positions >= 0, 1.0, np.nan)
+        missing = positions < 0
+        if fuzzy and missing.any() and len(self.index):
+            if self._matcher is None:
+                from matching import FuzzyMatcher
+                self._matcher = FuzzyMatcher(self.index.to_numpy())
+            fuzzy_positions, fuzzy_scores = self._matcher.match(
+                pd.Series(keys).to_numpy()[missing]
+            )
+            positions[missing] = fuzzy_positions
+            scores[missing] = fuzzy_scores
+        return positions, scores
+
+    def gather(self, positions):
+        """Columnas de la fuente alineadas con ``positions`` (NaN sin coincidencia)"""
+        return {
+            col: pd.api.extensions.take(self.values[col].to_numpy(), positions, allow_fill=True)
+            for col in self.values.columns
+        }
+
+
+def assemble(base_df, new_columns):
+    """Construye el DataFrame enriquecido en una sola asignación"""
+    # ``.array`` conserva los tipos compactos (category, cadenas de Arrow)
+    data = {col: base_df[col].array for col in base_df.columns}
+    for col, values in new_columns.items():
+        if col not in data:
+            data[col] = values
+    return pd.DataFrame(data, index=base_df.index, copy=False)
@@ -0,0 +1,118 @@
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Umbral de similitud (coseno entre conjuntos de n-gramas de caracteres) para aceptar
+# una coincidencia aproximada
+FUZZY_MIN_SCORE = 0.6
+# n-gramas de caracteres dentro de cada palabra
+NGRAM_RANGE = (3, 3)
+# Bloqueo: los n-gramas presentes en más de BLOCKING_MAX_DF de las referencias
+# (con un mínimo absoluto de BLOCKING_MIN_DF) no generan candidatos
+BLOCKING_MAX_DF = 0.01
+BLOCKING_MIN_DF = 50
+# Candidatos por clave que se puntúan de forma exacta
+TOP_K_CANDIDATES = 10
+# Claves consultadas por producto disperso: acota la memoria de la matriz de candidatos
+QUERY_BATCH_SIZE = 2_000
+
+
+class FuzzyMatcher:
+    """Emparejador aproximado de claves contra una tabla de referencia.
+
+    Cada clave se representa por su conjunto de n-gramas de caracteres y la
+    puntuación es el coseno entre conjuntos (|A∩B| / sqrt(|A|·|B|)). Los
+    n-gramas de la consulta que no existen en la referencia cuentan en |A|,
+    de modo que no inflan la puntuación.
+
+    El emparejado se hace en dos fases para no ser cuadrático:
+
+    1. Bloqueo: un producto disperso contra el índice invertido de n-gramas
+       poco frecuentes propone los ``top_k`` candidatos de cada clave. Los
+       n-gramas muy comunes ("eng", "er ") se excluyen porque conectan casi
+       todas las parejas.
+    2. Puntuación exacta de esos candidatos con todos los n-gramas.
+    """
+
+    def __init__(self, reference_keys, ngram_range=NGRAM_RANGE, min_score=FUZZY_MIN_SCORE,
+                 top_k=TOP_K_CANDIDATES):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        self.min_score = min_score
+        self.top_k = top_k
+        self.vectorizer = CountVectorizer(analyzer="char_wb", ngram_range=ngram_range,
+                                          binary=True, dtype=np.float32)
+        self.analyzer = self.vectorizer.build_analyzer()
+        self.reference = self.vectorizer.fit_transform(
+            pd.Series(reference_keys, dtype=object).fillna("")
+        ).tocsr()
+        reference_sizes = np.asarray(self.reference.sum(axis=1)).ravel()
+        self.reference_norms = 1.0 / np.sqrt(np.maximum(reference_sizes, 1.0))
+
+        # Índice invertido de bloqueo: solo n-gramas poco frecuentes
+        document_frequency = np.asarray(self.reference.sum(axis=0)).ravel()
+        max_df = max(BLOCKING_MIN_DF, BLOCKING_MAX_DF * self.reference.shape[0])
+        self.blocking_grams = document_frequency <= max_df
+        self.blocking_index = self.reference[:, self.blocking_grams].T.tocsc()
+
+    def _candidates(self, query):
+        """Pares (fila de consulta, referencia) con los top_k candidatos por fila"""
+        overlap = (query[:, self.blocking_grams] @ self.blocking_index).tocsr()
+        rows, cols = [], []
+        for row in range(overlap.shape[0]):
+            start, end = overlap.indptr[row], overlap.indptr[row + 1]
+            if start == end:
+                continue
+            indices = overlap.indices[start:end]
+            if end - start > self.top_k:
+                best = np.argpartition(overlap.data[start:end], -self.top_k)[-self.top_k:]
+                indices = indices[best]
+            rows.append(np.full(len(indices), row))
+            cols.append(indices)
+        if not rows:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def _best_matches(self, batch):
+        """Mejor referencia y puntuación exacta para cada clave del lote"""
+        query = self.vectorizer.transform(batch).tocsr()
+        query_sizes = np.array([len(set(self.analyzer(key))) for key in batch], dtype=np.float32)
+        query_norms = 1.0 / np.sqrt(np.maximum(query_sizes, 1.0))
+
+        best_positions = np.full(len(batch), -1, dtype=np.int64)
+        best_scores = np.zeros(len(batch))
+        rows, cols = self._candidates(query)
+        if len(rows):
+            overlap = np.asarray(query[rows].multiply(self.reference[cols]).sum(axis=1)).ravel()
+            scores = overlap * query_norms[rows] * self.reference_norms[cols]
+            # Mayor puntuación por fila: se ordena por (fila, puntuación)
+            order = np.lexsort((scores, rows))
+            last = np.r_[rows[order][1:] != rows[order][:-1], True]
+            winners = order[last]
+            best_positions[rows[winners]] = cols[winners]
+            best_scores[rows[winners]] = scores[winners]
+        return best_positions, best_scores
+
+    def match(self, keys):
+        """Mejor referencia para cada clave.
+
+        Devuelve dos arrays alineados con ``keys``: posición en la referencia
+        (-1 si ninguna supera ``min_score``) y puntuación (NaN sin coincidencia).
+        Cada valor distinto se consulta una sola vez.
+        """
+        codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+        uniques = np.asarray(uniques, dtype=object)
+        unique_positions = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        unique_scores = np.full(len(uniques) + 1, np.nan)
+
+        for start in range(0, len(uniques), QUERY_BATCH_SIZE):
+            batch = uniques[start:start + QUERY_BATCH_SIZE]
+            positions, scores = self._best_matches(batch)
+            accepted = scores >= self.min_score
+            rows = np.arange(start, start + len(batch))
+            unique_positions[rows[accepted]] = positions[accepted]
+            unique_scores[rows[accepted]] = np.minimum(scores[accepted], 1.0)
+
+        # El código -1 (nulo) apunta al último elemento: sin coincidencia
+        return unique_positions.take(codes), unique_scores.take(codes)
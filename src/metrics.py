@@ -0,0 +1,287 @@
+"""Métricas de ejecución por etapa: tiempo, CPU, memoria, filas y bytes.
+
+Las funciones de etapa se marcan con ``@instrument`` (o un bloque con
+``stage``). Mientras hay una ejecución activa (``with record_run("pipeline"):``)
+cada llamada registra:
+
+- ``wall_s`` y ``cpu_s`` (CPU del hilo que ejecuta la etapa);
+- ``peak_rss_mb``: máximo de memoria residente del proceso al terminar la
+  etapa y ``rss_growth_mb``, cuánto subió ese máximo durante la etapa;
+- ``tracemalloc_peak_mb`` si la ejecución se abrió con ``trace_memory``;
+- ``rows_in``/``rows_out``: filas del primer DataFrame de los argumentos y
+  del resultado (o lo que la etapa indique en su registro);
+- ``bytes_read``/``bytes_written`` del proceso (``/proc/self/io``).
+
+Al cerrar la ejecución las métricas se escriben en
+``static/metrics/<nombre>-<run_id>.json``. Sin ejecución activa las etapas
+no registran nada. Con ``profiler`` ("cprofile" o "pyinstrument") cada
+etapa de primer nivel de cada hilo guarda además su perfil junto al JSON.
+
+Las etapas que corren en paralelo comparten proceso: memoria, bytes y
+``tracemalloc`` incluyen lo que hagan las demás en ese intervalo.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from config import active_config
+from dedup import new_run_id
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = active_config().metrics_dir
+PROFILERS = ("cprofile", "pyinstrument")
+
+# Ejecución activa (compartida por los hilos del pipeline) y profundidad de
+# etapas anidadas en cada hilo, para perfilar solo las de primer nivel
+_active = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _io_counters():
+    """Bytes leídos y escritos por el proceso (incluye caché de páginas)"""
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as f:
+            counters = dict(line.split(":", 1) for line in f)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _is_pandas(value, kinds=("DataFrame", "Series")):
+    # Se compara por nombre para no forzar la importación de pandas (ni leer
+    # un módulo a medio importar desde otro hilo)
+    cls = type(value)
+    return cls.__module__.startswith("pandas.") and cls.__name__ in kinds
+
+
+def _count_rows(value):
+    """Filas de un DataFrame o lista, o del primer DataFrame de una tupla"""
+    if isinstance(value, tuple):
+        value = next((item for item in value if _is_pandas(item, ("DataFrame",))), None)
+    if isinstance(value, list) or _is_pandas(value):
+        return len(value)
+    return None
+
+
+def _delta(after, before):
+    return None if after is None or before is None else after - before
+
+
+class MetricsRun:
+    """Métricas acumuladas de una ejecución"""
+
+    def __init__(self, name, trace_memory=False, profiler=None, metrics_dir=METRICS_DIR):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Perfilador no soportado: {profiler}")
+        self.name = name
+        self.run_id = new_run_id()
+        self.trace_memory = trace_memory
+        self.profiler = profiler
+        self.path = Path(metrics_dir) / f"{name}-{self.run_id}.json"
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages = []
+        self.status = None  # quien abre la ejecución puede marcarla como fallida
+        self._profiles = 0
+
+    def add(self, record):
+        with _lock:
+            self.stages.append(record)
+
+    def profile_path(self, stage_name, suffix):
+        with _lock:
+            self._profiles += 1
+            number = self._profiles
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return self.path.with_name(f"{self.path.stem}-{number:03d}-{stage_name}{suffix}")
+
+    def summary(self):
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record["stage"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            total["calls"] += 1
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+        return dict(sorted(totals.items(), key=lambda item: item[1]["wall_s"], reverse=True))
+
+    def save(self, wall_s, status):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "run": self.name,
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "status": status,
+            "wall_s": wall_s,
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": self.stages,
+            "summary": self.summary(),
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=2, default=str)
+        tmp_path.replace(self.path)
+        return self.path
+
+
+@contextmanager
+def record_run(name, trace_memory=False, profiler=None, metrics_dir=METRICS_DIR):
+    """Abre una ejecución; al salir escribe su JSON de métricas.
+
+    Si ya hay una ejecución activa (p. ej. una etapa llamada desde el
+    pipeline) se reutiliza esa.
+    """
+    global _active
+    if _active is not None:
+        yield _active
+        return
+    metrics_run = MetricsRun(name, trace_memory, profiler, metrics_dir)
+    _active = metrics_run
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield metrics_run
+        status = metrics_run.status or "ok"
+    finally:
+        _active = None
+        if trace_memory:
+            tracemalloc.stop()
+        path = metrics_run.save(time.perf_counter() - start, status)
+        slowest = next(iter(metrics_run.summary().items()), None)
+        if slowest:
+            logger.info(f"Etapa más lenta: {slowest[0]} ({slowest[1]['wall_s']:.2f} s)")
+        logger.info(f"Métricas de la ejecución guardadas en: {path}")
+
+
+def add_arguments(parser):
+    """Opciones de línea de comandos para perfilar una ejecución"""
+    parser.add_argument("--profile", choices=PROFILERS,
+                        help="Guarda un perfil de cada etapa junto a las métricas")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Mide el pico de memoria de Python de cada etapa con tracemalloc")
+
+
+def _start_profiler(kind):
+    if kind == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    from pyinstrument import Profiler
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+
+def _stop_profiler(kind, profiler, metrics_run, stage_name):
+    safe_name = "".join(char if char.isalnum() or char in "._-" else "_" for char in stage_name)
+    if kind == "cprofile":
+        profiler.disable()
+        path = metrics_run.profile_path(safe_name, ".prof")
+        profiler.dump_stats(path)
+    else:
+        profiler.stop()
+        path = metrics_run.profile_path(safe_name, ".html")
+        path.write_text(profiler.output_html(), encoding="utf-8")
+    return path
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Mide un bloque como etapa. El registro admite ``rows_out`` y otros campos."""
+    metrics_run = _active
+    if metrics_run is None:
+        yield {}
+        return
+
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    record = {"stage": name, "thread": threading.current_thread().name,
+              "started_at": datetime.now().isoformat(timespec="milliseconds"),
+              "rows_in": rows_in, "rows_out": None}
+    profiler = None
+    if metrics_run.profiler and depth == 0:
+        profiler = _start_profiler(metrics_run.profiler)
+    tracing = metrics_run.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        # reset_peak es global: el pico acumulado de la etapa exterior se
+        # guarda en la pila del hilo antes de reiniciarlo
+        peaks = _local.__dict__.setdefault("peaks", [])
+        if peaks:
+            peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+        peaks.append(0)
+        tracemalloc.reset_peak()
+    rss_before = _peak_rss_mb()
+    read_before, written_before = _io_counters()
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["wall_s"] = time.perf_counter() - wall_start
+        record["cpu_s"] = time.thread_time() - cpu_start
+        read_after, written_after = _io_counters()
+        record["bytes_read"] = _delta(read_after, read_before)
+        record["bytes_written"] = _delta(written_after, written_before)
+        record["peak_rss_mb"] = _peak_rss_mb()
+        record["rss_growth_mb"] = _delta(record["peak_rss_mb"], rss_before)
+        if tracing:
+            peak = max(_local.peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if _local.peaks:
+                _local.peaks[-1] = max(_local.peaks[-1], peak)
+            record["tracemalloc_peak_mb"] = peak / (1024 * 1024)
+        if profiler is not None:
+            record["profile"] = str(_stop_profiler(metrics_run.profiler, profiler,
+                                                   metrics_run, name))
+        _local.depth = depth
+        metrics_run.add(record)
+
+
+def instrument(func=None, *, name=None, rows_arg=0):
+    """Decorador de funciones de etapa (``@instrument`` o ``@instrument(name=...)``).
+
+    Las filas de entrada se toman del argumento posicional ``rows_arg`` y
+    las de salida del resultado, cuando son DataFrames (o listas de registros).
+    """
+    if func is None:
+        return functools.partial(instrument, name=name, rows_arg=rows_arg)
+    module = func.__module__
+    if module == "__main__":
+        module = Path(func.__globals__.get("__file__", module)).stem
+    stage_name = name or f"{module}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _active is None:
+            return func(*args, **kwargs)
+        rows_in = _count_rows(args[rows_arg]) if len(args) > rows_arg else None
+        with stage(stage_name, rows_in=rows_in) as record:
+            result = func(*args, **kwargs)
+            if record.get("rows_out") is None:
+                record["rows_out"] = _count_rows(result)
+            return result
+
+    return wrapper
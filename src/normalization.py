@@ -0,0 +1,81 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Sufijos societarios que se eliminan del final del nombre de empresa
+LEGAL_SUFFIXES = frozenset([
+    "ag", "bv", "co", "corp", "corporation", "ev", "gmbh", "inc", "incorporated", "kg",
+    "kgaa", "limited", "llc", "ltd", "mbh", "nv", "ohg", "plc", "sa", "sarl", "sas",
+    "se", "sl", "spa", "srl", "ug", "haftungsbeschrankt",
+])
+
+# Marcadores de género habituales en ofertas alemanas: (m/w/d), (f/m/x), m/w/d...
+_GENDER_TAG = re.compile(r"\(?\b[mwfdx](?:\s*[/|]\s*[mwfdx]){1,3}\b\)?", re.IGNORECASE)
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Valores distintos memorizados por función (empresas y ciudades se repiten mucho)
+CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_text(value):
+    """Clave canónica de un texto: sin acentos, en minúsculas y sin puntuación"""
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_company(value):
+    """Clave canónica de empresa: texto canónico sin sufijos societarios finales"""
+    tokens = canonical_text(value).split()
+    end = len(tokens)
+    while end > 1 and tokens[end - 1] in LEGAL_SUFFIXES:
+        end -= 1
+    return " ".join(tokens[:end])
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_title(value):
+    """Clave canónica de título: texto canónico sin marcadores de género"""
+    return canonical_text(_GENDER_TAG.sub(" ", str(value)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_location(value):
+    """Clave canónica de ubicación: la ciudad (primer tramo antes de la coma)"""
+    return canonical_text(str(value).split(",")[0])
+
+
+def normalize_series(series, func=canonical_text):
+    """Aplica ``func`` una sola vez por valor distinto y reparte el resultado.
+
+    ``pd.factorize`` agrupa los valores repetidos en códigos enteros; la
+    normalización se calcula sobre los únicos y se expande con un ``take``
+    vectorizado. Los nulos se conservan como nulos.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    keys = np.array([func(value) for value in uniques] + [None], dtype=object)
+    # El código -1 (nulo) apunta al último elemento, que es None
+    return pd.Series(keys.take(codes), index=series.index, name=series.name)
+
+
+def company_key(series):
+    return normalize_series(series, canonical_company)
+
+
+def title_key(series):
+    return normalize_series(series, canonical_title)
+
+
+def location_key(series):
+    return normalize_series(series, canonical_location)
+
+
+def text_key(series):
+    return normalize_series(series, canonical_text)
@@ -0,0 +1,180 @@
+"""Limpieza + enriquecimiento particionados en varios procesos.
+
+La tabla ``jobs`` se divide en rangos contiguos de ``rowid`` y cada partición
+se limpia y enriquece en un proceso del pool. Lo que depende de la tabla
+completa se calcula una sola vez en el proceso principal y se difunde a los
+trabajadores:
+
+- la deduplicación y las estadísticas globales (medianas, modas y tipos) de
+  ``cleaning.compute_global_stats``; cada partición recibe su tramo de la
+  máscara de filas conservadas;
+- las fuentes de referencia, escritas en Feather sin comprimir y leídas por
+  los trabajadores con ``memory_map``.
+
+Las particiones se concatenan en orden, así que el resultado coincide con
+ejecutar ``clean_data`` y ``enrich_data`` en un solo proceso.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cleaning
+import enrichement
+import storage
+from dedup import DEFAULT_DEDUP_KEY
+from dtypes import optimize_dtypes
+from lazy import lazy_import
+from metrics import instrument
+from stage_io import FEATHER, read_stage, stage_path, write_stage
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Particiones por trabajador: más de una reparte mejor la carga si alguna
+# partición es más lenta (p. ej. por claves que requieren emparejado aproximado)
+PARTITIONS_PER_WORKER = 2
+
+# Estado de cada proceso del pool, preparado una vez por ``_init_worker``
+_worker = {}
+
+
+def _init_worker(db_path, stats, reference_paths, sources, fuzzy):
+    _worker.clear()
+    _worker.update(
+        db_path=str(db_path),
+        stats=stats,
+        frames={name: read_stage(path, memory_map=True) for name, path in reference_paths.items()},
+        tables={},
+        sources=sources,
+        fuzzy=fuzzy,
+    )
+
+
+def _read_partition(conn, start, end, first_rowid, last_rowid):
+    if start == end:
+        chunk = pd.read_sql_query("SELECT * FROM jobs LIMIT 0", conn)
+    else:
+        chunk = pd.read_sql_query(
+            "SELECT * FROM jobs WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+            conn, params=(int(first_rowid), int(last_rowid)),
+        )
+    # Mismas etiquetas de índice que tendría la fila en la tabla completa
+    chunk.index = pd.RangeIndex(start, end)
+    return chunk
+
+
+def _process_partition(task):
+    """Limpia y enriquece una partición con las estadísticas difundidas"""
+    start, end, first_rowid, last_rowid, keep = task
+    conn = storage.get_connection(_worker["db_path"], read_only=True)
+    chunk = _read_partition(conn, start, end, first_rowid, last_rowid)
+
+    clean_chunk = cleaning.apply_global_stats(chunk[keep], _worker["stats"])
+    enriched, report = enrichement.enrich_data(
+        clean_chunk, sources=_worker["sources"], fuzzy=_worker["fuzzy"],
+        source_frames=_worker["frames"], lookup_tables=_worker["tables"], optimize=False,
+    )
+    return enriched, report, clean_chunk.isnull().sum().to_dict()
+
+
+def plan_partitions(conn, keep_mask, partitions):
+    """Rangos de filas (en orden de ``rowid``) de cada partición.
+
+    Devuelve tuplas ``(inicio, fin, primer rowid, último rowid, máscara)``;
+    los cortes reparten por igual las filas que sobreviven a la deduplicación.
+    """
+    rowids = pd.read_sql_query("SELECT rowid FROM jobs ORDER BY rowid", conn).iloc[:, 0].to_numpy()
+    if len(rowids) != len(keep_mask):
+        raise RuntimeError("La tabla jobs cambió durante la limpieza particionada")
+    if not len(rowids):
+        return [(0, 0, None, None, keep_mask)]
+
+    kept = np.cumsum(keep_mask)
+    targets = np.linspace(0, kept[-1], partitions + 1)[1:-1]
+    cuts = np.unique(np.r_[0, np.searchsorted(kept, targets, side="right"), len(rowids)])
+    return [
+        (start, end, rowids[start], rowids[end - 1], keep_mask[start:end])
+        for start, end in zip(cuts[:-1], cuts[1:])
+    ]
+
+
+def _merge_enrichment_reports(reports):
+    """Combina los reportes de enriquecimiento de las particiones"""
+    merged = {
+        'base_records': sum(report['base_records'] for report in reports),
+        'sources': {},
+        'operations': [],
+        'final_records': sum(report['final_records'] for report in reports),
+        'new_columns_total': reports[0]['new_columns_total'],
+    }
+    for source, info in reports[0]['sources'].items():
+        merged_info = dict(info)
+        for key in ('matched_records', 'fuzzy_matches'):
+            if key in info:
+                merged_info[key] = sum(report['sources'][source][key] for report in reports)
+        merged['sources'][source] = merged_info
+        merged['operations'].append(enrichement.operation_message(source, merged_info))
+    return merged
+
+
+@instrument
+def clean_and_enrich(workers=DEFAULT_WORKERS, partitions=None, dedup_key=DEFAULT_DEDUP_KEY,
+                     dedup_index=None, run_id=None, sources=None, fuzzy=True,
+                     source_frames=None, chunksize=cleaning.DEFAULT_CHUNKSIZE):
+    """Limpia y enriquece ``jobs`` repartiendo particiones entre ``workers`` procesos.
+
+    ``dedup_key``, ``dedup_index`` y ``run_id`` son los de ``clean_data``;
+    ``sources``, ``fuzzy`` y ``source_frames`` los de ``enrich_data``. Con un
+    solo trabajador las particiones se procesan en el proceso actual.
+
+    Devuelve ``(análisis inicial, reporte de limpieza, estado final,
+    DataFrame enriquecido, reporte de enriquecimiento)``.
+    """
+    if not cleaning.DB_PATH.exists():
+        raise FileNotFoundError(f"La base de datos no existe en {cleaning.DB_PATH}")
+    partitions = partitions or workers * PARTITIONS_PER_WORKER
+
+    conn = storage.get_connection(cleaning.DB_PATH)
+    # Las particiones se procesan en memoria: el índice de duplicados también
+    stats = cleaning.compute_global_stats(conn, chunksize, dedup_key, dedup_index, run_id,
+                                          in_memory=True)
+    tasks = plan_partitions(conn, stats.pop("keep_mask"), partitions)
+    logger.info(f"Limpieza y enriquecimiento en {len(tasks)} particiones con {workers} procesos")
+
+    source_frames = dict(source_frames or {})
+    with tempfile.TemporaryDirectory(prefix="references-") as tmp_dir:
+        reference_paths = {}
+        for source, (loader, *_) in enrichement.ENRICHMENT_SOURCES.items():
+            if sources is not None and source not in sources:
+                continue
+            frame = source_frames.get(source)
+            path = stage_path(Path(tmp_dir) / source.replace(".", "_"), FEATHER)
+            write_stage(loader() if frame is None else frame, path)
+            reference_paths[source] = path
+
+        init_args = (cleaning.DB_PATH, stats, reference_paths, sources, fuzzy)
+        if workers <= 1:
+            _init_worker(*init_args)
+            results = [_process_partition(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=init_args) as pool:
+                results = list(pool.map(_process_partition, tasks))
+
+    # Los tipos compactos se fijan tras concatenar: las categorías de cada
+    # partición serían distintas y pd.concat las devolvería como object
+    enriched_df, memory_usage = optimize_dtypes(pd.concat([enriched for enriched, _, _ in results]))
+    final_state = {
+        "records": sum(len(enriched) for enriched, _, _ in results),
+        "null_counts": {col: sum(nulls[col] for _, _, nulls in results)
+                        for col in stats["columns"]},
+    }
+    enrichment_report = _merge_enrichment_reports([report for _, report, _ in results])
+    enrichment_report['memory_usage'] = memory_usage
+    return (stats["analysis"], cleaning.stats_cleaning_report(stats), final_state,
+            enriched_df, enrichment_report)
@@ -0,0 +1,337 @@
+"""Orquestador del pipeline: ingesta -> limpieza -> enriquecimiento.
+
+Ejecuta las tres etapas en un solo proceso pasando los DataFrames en
+memoria. Las tareas forman un DAG y las independientes corren en paralelo
+(p. ej. la carga de las fuentes de referencia mientras se limpia).
+
+Uso:
+    python src/pipeline.py run [--skip-ingest] [--checkpoint] [--changed-only] [--processes N]
+                               [--incremental [--full-refresh]] [--serve]
+    (o desde src/: python -m pipeline run ...)
+"""
+import argparse
+import json
+import logging
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import cleaning
+import config
+import enrichement
+import incremental
+import ingesta
+import partitioned
+import rules
+import serving
+import storage
+from dtypes import optimize_dtypes
+from metrics import add_arguments as add_metrics_arguments, record_run
+from profiling import profile_frame
+from stage_cache import STAGE_CACHE
+from stage_io import read_stage
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PIPELINE_STATE_PATH = config.active_config().cache_dir / "pipeline_state.json"
+MAX_WORKERS = 4
+
+
+class Pipeline:
+    """DAG de tareas con ejecución concurrente.
+
+    Cada tarea recibe como argumentos con nombre los resultados de sus
+    dependencias y se lanza en cuanto todas ellas terminan.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, name, func, deps=()):
+        missing = [dep for dep in deps if dep not in self.tasks]
+        if missing:
+            raise ValueError(f"La tarea {name} depende de tareas no definidas: {missing}")
+        self.tasks[name] = (func, tuple(deps))
+
+    def run(self, max_workers=MAX_WORKERS):
+        results = {}
+        pending = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline") as pool:
+            while pending or running:
+                ready = [name for name, (_, deps) in pending.items()
+                         if all(dep in results for dep in deps)]
+                for name in ready:
+                    func, deps = pending.pop(name)
+                    logger.info(f"Iniciando tarea: {name}")
+                    running[pool.submit(func, **{dep: results[dep] for dep in deps})] = name
+                if not running:
+                    raise RuntimeError(f"Dependencias circulares entre: {list(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Si una tarea falla se propaga el error; las que siguen
+                    # en curso terminan al cerrar el pool
+                    results[name] = future.result()
+                    logger.info(f"Tarea completada: {name}")
+        return results
+
+
+def input_fingerprints():
+    """Firmas de las entradas de cada etapa.
+
+    La tabla jobs se identifica por su versión (``storage.table_version``) y
+    no por el tamaño y mtime de la base: con WAL el archivo ``-wal`` aparece
+    y desaparece al cerrar las conexiones sin que cambie el contenido. Las
+    reglas y las fuentes de referencia usan tamaño y mtime.
+    """
+    jobs = (storage.table_version(storage.get_connection(cleaning.DB_PATH))
+            if cleaning.DB_PATH.exists() else None)
+    clean = {"jobs": jobs, rules.RULES_PATH.name: incremental.file_signature(rules.RULES_PATH)}
+    return {
+        "clean": clean,
+        "enrich": {"clean": clean, "references": incremental.reference_fingerprints()},
+    }
+
+
+def load_state(path=PIPELINE_STATE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=PIPELINE_STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(path)
+
+
+def check_cache(checkpoint=False):
+    """Busca la limpieza y el enriquecimiento en la caché de etapas.
+
+    La clave del enriquecimiento se encadena a la de la limpieza, así que no
+    hace falta el checkpoint para calcularla. Si el enriquecimiento está en
+    caché se restauran los artefactos de ambas etapas; si solo lo está la
+    limpieza (con checkpoint), se restauran los suyos.
+    """
+    clean_key = cleaning.cache_key()
+    enrich_key = enrichement.cache_key(clean_fingerprint=clean_key)
+    enrich_hit = STAGE_CACHE.contains(enrich_key, enrichement.cache_outputs())
+    clean_hit = ((checkpoint or enrich_hit)
+                 and STAGE_CACHE.restore(clean_key, cleaning.cache_outputs(checkpoint)))
+    enrich_hit = (enrich_hit and clean_hit
+                  and STAGE_CACHE.restore(enrich_key, enrichement.cache_outputs()))
+    return {"clean_key": clean_key, "enrich_key": enrich_key,
+            "clean_hit": bool(clean_hit), "enrich_hit": bool(enrich_hit)}
+
+
+def build_pipeline(skip_ingest=False, checkpoint=False, run_clean=True, run_enrich=True,
+                   processes=1, incremental_mode=False, full_refresh=False, use_cache=False):
+    """Construye el DAG de tareas del pipeline.
+
+    ``run_clean``/``run_enrich`` permiten omitir etapas cuyas entradas no
+    cambiaron; si se omite la limpieza pero hay que enriquecer, los datos
+    limpios se leen del último checkpoint. Con ``processes`` > 1 limpieza y
+    enriquecimiento se ejecutan juntos por particiones en varios procesos.
+    Con ``incremental_mode`` solo se procesan las ofertas nuevas desde la
+    última ejecución (``incremental.process_increment``). Con ``use_cache``
+    las etapas cuyas entradas ya se procesaron restauran sus artefactos de
+    la caché de etapas (``stage_cache``) tras la ingesta.
+    """
+    pipeline = Pipeline()
+
+    def ingest():
+        ingesta.create_database()
+        stored_before = ingesta.count_jobs()
+        stats = ingesta.ingest_from_api()
+        ingesta.generate_sample_file()
+        ingesta.generate_audit_file(stats, stored_before)
+        return stats
+
+    pipeline.add("ingest", (lambda: None) if skip_ingest else ingest)
+
+    use_cache = use_cache and run_clean and not incremental_mode
+    pipeline.add("cache", (lambda ingest: check_cache(checkpoint)) if use_cache
+                 else (lambda ingest: {}), deps=["ingest"])
+
+    load_tasks = []
+    if run_enrich and not incremental_mode:
+        # Las fuentes de referencia no dependen de la limpieza: se cargan en paralelo
+        for source, (loader, *_) in enrichement.ENRICHMENT_SOURCES.items():
+            task_name = f"load:{source}"
+            if use_cache and skip_ingest:
+                # Sin ingesta no hay nada con qué solaparlas: se omiten si la caché acierta
+                pipeline.add(task_name, lambda cache, loader=loader: (
+                    None if cache.get("enrich_hit") else loader()
+                ), deps=["cache"])
+            else:
+                pipeline.add(task_name, loader)
+            load_tasks.append(task_name)
+
+    if incremental_mode:
+        def load_sources():
+            # Solo se llama si hay ofertas nuevas: una ejecución sin cambios no las carga
+            with ThreadPoolExecutor(max_workers=len(enrichement.ENRICHMENT_SOURCES)) as executor:
+                futures = {source: executor.submit(loader)
+                           for source, (loader, *_) in enrichement.ENRICHMENT_SOURCES.items()}
+                return {source: future.result() for source, future in futures.items()}
+
+        def increment(cache):
+            return incremental.process_increment(full_refresh=full_refresh,
+                                                 load_sources=load_sources)
+
+        pipeline.add("enrich", increment, deps=["cache"])
+        return pipeline
+
+    def store(cache, clean=True, enrich=True):
+        if use_cache and clean:
+            STAGE_CACHE.store(cache["clean_key"], "cleaning", cleaning.cache_outputs(checkpoint))
+        if use_cache and enrich:
+            STAGE_CACHE.store(cache["enrich_key"], "enrichment", enrichement.cache_outputs())
+
+    if run_clean and processes > 1:
+        def clean_enrich(cache, **sources):
+            if cache.get("enrich_hit"):
+                return None
+            frames = {name.split(":", 1)[1]: df for name, df in sources.items()}
+            analysis, report, final_state, enriched_df, enrichment_report = (
+                partitioned.clean_and_enrich(workers=processes, source_frames=frames)
+            )
+            if checkpoint:
+                cleaning.generate_artifacts(enriched_df[list(final_state["null_counts"])],
+                                            analysis, report)
+            else:
+                cleaning.write_cleaning_report(analysis, report, final_state)
+            enrichement.generate_artifacts(enriched_df, enrichment_report)
+            store(cache)
+            return enriched_df
+
+        pipeline.add("enrich", clean_enrich, deps=["cache"] + load_tasks)
+        return pipeline
+
+    if run_clean:
+        def clean(cache):
+            if cache.get("enrich_hit"):
+                return None
+            if cache.get("clean_hit"):
+                return read_stage(cleaning.CLEANED_DATA_PATH)
+            df, memory_usage = optimize_dtypes(cleaning.load_data())
+            analysis = cleaning.analyze_data(memory_usage=memory_usage)
+            clean_df, report = cleaning.clean_data(df)
+            if checkpoint:
+                cleaning.generate_artifacts(clean_df, analysis, report)
+            else:
+                cleaning.write_cleaning_report(
+                    analysis, report, profile_frame(clean_df, distinct=False, duplicates=False)
+                )
+            store(cache, enrich=False)
+            return clean_df
+    else:
+        def clean(cache):
+            logger.info(f"Limpieza sin cambios: se usa el checkpoint {cleaning.CLEANED_DATA_PATH}")
+            return read_stage(cleaning.CLEANED_DATA_PATH)
+
+    pipeline.add("clean", clean, deps=["cache"])
+
+    if run_enrich:
+        def enrich(cache, clean, **sources):
+            if cache.get("enrich_hit"):
+                return None
+            frames = {name.split(":", 1)[1]: df for name, df in sources.items()}
+            enriched_df, report = enrichement.enrich_data(clean, source_frames=frames)
+            enrichement.generate_artifacts(enriched_df, report)
+            store(cache, clean=False)
+            return enriched_df
+
+        pipeline.add("enrich", enrich, deps=["cache", "clean"] + load_tasks)
+    return pipeline
+
+
+def run(skip_ingest=False, checkpoint=False, changed_only=False, max_workers=MAX_WORKERS,
+        processes=1, incremental_mode=False, full_refresh=False, use_cache=True, serve=False):
+    """Ejecuta el pipeline completo; con ``processes`` > 1 limpia y enriquece por particiones.
+
+    Con ``serve`` actualiza al final la base de consulta (``serving.refresh``).
+    """
+    results = _run_stages(skip_ingest, checkpoint, changed_only, max_workers, processes,
+                          incremental_mode, full_refresh, use_cache)
+    if serve:
+        serving.refresh()
+    return results
+
+
+def _run_stages(skip_ingest, checkpoint, changed_only, max_workers, processes,
+                incremental_mode, full_refresh, use_cache):
+    if incremental_mode:
+        # La marca de agua ya evita reprocesar: no hace falta comparar firmas
+        pipeline = build_pipeline(skip_ingest, incremental_mode=True, full_refresh=full_refresh)
+        return pipeline.run(max_workers=max_workers)
+
+    state = load_state() if changed_only else {}
+    run_clean = run_enrich = True
+    if changed_only and skip_ingest:
+        fingerprints = input_fingerprints()
+        run_clean = not (state.get("clean") == fingerprints["clean"]
+                         and cleaning.CLEANED_DATA_PATH.exists())
+        run_enrich = run_clean or not (state.get("enrich") == fingerprints["enrich"]
+                                       and enrichement.ENRICHED_DATA_PATH.exists())
+        if not run_enrich:
+            logger.info("Entradas sin cambios: no hay etapas que ejecutar")
+            return {}
+
+    # Sin checkpoint de limpieza no se puede omitir esa etapa en ejecuciones futuras
+    checkpoint = checkpoint or changed_only
+    pipeline = build_pipeline(skip_ingest, checkpoint, run_clean, run_enrich, processes,
+                              use_cache=use_cache)
+    results = pipeline.run(max_workers=max_workers)
+    if changed_only:
+        save_state(input_fingerprints())
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Orquestador del pipeline de ofertas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Ejecuta ingesta, limpieza y enriquecimiento")
+    run_parser.add_argument("--skip-ingest", action="store_true",
+                            help="No consulta el API; usa la base de datos existente")
+    run_parser.add_argument("--checkpoint", action="store_true",
+                            help="Guarda también los datos limpios intermedios")
+    run_parser.add_argument("--changed-only", action="store_true",
+                            help="Omite las etapas cuyas entradas no cambiaron")
+    run_parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    run_parser.add_argument("--processes", type=int, default=1,
+                            help="Limpia y enriquece por particiones en N procesos")
+    run_parser.add_argument("--incremental", action="store_true",
+                            help="Procesa solo las ofertas nuevas desde la última ejecución")
+    run_parser.add_argument("--full-refresh", action="store_true",
+                            help="Con --incremental, vuelve a procesar la tabla completa")
+    run_parser.add_argument("--no-cache", action="store_true",
+                            help="No usa la caché de etapas aunque las entradas no hayan cambiado")
+    run_parser.add_argument("--serve", action="store_true",
+                            help="Actualiza al final la base de consulta (serving.py)")
+    add_metrics_arguments(run_parser)
+    args = parser.parse_args(argv)
+    config.setup(log_file="pipeline.log")
+
+    try:
+        with record_run("pipeline", args.trace_memory, args.profile):
+            run(skip_ingest=args.skip_ingest, checkpoint=args.checkpoint,
+                changed_only=args.changed_only, max_workers=args.workers,
+                processes=args.processes, incremental_mode=args.incremental,
+                full_refresh=args.full_refresh, use_cache=not args.no_cache, serve=args.serve)
+        logger.info("Pipeline completado exitosamente")
+        return 0
+    except Exception:
+        logger.exception("Error en el pipeline")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Perfilado de tablas: registros, nulos, valores distintos, duplicados y tipos.
+
+Las estadísticas se calculan sin materializar la tabla completa:
+
+- tablas SQLite: una sola consulta de agregados (``COUNT(*) - COUNT(col)``,
+  ``COUNT(DISTINCT col)``, ``typeof``). Si la tabla tiene una clave única sin
+  nulos no puede haber filas duplicadas y no se recorre para buscarlas;
+- archivos Parquet de etapa: registros y nulos salen de los metadatos de los
+  row groups;
+- DataFrames o bloques de cualquier otra fuente: acumuladores en streaming.
+
+El perfil de una tabla SQLite se guarda en caché junto a la versión de la
+base de datos (tamaño y mtime del archivo y de su WAL) y solo se recalcula
+cuando los datos cambian.
+"""
+import json
+import logging
+from pathlib import Path
+
+import storage
+from config import active_config
+from dedup import MemoryDedupIndex, key_hashes
+from lazy import lazy_import
+from stage_io import PARQUET, STAGE_FORMATS, read_stage
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+pq = lazy_import("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_PATH = active_config().cache_dir / "profiles.json"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _empty_profile(columns):
+    return {
+        "records": 0,
+        "null_counts": {col: 0 for col in columns},
+        "distinct_counts": {col: 0 for col in columns},
+        "duplicates": 0,
+        "data_types": {col: "object" for col in columns},
+    }
+
+
+class ProfileAccumulator:
+    """Perfil incremental sobre bloques de un DataFrame.
+
+    Los valores distintos y las filas duplicadas se cuentan con hashes de 64
+    bits, así que la memoria crece con el número de valores distintos y no
+    con el tamaño de cada valor.
+    """
+
+    def __init__(self, distinct=True, duplicates=True):
+        self.distinct = distinct
+        self.duplicates = duplicates
+        self.columns = None
+        self.profile = None
+        self._distinct_hashes = {}
+        self._dtypes = {}
+        self._row_index = None
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.profile = _empty_profile(self.columns)
+            self._distinct_hashes = {col: np.array([], dtype=np.uint64) for col in self.columns}
+            if self.duplicates:
+                self._row_index = MemoryDedupIndex(tuple(self.columns))
+
+        profile = self.profile
+        profile["records"] += len(chunk)
+        for col, count in chunk.isnull().sum().items():
+            profile["null_counts"][col] += int(count)
+        for col in self.columns:
+            values = chunk[col].dropna()
+            if values.empty:
+                continue
+            self._dtypes.setdefault(col, set()).add(values.dtype)
+            if self.distinct:
+                hashes = pd.util.hash_array(values.to_numpy(dtype=object))
+                self._distinct_hashes[col] = np.union1d(self._distinct_hashes[col], hashes)
+        if self._row_index is not None and len(chunk):
+            seen, _ = self._row_index.check_and_add(key_hashes(chunk, tuple(self.columns)))
+            profile["duplicates"] += int(seen.sum())
+
+    def _data_type(self, col):
+        dtypes = self._dtypes.get(col)
+        if not dtypes:
+            return "object"
+        if len(dtypes) == 1:
+            dtype = next(iter(dtypes))
+        elif all(isinstance(dtype, np.dtype) and dtype.kind in "iufb" for dtype in dtypes):
+            dtype = np.result_type(*dtypes)
+        else:
+            return "object"
+        # Como al leer de SQLite: un entero con nulos se representa como float64
+        if isinstance(dtype, np.dtype) and dtype.kind in "iu" and self.profile["null_counts"][col]:
+            dtype = np.dtype("float64")
+        return str(dtype)
+
+    def result(self):
+        if self.profile is None:
+            return _empty_profile([])
+        profile = dict(self.profile)
+        profile["distinct_counts"] = {col: len(self._distinct_hashes[col]) if self.distinct else None
+                                      for col in self.columns}
+        if not self.duplicates:
+            profile["duplicates"] = None
+        profile["data_types"] = {col: self._data_type(col) for col in self.columns}
+        return profile
+
+
+def profile_frame(df, distinct=True, duplicates=True):
+    """Perfil de un DataFrame ya cargado"""
+    accumulator = ProfileAccumulator(distinct, duplicates)
+    accumulator.update(df)
+    result = accumulator.result()
+    result["data_types"] = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    return result
+
+
+def profile_chunks(chunks, distinct=True, duplicates=True):
+    """Perfil de una secuencia de bloques (p. ej. ``read_sql_query(chunksize=...)``)"""
+    accumulator = ProfileAccumulator(distinct, duplicates)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.result()
+
+
+def profile_stage(path):
+    """Registros y nulos por columna de la salida de una etapa.
+
+    En Parquet se leen de las estadísticas de los row groups, sin tocar los
+    datos; los demás formatos se recorren con el acumulador.
+    """
+    if Path(path).suffix.lower() != STAGE_FORMATS[PARQUET]:
+        return profile_frame(read_stage(path), distinct=False, duplicates=False)
+    metadata = pq.ParquetFile(path).metadata
+    columns = metadata.schema.to_arrow_schema().names
+    null_counts = {col: 0 for col in columns}
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        for position in range(row_group.num_columns):
+            column = row_group.column(position)
+            statistics = column.statistics
+            if statistics is None or not statistics.has_null_count:
+                # Archivo escrito sin estadísticas: se recorre por lotes
+                return profile_chunks(
+                    (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches()),
+                    distinct=False, duplicates=False,
+                )
+            null_counts[column.path_in_schema] += statistics.null_count
+    return {"records": metadata.num_rows, "null_counts": null_counts}
+
+
+def _table_columns(conn, table):
+    return [(row[1], row[2].upper(), row[5]) for row in conn.execute(
+        f"PRAGMA table_info({_quote(table)})"
+    )]
+
+
+def _unique_columns(conn, table, columns):
+    """Columnas con restricción de unicidad (clave primaria entera o índice único)"""
+    unique = {name for name, declared_type, pk in columns
+              if pk and declared_type == "INTEGER"
+              and sum(1 for _, _, other_pk in columns if other_pk) == 1}
+    for _, index_name, is_unique, *_ in conn.execute(f"PRAGMA index_list({_quote(table)})"):
+        if is_unique:
+            index_columns = [row[2] for row in conn.execute(
+                f"PRAGMA index_info({_quote(index_name)})"
+            )]
+            if len(index_columns) == 1:
+                unique.add(index_columns[0])
+    return unique
+
+
+def _sql_data_type(integers, reals, texts, nulls):
+    # Igual que la inferencia de pandas al leer con read_sql_query
+    if texts or not (integers or reals):
+        return "object"
+    if reals or nulls:
+        return "float64"
+    return "int64"
+
+
+def _profile_sql(conn, table):
+    columns = _table_columns(conn, table)
+    names = [name for name, _, _ in columns]
+    if not names:
+        raise ValueError(f"La tabla {table} no existe")
+    selects = ["COUNT(*)"]
+    for name in names:
+        col = _quote(name)
+        selects.extend([
+            f"COUNT(*) - COUNT({col})",
+            f"COUNT(DISTINCT {col})",
+            f"SUM(typeof({col}) = 'integer')",
+            f"SUM(typeof({col}) = 'real')",
+            f"SUM(typeof({col}) IN ('text', 'blob'))",
+        ])
+    row = conn.execute(f"SELECT {', '.join(selects)} FROM {_quote(table)}").fetchone()
+
+    profile = _empty_profile(names)
+    profile["records"] = row[0]
+    for position, name in enumerate(names):
+        nulls, distinct, integers, reals, texts = row[1 + position * 5: 6 + position * 5]
+        profile["null_counts"][name] = nulls
+        profile["distinct_counts"][name] = distinct
+        profile["data_types"][name] = _sql_data_type(integers, reals, texts, nulls)
+
+    # Una clave única sin nulos impide filas repetidas: no hace falta recorrer la tabla
+    if any(profile["null_counts"][name] == 0 for name in _unique_columns(conn, table, columns)):
+        profile["duplicates"] = 0
+    else:
+        quoted = ", ".join(_quote(name) for name in names)
+        distinct_rows = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT {quoted} FROM {_quote(table)})"
+        ).fetchone()[0]
+        profile["duplicates"] = profile["records"] - distinct_rows
+    return profile
+
+
+def database_version(conn):
+    """Versión de la base de datos: tamaño y mtime del archivo y de su WAL"""
+    path = Path(next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"))
+    version = []
+    for file_path in (path, Path(f"{path}-wal")):
+        if file_path.exists():
+            stat = file_path.stat()
+            version.append([file_path.name, stat.st_size, stat.st_mtime_ns])
+    return str(path), version
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache, path):
+    # Se descartan las entradas de bases de datos que ya no existen
+    cache = {key: entry for key, entry in cache.items()
+             if Path(key.rsplit("::", 1)[0]).exists()}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    tmp_path.replace(path)
+
+
+def profile_table(table="jobs", conn=None, cache_path=PROFILE_CACHE_PATH):
+    """Perfil de una tabla SQLite resuelto con agregados SQL.
+
+    Con ``cache_path`` el resultado se reutiliza mientras la versión de la
+    base de datos no cambie; ``cache_path=None`` desactiva la caché.
+    """
+    conn = conn or storage.get_connection()
+    db_path, version = database_version(conn)
+    key = f"{db_path}::{table}"
+    cache = _load_cache(cache_path) if cache_path else {}
+    entry = cache.get(key)
+    if entry is not None and entry["version"] == version:
+        logger.info(f"Perfil de {table} sin cambios: se usa la caché")
+        return entry["profile"]
+
+    profile = _profile_sql(conn, table)
+    if cache_path:
+        # Se guarda la versión leída antes de consultar: si algo escribe entre
+        # medias, la siguiente lectura no coincide y se vuelve a perfilar
+        cache[key] = {"version": version, "profile": profile}
+        _save_cache(cache, cache_path)
+    return profile
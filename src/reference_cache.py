@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from config import active_config
+from stage_io import PARQUET, read_stage, stage_path, write_stage
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_DIR = active_config().cache_dir / "reference"
+
+# Versión del formato de la caché: cambiarla invalida todas las entradas
+CACHE_VERSION = 1
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path):
+    """Hash SHA-256 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReferenceCache:
+    """Caché compilada (Parquet) de las fuentes de referencia.
+
+    Cada fuente se compila la primera vez que se pide y se guarda junto a un
+    manifiesto con su mtime, tamaño y hash de contenido. En las siguientes
+    ejecuciones:
+
+    - mtime y tamaño iguales: se lee el Parquet directamente;
+    - mtime distinto pero mismo tamaño: se compara el hash y, si coincide,
+      solo se actualiza el manifiesto (p. ej. tras un checkout de git);
+    - en cualquier otro caso se vuelve a parsear la fuente original.
+    """
+
+    def __init__(self, cache_dir=REFERENCE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.hits = {}
+
+    def _paths(self, source_path):
+        # Se conserva la extensión original en el nombre para no mezclar
+        # fuentes con el mismo nombre y distinto formato
+        base = self.cache_dir / Path(source_path).name.replace(".", "_")
+        return stage_path(base, PARQUET), base.with_suffix(".manifest.json")
+
+    def _read_manifest(self, manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("version") == CACHE_VERSION else None
+
+    def _write_manifest(self, manifest_path, manifest):
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        tmp_path.replace(manifest_path)
+
+    def load(self, source_path, parse):
+        """Devuelve la fuente como DataFrame, usando la caché si sigue vigente.
+
+        ``parse`` recibe la ruta de la fuente y devuelve el DataFrame; solo se
+        llama cuando la entrada de caché no existe o quedó invalidada.
+        """
+        source_path = Path(source_path)
+        data_path, manifest_path = self._paths(source_path)
+        stat = source_path.stat()
+        manifest = self._read_manifest(manifest_path)
+
+        if manifest is not None and data_path.exists() and manifest["size"] == stat.st_size:
+            if manifest["mtime_ns"] == stat.st_mtime_ns:
+                self.hits[source_path.name] = "mtime"
+                return read_stage(data_path)
+            if manifest["sha256"] == file_sha256(source_path):
+                manifest["mtime_ns"] = stat.st_mtime_ns
+                self._write_manifest(manifest_path, manifest)
+                self.hits[source_path.name] = "hash"
+                return read_stage(data_path)
+
+        logger.info(f"Compilando fuente de referencia en caché: {source_path.name}")
+        df = parse(source_path)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_stage(df, data_path)
+        self._write_manifest(manifest_path, {
+            "version": CACHE_VERSION,
+            "source": source_path.name,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_sha256(source_path),
+            "columns": list(df.columns),
+            "records": len(df),
+        })
+        self.hits[source_path.name] = "miss"
+        return df
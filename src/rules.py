@@ -0,0 +1,273 @@
+"""Reglas declarativas de limpieza por columna.
+
+Las reglas se leen de ``static/config/cleaning_rules.json``. Cada columna
+puede declarar:
+
+- ``fill``: relleno de nulos: ``auto`` (mediana si la columna es numérica,
+  moda si no), ``median``, ``mode``, ``value`` (con la clave ``value``) o
+  ``none``;
+- ``dtype``: tipo de destino: ``bool``, ``int``, ``float``, ``datetime``,
+  ``string`` o ``category``. Los valores que no se pueden convertir a un tipo
+  numérico o de fecha (o a entero sin decimales) son inválidos;
+- ``validate``: expresión regular que deben cumplir los valores no nulos (se
+  busca en el valor; ``^...$`` exige que lo cubra entero);
+- ``transform``: método de texto aplicado al final: ``title``, ``lower``,
+  ``upper`` o ``strip``.
+
+``default`` se aplica a todas las columnas y cada entrada de ``columns`` lo
+completa; las reglas de columnas que no están en los datos se ignoran, así
+que una columna nueva (p. ej. ``tags`` o un salario) solo necesita su
+entrada en el archivo. Las filas con algún valor inválido se descartan y se
+cuentan por columna en el reporte de limpieza.
+"""
+import json
+import logging
+import re
+from pathlib import Path
+
+from config import active_config
+from dtypes import ARROW_STRING, CATEGORY, fill_nulls, str_method
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = active_config().config_dir / "cleaning_rules.json"
+
+FILL_STRATEGIES = ("auto", "median", "mode", "value", "none")
+# Tipo de destino -> descripción en el reporte de limpieza
+DTYPE_CONVERSIONS = {
+    "bool": "Convertido a booleano",
+    "int": "Convertido a entero",
+    "float": "Convertido a decimal",
+    "datetime": "Convertido a fecha",
+    "string": "Convertido a texto",
+    "category": "Convertido a categoría",
+}
+# Tipos que se interpretan antes de rellenar: el relleno se calcula sobre los valores convertidos
+PARSED_DTYPES = ("int", "float", "datetime")
+TRANSFORMS = {
+    "title": "Normalizado a título case",
+    "lower": "Normalizado a minúsculas",
+    "upper": "Normalizado a mayúsculas",
+    "strip": "Espacios recortados",
+}
+DEFAULT_RULE = {"fill": "auto"}
+
+
+def _map_categories(series, func):
+    """Aplica ``func`` a las categorías y reparte el resultado por fila (sin nulos)"""
+    values = np.asarray(func(series.cat.categories))
+    codes = series.cat.codes.to_numpy()
+    return values[codes], codes >= 0
+
+
+def _parse_values(values, dtype):
+    if dtype == "datetime":
+        return pd.to_datetime(values, errors="coerce")
+    return pd.to_numeric(values, errors="coerce")
+
+
+class ColumnRule:
+    """Regla de limpieza de una columna"""
+
+    def __init__(self, column, fill="auto", value=None, dtype=None, validate=None,
+                 transform=None):
+        if fill not in FILL_STRATEGIES:
+            raise ValueError(f"Estrategia de relleno no soportada en {column}: {fill}")
+        if dtype is not None and dtype not in DTYPE_CONVERSIONS:
+            raise ValueError(f"Tipo de destino no soportado en {column}: {dtype}")
+        if transform is not None and transform not in TRANSFORMS:
+            raise ValueError(f"Transformación no soportada en {column}: {transform}")
+        if fill == "value" and value is None:
+            raise ValueError(f"La regla de {column} rellena con 'value' pero no lo define")
+        self.column = column
+        self.fill = fill
+        self.value = value
+        self.dtype = dtype
+        self.validate = validate
+        self.transform = transform
+        re.compile(validate or "")  # expresiones mal formadas fallan al cargar las reglas
+
+    def parse(self, series):
+        """Convierte los tipos numéricos y de fecha; los valores no convertibles quedan nulos"""
+        if self.dtype not in PARSED_DTYPES:
+            return series
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values, present = _map_categories(series, lambda cats: _parse_values(cats, self.dtype))
+            parsed = pd.Series(values, index=series.index)
+            return parsed.where(present)
+        return _parse_values(series, self.dtype)
+
+    def invalid(self, series, parsed):
+        """Máscara de valores no nulos que incumplen la regla"""
+        present = series.notna().to_numpy()
+        invalid = np.zeros(len(series), dtype=bool)
+        if self.validate:
+            invalid |= present & ~self._matches(series)
+        if parsed is not series:
+            invalid |= present & parsed.isna().to_numpy()
+            if self.dtype == "int":
+                invalid |= (parsed.notna() & (parsed % 1 != 0)).to_numpy()
+        return invalid
+
+    def _matches(self, series):
+        def contains(values):
+            # Las cadenas de Arrow evalúan la expresión sin pasar por objetos de Python
+            if not isinstance(values.dtype, pd.StringDtype):
+                values = values.astype(ARROW_STRING)
+            matches = values.str.contains(self.validate, regex=True)
+            return matches.fillna(False).to_numpy(dtype=bool)
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Una evaluación por categoría
+            matches, present = _map_categories(series, lambda cats: contains(pd.Series(cats)))
+            return matches & present
+        return contains(series)
+
+    def strategy(self, numeric):
+        """Relleno efectivo (``median``, ``mode``, ``value`` o ``none``) según el tipo"""
+        if self.fill == "auto":
+            return "median" if numeric else "mode"
+        if self.fill == "median" and not numeric:
+            raise ValueError(f"La columna {self.column} no es numérica: no admite mediana")
+        return self.fill
+
+    def fill_value(self, series):
+        """Valor de relleno calculado sobre ``series`` (None si no se rellena)"""
+        strategy = self.strategy(pd.api.types.is_numeric_dtype(series))
+        if strategy == "median":
+            return series.median()
+        if strategy == "mode":
+            mode_values = series.mode()
+            return mode_values[0] if not mode_values.empty else ""
+        if strategy == "value":
+            return self.value
+        return None
+
+    def cast(self, series):
+        if self.dtype == "bool":
+            return series.astype(bool)
+        if self.dtype == "int":
+            return series.astype("Int64")
+        if self.dtype == "float":
+            return series.astype("float64")
+        if self.dtype == "string":
+            return series.astype(ARROW_STRING)
+        if self.dtype == "category":
+            return series.astype(CATEGORY)
+        return series  # datetime ya convertido en ``parse``
+
+
+class CleaningRules:
+    """Reglas de limpieza de todas las columnas, compiladas una vez.
+
+    ``validate`` y ``apply`` recorren el DataFrame una sola vez: cada columna
+    se transforma por separado y el resultado se arma sin copiar las
+    columnas que no cambian.
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.default = {**DEFAULT_RULE, **config.get("default", {})}
+        self.columns = config.get("columns", {})
+        self._rules = {}
+        self.rule(None)
+        for column in self.columns:
+            self.rule(column)
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def rule(self, column):
+        if column not in self._rules:
+            self._rules[column] = ColumnRule(column, **{**self.default,
+                                                        **self.columns.get(column, {})})
+        return self._rules[column]
+
+    def parse(self, df):
+        """Columnas numéricas y de fecha convertidas según sus reglas"""
+        columns = {col: self.rule(col).parse(df[col]) for col in df.columns}
+        return pd.DataFrame(columns, index=df.index, copy=False)
+
+    def validate(self, df):
+        """Convierte y valida ``df``.
+
+        Devuelve el DataFrame convertido, la máscara de filas rechazadas y las
+        filas rechazadas por cada columna (una fila puede fallar en varias).
+        """
+        columns = {}
+        invalid = np.zeros(len(df), dtype=bool)
+        rejected = {}
+        for col in df.columns:
+            rule = self.rule(col)
+            columns[col] = rule.parse(df[col])
+            column_invalid = rule.invalid(df[col], columns[col])
+            if column_invalid.any():
+                rejected[col] = int(column_invalid.sum())
+                invalid |= column_invalid
+        return pd.DataFrame(columns, index=df.index, copy=False), invalid, rejected
+
+    def fill_values(self, df, null_counts):
+        """Valores de relleno de las columnas con nulos que tienen estrategia"""
+        fill_values = {}
+        for col in df.columns:
+            if null_counts[col]:
+                value = self.rule(col).fill_value(df[col])
+                if value is not None:
+                    fill_values[col] = value
+        return fill_values
+
+    def apply(self, df, fill_values, dtypes=None):
+        """Relleno, tipo de destino y transformación de cada columna.
+
+        ``dtypes`` fija el tipo de las columnas sin tipo de destino (en la
+        limpieza por bloques, el tipo global de la tabla).
+        """
+        columns = {}
+        for col in df.columns:
+            rule = self.rule(col)
+            series = rule.parse(df[col])
+            if col in fill_values:
+                series = fill_nulls(series, fill_values[col])
+            if rule.dtype is not None:
+                series = rule.cast(series)
+            elif dtypes is not None and col in dtypes:
+                series = series.astype(dtypes[col])
+            if rule.transform:
+                series = str_method(series, rule.transform)
+            columns[col] = series
+        return pd.DataFrame(columns, index=df.index, copy=False)
+
+    def report(self, columns, null_counts, fill_values, rejected):
+        """Parte del reporte de limpieza que describe las reglas aplicadas"""
+        report = {
+            "null_handling": {
+                col: f"Rellenados {null_counts[col]} nulos con {fill_values[col]}"
+                for col in columns if col in fill_values
+            },
+            "type_conversions": {},
+            "transformations": {},
+            "rejected_rows": rejected["rows"],
+            "rejected_by_column": dict(rejected["by_column"]),
+        }
+        for col in columns:
+            rule = self.rule(col)
+            if rule.dtype is not None:
+                report["type_conversions"][col] = DTYPE_CONVERSIONS[rule.dtype]
+            if rule.transform is not None:
+                report["transformations"][col] = TRANSFORMS[rule.transform]
+        return report
+
+
+def load_rules(path=RULES_PATH):
+    """Reglas del archivo de configuración (solo el relleno por defecto si no existe)"""
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"No se encontró {path}: se rellenan los nulos sin más reglas")
+        return CleaningRules()
+    return CleaningRules.from_file(path)
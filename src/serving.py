@@ -0,0 +1,557 @@
+"""Capa de consulta sobre los datos enriquecidos.
+
+Materializa la salida del enriquecimiento (``enriched_data.parquet`` y las
+partes de ``incremental.py``) en una base SQLite propia
+(``static/serving/enriched.db``) con índices por empresa, ubicación, sector,
+modalidad remota y título, y mantiene precalculados los agregados más
+consultados:
+
+- ``job_counts``: ofertas y ofertas remotas por ``company_name``,
+  ``location``, ``industry`` (el ``industry_name`` del XML de sectores o, si
+  no hubo coincidencia, el ``industry`` de la oferta) y ``remote``;
+- ``title_salaries``: número de ofertas y rango salarial por título.
+
+Los agregados los mantienen triggers de SQLite, así que un ``refresh`` solo
+paga las filas que cambiaron: se omiten las fuentes con el mismo hash de
+archivo y, de las demás, solo se escriben las filas con otro hash de fila y
+se borran las que desaparecieron de su fuente.
+La primera carga (o ``--rebuild``) inserta sin triggers y calcula los
+agregados con un ``GROUP BY``. Las consultas solo leen índices y agregados:
+no cargan pandas ni el Excel de muestra.
+
+En los agregados, los valores nulos de una dimensión se guardan como ``''``.
+
+Uso:
+    python src/serving.py refresh [--rebuild]
+    python src/serving.py counts {company_name,location,industry,remote} [--value X] [--limit N]
+    python src/serving.py remote-share [--dimension location] [--limit N]
+    python src/serving.py salaries [--title X] [--limit N]
+    python src/serving.py jobs [--company X] [--location X] [--industry X] [--remote|--on-site]
+    (todas las consultas aceptan --json)
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import config
+import incremental
+import storage
+from enrichement import ENRICHED_DATA_PATH
+from lazy import lazy_import
+from stage_cache import file_fingerprint
+from stage_io import read_stage
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+SERVING_DB_PATH = config.active_config().static_dir / "serving" / "enriched.db"
+
+# Columnas servidas de la salida enriquecida (las que falten en una fuente
+# quedan nulas). ``id`` es el de jobs: identifica la oferta tanto en la
+# salida completa como en las partes incrementales
+COLUMNS = {
+    "id": "INTEGER PRIMARY KEY",
+    "title": "TEXT",
+    "company_name": "TEXT",
+    "location": "TEXT",
+    "remote": "INTEGER",
+    "url": "TEXT",
+    "founded_year": "REAL",
+    "employees": "REAL",
+    "industry": "TEXT",
+    "min_salary": "REAL",
+    "max_salary": "REAL",
+    "currency": "TEXT",
+    "salary_match_score": "REAL",
+    "country": "TEXT",
+    "continent": "TEXT",
+    "cost_of_living_index": "REAL",
+    "location_match_score": "REAL",
+    "industry_name": "TEXT",
+    "growth_rate": "REAL",
+    "avg_salary": "REAL",
+}
+
+# Dimensiones de job_counts: nombre -> expresión sobre la fila ({row} es
+# "NEW.", "OLD." o vacío)
+COUNT_DIMENSIONS = {
+    "company_name": "{row}company_name",
+    "location": "{row}location",
+    "industry": "COALESCE({row}industry_name, {row}industry)",
+    "remote": "{row}remote",
+}
+# Columnas que alimentan los agregados: solo su cambio dispara los triggers de UPDATE
+AGGREGATE_COLUMNS = ("company_name", "location", "industry", "industry_name", "remote",
+                     "title", "min_salary", "max_salary")
+
+JOB_INDEXES = {
+    "ix_enriched_jobs_source": "source",
+    "ix_enriched_jobs_company_name": "company_name",
+    "ix_enriched_jobs_location": "location",
+    "ix_enriched_jobs_industry": COUNT_DIMENSIONS["industry"].format(row=""),
+    "ix_enriched_jobs_remote": "remote",
+    "ix_enriched_jobs_title": "title",
+}
+
+# Filas por lote al cargar una fuente
+LOAD_BATCH_SIZE = 50_000
+DEFAULT_LIMIT = 20
+
+
+def enriched_sources(full_path=ENRICHED_DATA_PATH, parts_dir=incremental.ENRICHED_PARTS_DIR):
+    """Salidas enriquecidas disponibles (nombre -> ruta).
+
+    La salida completa del pipeline y cada parte registrada en el manifiesto
+    de ``incremental.py`` son fuentes independientes.
+    """
+    sources = {}
+    full_path = Path(full_path)
+    if full_path.exists():
+        sources[full_path.name] = full_path
+    manifest = incremental.load_manifest(parts_dir)
+    for part in (manifest["parts"] if manifest else []):
+        sources[f"parts/{part['name']}"] = Path(parts_dir) / part["name"]
+    return sources
+
+
+def _add_counts(row):
+    values = ", ".join(
+        f"('{name}', IFNULL({expression.format(row=row)}, ''), 1, IFNULL({row}remote, 0) != 0)"
+        for name, expression in COUNT_DIMENSIONS.items()
+    )
+    return f"""
+        INSERT INTO job_counts (dimension, value, records, remote_records) VALUES {values}
+        ON CONFLICT (dimension, value) DO UPDATE SET
+            records = records + 1, remote_records = remote_records + excluded.remote_records;
+    """
+
+
+def _remove_counts(row):
+    # Una sentencia por dimensión: cada una busca por la clave primaria
+    return "".join(f"""
+        UPDATE job_counts SET records = records - 1,
+            remote_records = remote_records - (IFNULL({row}remote, 0) != 0)
+        WHERE dimension = '{name}' AND value = IFNULL({expression.format(row=row)}, '');
+        DELETE FROM job_counts
+        WHERE dimension = '{name}' AND value = IFNULL({expression.format(row=row)}, '')
+            AND records = 0;
+    """ for name, expression in COUNT_DIMENSIONS.items())
+
+
+def _add_salary(row):
+    # MIN/MAX con varios argumentos devuelven NULL si alguno lo es
+    return f"""
+        INSERT INTO title_salaries (title, postings, min_salary, max_salary)
+        VALUES (IFNULL({row}title, ''), 1, {row}min_salary, {row}max_salary)
+        ON CONFLICT (title) DO UPDATE SET postings = postings + 1,
+            min_salary = MIN(IFNULL(min_salary, excluded.min_salary),
+                             IFNULL(excluded.min_salary, min_salary)),
+            max_salary = MAX(IFNULL(max_salary, excluded.max_salary),
+                             IFNULL(excluded.max_salary, max_salary));
+    """
+
+
+def _recompute_salary(row):
+    # Un borrado puede quitar el mínimo o el máximo: se recalcula el título
+    # sobre su índice en lugar de restar. Dentro de un trigger no vale INSERT
+    # OR REPLACE (manda la política de conflictos de la sentencia exterior)
+    title = f"IFNULL({row}title, '')"
+    return f"""
+        DELETE FROM title_salaries WHERE title = {title};
+        INSERT INTO title_salaries (title, postings, min_salary, max_salary)
+        SELECT * FROM (
+            SELECT {title}, COUNT(*) AS postings, MIN(min_salary), MAX(max_salary)
+            FROM enriched_jobs WHERE title = {title} OR ({title} = '' AND title IS NULL)
+        ) WHERE postings > 0;
+    """
+
+
+def _aggregate_triggers():
+    changed = (f"({', '.join(f'OLD.{c}' for c in AGGREGATE_COLUMNS)}) IS NOT "
+               f"({', '.join(f'NEW.{c}' for c in AGGREGATE_COLUMNS)})")
+    return {
+        "enriched_jobs_aggregate_insert":
+            f"AFTER INSERT ON enriched_jobs BEGIN {_add_counts('NEW.')} {_add_salary('NEW.')} END",
+        "enriched_jobs_aggregate_delete":
+            f"AFTER DELETE ON enriched_jobs BEGIN {_remove_counts('OLD.')} "
+            f"{_recompute_salary('OLD.')} END",
+        "enriched_jobs_aggregate_update":
+            f"AFTER UPDATE OF {', '.join(AGGREGATE_COLUMNS)} ON enriched_jobs WHEN {changed} "
+            f"BEGIN {_remove_counts('OLD.')} {_add_counts('NEW.')} "
+            f"{_recompute_salary('OLD.')} {_recompute_salary('NEW.')} END",
+    }
+
+
+def _upsert_sql():
+    columns = ["source", "row_hash", *COLUMNS]
+    values = [column for column in columns if column not in ("id", "source")]
+    # Una fila con otro hash pero los mismos valores (p. ej. si cambió su
+    # dtype) solo actualiza row_hash: no dispara los triggers de agregados
+    return f"""
+        INSERT INTO enriched_jobs ({', '.join(columns)})
+        VALUES ({', '.join('?' for _ in columns)})
+        ON CONFLICT (id) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')}
+        WHERE ({', '.join(values)}) IS NOT ({', '.join(f'excluded.{c}' for c in values)})
+    """
+
+
+def _python_values(values):
+    """Columna como lista de valores de Python (``None`` para los nulos)"""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class ServingStore:
+    """Base SQLite de consulta con los datos enriquecidos y sus agregados.
+
+    Con ``read_only`` solo se consulta (la base debe existir); sin él, se
+    crea el esquema si falta y ``refresh`` la sincroniza con las salidas del
+    enriquecimiento.
+    """
+
+    def __init__(self, path=SERVING_DB_PATH, read_only=False):
+        self.path = Path(path)
+        if read_only and not self.path.exists():
+            raise FileNotFoundError(
+                f"La base de consulta no existe en {self.path}: "
+                "ejecuta antes 'python src/serving.py refresh'"
+            )
+        self.conn = storage.connect(self.path, read_only=read_only)
+        self.conn.row_factory = sqlite3.Row
+        if not read_only:
+            self._create_schema()
+
+    def _create_schema(self):
+        columns = ",\n".join(f"{name} {sql_type}" for name, sql_type in COLUMNS.items())
+        with self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS enriched_jobs (
+                    {columns},
+                    source TEXT NOT NULL,
+                    row_hash INTEGER NOT NULL
+                )
+            """)
+            self._create_indexes()
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_counts (
+                    dimension TEXT NOT NULL,
+                    value NOT NULL,
+                    records INTEGER NOT NULL,
+                    remote_records INTEGER NOT NULL,
+                    PRIMARY KEY (dimension, value)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_job_counts_records "
+                              "ON job_counts (dimension, records DESC)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS title_salaries (
+                    title TEXT PRIMARY KEY,
+                    postings INTEGER NOT NULL,
+                    min_salary REAL,
+                    max_salary REAL
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_title_salaries_postings "
+                              "ON title_salaries (postings DESC)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS serving_sources (
+                    name TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    records INTEGER NOT NULL,
+                    loaded_at REAL NOT NULL
+                )
+            """)
+        self._create_triggers()
+
+    def _create_indexes(self):
+        for name, expression in JOB_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON enriched_jobs ({expression})")
+
+    def _drop_indexes(self):
+        for name in JOB_INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def _create_triggers(self):
+        for name, body in _aggregate_triggers().items():
+            self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    def _drop_triggers(self):
+        for name in _aggregate_triggers():
+            self.conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def rebuild_aggregates(self):
+        """Recalcula los agregados desde cero con ``GROUP BY`` (dentro de la transacción en curso)"""
+        self.conn.execute("DELETE FROM job_counts")
+        for name, expression in COUNT_DIMENSIONS.items():
+            self.conn.execute(f"""
+                INSERT INTO job_counts (dimension, value, records, remote_records)
+                SELECT '{name}', IFNULL({expression.format(row='')}, ''), COUNT(*),
+                       SUM(IFNULL(remote, 0) != 0)
+                FROM enriched_jobs GROUP BY 2
+            """)
+        self.conn.execute("DELETE FROM title_salaries")
+        self.conn.execute("""
+            INSERT INTO title_salaries (title, postings, min_salary, max_salary)
+            SELECT IFNULL(title, ''), COUNT(*), MIN(min_salary), MAX(max_salary)
+            FROM enriched_jobs GROUP BY 1
+        """)
+
+    def _load_source(self, name, path, fingerprint):
+        """Sincroniza las filas de una fuente comparando el hash de cada fila.
+
+        Solo se convierten y escriben las filas nuevas o con otro hash que el
+        guardado, y se borran las de la fuente que ya no están en el archivo
+        (p. ej. descartadas como duplicado en una nueva limpieza).
+        """
+        df = read_stage(path)
+        if "id" not in df.columns:
+            raise ValueError(f"La fuente {path} no tiene la columna id")
+        df = df[[column for column in COLUMNS if column in df.columns]]
+        # SQLite almacena enteros con signo: se reinterpretan los uint64
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+        ids = df["id"].to_numpy(dtype=np.int64)
+
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        stored = np.array(cursor.execute(
+            "SELECT id, row_hash, source = ? FROM enriched_jobs", (name,)
+        ).fetchall(), dtype=np.int64).reshape(-1, 3)
+        stored_ids, stored_hashes, owned = stored.T
+        positions = pd.Index(stored_ids).get_indexer(ids)
+        known = positions >= 0
+        pending = ~known
+        pending[known] = stored_hashes[positions[known]] != hashes[known]
+        stale = stored_ids[(owned == 1) & ~np.isin(stored_ids, ids)]
+
+        cursor.executemany("DELETE FROM enriched_jobs WHERE id = ?", zip(stale.tolist()))
+        upsert_sql = _upsert_sql()
+        rows, row_hashes = df[pending], hashes[pending]
+        missing = [None] * LOAD_BATCH_SIZE
+        for start in range(0, len(rows), LOAD_BATCH_SIZE):
+            batch = rows.iloc[start:start + LOAD_BATCH_SIZE]
+            values = [_python_values(batch[column]) if column in batch.columns else missing
+                      for column in COLUMNS]
+            cursor.executemany(upsert_sql, zip(
+                [name] * len(batch), row_hashes[start:start + LOAD_BATCH_SIZE].tolist(), *values
+            ))
+        cursor.execute(
+            "INSERT OR REPLACE INTO serving_sources (name, fingerprint, records, loaded_at) "
+            "VALUES (?, ?, ?, ?)",
+            (name, fingerprint, len(df), time.time()),
+        )
+        logger.info(f"Fuente cargada en la base de consulta: {name} ({len(df)} registros, "
+                    f"{int(pending.sum())} nuevos o modificados, {len(stale)} eliminados)")
+
+    def refresh(self, sources=None, rebuild=False):
+        """Sincroniza la base con ``sources`` (por defecto ``enriched_sources()``).
+
+        Solo se cargan las fuentes nuevas o cuyo hash cambió y se borran las
+        filas de las que ya no existen. Si desaparece una fuente se recargan
+        las demás, porque una oferta puede estar en varias (la salida completa
+        y una parte). Las fuentes se cargan de la más antigua a la más
+        reciente, así que una oferta repetida conserva su última versión. Todo
+        ocurre en una transacción: las consultas concurrentes ven la base
+        anterior hasta que termina. Devuelve las fuentes cargadas y borradas.
+        """
+        sources = enriched_sources() if sources is None else sources
+        fingerprints = {name: file_fingerprint(path) for name, path in sources.items()}
+        known = {row["name"]: row["fingerprint"]
+                 for row in self.conn.execute("SELECT name, fingerprint FROM serving_sources")}
+        removed = [] if rebuild else [name for name in known if name not in sources]
+        changed = sorted((name for name in sources
+                          if rebuild or removed or known.get(name) != fingerprints[name]),
+                         key=lambda name: Path(sources[name]).stat().st_mtime_ns)
+        if not (rebuild or removed or changed):
+            logger.info("Base de consulta al día: ninguna fuente cambió")
+            return {"loaded": [], "removed": []}
+
+        with self.conn:
+            self.conn.execute("BEGIN")
+            # Carga masiva sin triggers ni índices secundarios: es más barato
+            # indexar y agregar al final con GROUP BY que fila a fila
+            bulk = rebuild or self.conn.execute(
+                "SELECT 1 FROM enriched_jobs LIMIT 1").fetchone() is None
+            if bulk:
+                self._drop_triggers()
+                self._drop_indexes()
+            if rebuild:
+                self.conn.execute("DELETE FROM serving_sources")
+                self.conn.execute("DELETE FROM enriched_jobs")
+            for name in removed:
+                self.conn.execute("DELETE FROM enriched_jobs WHERE source = ?", (name,))
+                self.conn.execute("DELETE FROM serving_sources WHERE name = ?", (name,))
+                logger.info(f"Fuente eliminada de la base de consulta: {name}")
+            for name in changed:
+                self._load_source(name, sources[name], fingerprints[name])
+            if bulk:
+                self._create_indexes()
+                self.rebuild_aggregates()
+                self._create_triggers()
+        self.conn.execute("PRAGMA optimize")
+        return {"loaded": changed, "removed": removed}
+
+    def _fetch(self, sql, params=()):
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def counts(self, dimension, value=None, limit=DEFAULT_LIMIT):
+        """Ofertas y ofertas remotas por valor de ``dimension`` (de más a menos ofertas)"""
+        if dimension not in COUNT_DIMENSIONS:
+            raise ValueError(f"Dimensión no soportada: {dimension} "
+                             f"(disponibles: {', '.join(COUNT_DIMENSIONS)})")
+        if value is not None:
+            if dimension == "remote" and value != "":
+                value = int(value)  # se guarda como 0/1
+            return self._fetch(
+                "SELECT value, records, remote_records FROM job_counts "
+                "WHERE dimension = ? AND value = ?", (dimension, value),
+            )
+        return self._fetch(
+            "SELECT value, records, remote_records FROM job_counts WHERE dimension = ? "
+            "ORDER BY records DESC LIMIT ?", (dimension, limit),
+        )
+
+    def remote_share(self, dimension="location", limit=DEFAULT_LIMIT):
+        """Proporción de ofertas remotas por valor de ``dimension``"""
+        return [
+            {**row, "remote_share": row["remote_records"] / row["records"]}
+            for row in self.counts(dimension, limit=limit)
+        ]
+
+    def salaries(self, title=None, limit=DEFAULT_LIMIT):
+        """Rango salarial por título (uno concreto o los de más ofertas)"""
+        if title is not None:
+            return self._fetch("SELECT * FROM title_salaries WHERE title = ?", (title,))
+        return self._fetch(
+            "SELECT * FROM title_salaries ORDER BY postings DESC LIMIT ?", (limit,)
+        )
+
+    def jobs(self, company=None, location=None, industry=None, remote=None,
+             limit=DEFAULT_LIMIT):
+        """Ofertas que cumplen todos los filtros dados (cada uno tiene su índice)"""
+        filters = {
+            "company_name = ?": company,
+            "location = ?": location,
+            f"{COUNT_DIMENSIONS['industry'].format(row='')} = ?": industry,
+            "remote = ?": None if remote is None else int(remote),
+        }
+        conditions = [condition for condition, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        sql = f"SELECT {', '.join(COLUMNS)} FROM enriched_jobs"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        return self._fetch(sql + " ORDER BY id LIMIT ?", (*params, limit))
+
+    def sources(self):
+        """Fuentes cargadas, con su hash y número de registros"""
+        return self._fetch("SELECT * FROM serving_sources ORDER BY name")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def refresh(path=SERVING_DB_PATH, rebuild=False):
+    """Sincroniza la base de consulta con las salidas del enriquecimiento"""
+    with ServingStore(path) as store:
+        return store.refresh(rebuild=rebuild)
+
+
+def _print_rows(rows, as_json=False):
+    if as_json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    if not rows:
+        print("(sin resultados)")
+        return
+    columns = list(rows[0])
+    text = [[("" if row[c] is None else f"{row[c]:.3f}" if isinstance(row[c], float)
+              else str(row[c])) for c in columns] for row in rows]
+    widths = [max(len(column), *(len(values[i]) for values in text))
+              for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for values in text:
+        print("  ".join(value.ljust(width) for value, width in zip(values, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas sobre los datos enriquecidos")
+    parser.add_argument("--db", type=Path, default=SERVING_DB_PATH,
+                        help="Base de consulta (por defecto static/serving/enriched.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="Carga en la base de consulta las salidas enriquecidas nuevas o cambiadas"
+    )
+    refresh_parser.add_argument("--rebuild", action="store_true",
+                                help="Vacía la base y la vuelve a cargar completa")
+
+    counts_parser = subparsers.add_parser("counts", help="Ofertas por dimensión")
+    counts_parser.add_argument("dimension", choices=list(COUNT_DIMENSIONS))
+    counts_parser.add_argument("--value", help="Solo este valor de la dimensión")
+
+    share_parser = subparsers.add_parser("remote-share", help="Proporción de ofertas remotas")
+    share_parser.add_argument("--dimension", choices=list(COUNT_DIMENSIONS), default="location")
+
+    salaries_parser = subparsers.add_parser("salaries", help="Rango salarial por título")
+    salaries_parser.add_argument("--title", help="Solo este título")
+
+    jobs_parser = subparsers.add_parser("jobs", help="Ofertas filtradas")
+    jobs_parser.add_argument("--company")
+    jobs_parser.add_argument("--location")
+    jobs_parser.add_argument("--industry")
+    remote_group = jobs_parser.add_mutually_exclusive_group()
+    remote_group.add_argument("--remote", dest="remote", action="store_true", default=None)
+    remote_group.add_argument("--on-site", dest="remote", action="store_false")
+
+    for query_parser in (counts_parser, share_parser, salaries_parser, jobs_parser):
+        query_parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+        query_parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        config.setup(log_file="serving.log")
+        try:
+            result = refresh(args.db, rebuild=args.rebuild)
+            logger.info(f"Base de consulta actualizada en {args.db}: "
+                        f"{len(result['loaded'])} fuentes cargadas, "
+                        f"{len(result['removed'])} eliminadas")
+            return 0
+        except Exception:
+            logger.exception("Error al actualizar la base de consulta")
+            return 1
+
+    try:
+        store = ServingStore(args.db, read_only=True)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    with store:
+        start = time.perf_counter()
+        if args.command == "counts":
+            rows = store.counts(args.dimension, value=args.value, limit=args.limit)
+        elif args.command == "remote-share":
+            rows = store.remote_share(args.dimension, limit=args.limit)
+        elif args.command == "salaries":
+            rows = store.salaries(title=args.title, limit=args.limit)
+        else:
+            rows = store.jobs(company=args.company, location=args.location,
+                              industry=args.industry, remote=args.remote, limit=args.limit)
+        elapsed = time.perf_counter() - start
+    _print_rows(rows, as_json=args.json)
+    print(f"({len(rows)} filas en {elapsed * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
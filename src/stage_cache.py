@@ -0,0 +1,170 @@
+"""Caché de resultados de etapa direccionada por contenido.
+
+Cada etapa calcula una clave con el hash de sus entradas: versión de la
+tabla jobs (``storage.table_version``), hashes de los archivos de entrada
+(datos limpios, fuentes de referencia, reglas), parámetros y versión del
+código (hash de los módulos de ``src``). Si la clave ya está en la caché,
+la etapa restaura sus artefactos (Parquet, muestra XLSX y reporte) en lugar
+de recalcularlos; una ejecución sin cambios solo paga el cálculo de la clave.
+
+Las entradas viven en ``static/cache/stages/<clave>/`` con un
+``entry.json`` que guarda los archivos, su tamaño y el último uso. Los
+artefactos se enlazan (hard link) entre la caché y las rutas de salida
+cuando el sistema de archivos lo permite, y se copian si no: como todas las
+escrituras de ``stage_io`` reemplazan el archivo con un renombrado, una
+ejecución posterior nunca modifica la copia de la caché. Al guardar, las
+entradas usadas hace más tiempo se descartan hasta que el total queda por
+debajo de ``max_bytes``.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from config import active_config
+from reference_cache import file_sha256
+
+logger = logging.getLogger(__name__)
+
+STAGE_CACHE_DIR = active_config().cache_dir / "stages"
+STAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+ENTRY_NAME = "entry.json"
+
+# Versión del formato de la caché: cambiarla invalida todas las entradas
+CACHE_VERSION = 1
+SRC_DIR = Path(__file__).resolve().parent
+
+_code_version = None
+
+
+def code_version():
+    """Hash de los módulos de ``src``: cualquier cambio de código invalida la caché"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(SRC_DIR.glob("*.py")):
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def file_fingerprint(path):
+    """Hash del contenido de un archivo (None si no existe)"""
+    path = Path(path)
+    return file_sha256(path) if path.exists() else None
+
+
+def _link_or_copy(source, target):
+    if target.exists() and os.path.samefile(source, target):
+        return  # ya enlazados (renombrar sobre el mismo archivo no haría nada)
+    # Se enlaza a un temporal y se renombra: ``target`` nunca queda a medias
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.link")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    tmp_path.replace(target)
+
+
+class StageCache:
+    """Artefactos de etapa por clave, con expulsión LRU acotada por tamaño"""
+
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, max_bytes=STAGE_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, stage, inputs):
+        """Clave de una ejecución de ``stage`` con las entradas ``inputs`` (serializables a JSON)"""
+        payload = json.dumps(
+            {"version": CACHE_VERSION, "code": code_version(), "stage": stage, "inputs": inputs},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _read_entry(self, key):
+        try:
+            with open(self.cache_dir / key / ENTRY_NAME, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key, entry):
+        path = self.cache_dir / key / ENTRY_NAME
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        tmp_path.replace(path)
+
+    def contains(self, key, outputs):
+        """Indica si la entrada de ``key`` tiene todos los artefactos de ``outputs``"""
+        entry = self._read_entry(key)
+        return entry is not None and all(
+            Path(path).name in entry["files"] and (self.cache_dir / key / Path(path).name).exists()
+            for path in outputs
+        )
+
+    def restore(self, key, outputs):
+        """Restaura ``outputs`` desde la caché; devuelve False si falta alguno"""
+        if not self.contains(key, outputs):
+            return False
+        for path in outputs:
+            path = Path(path)
+            _link_or_copy(self.cache_dir / key / path.name, path)
+        entry = self._read_entry(key)
+        entry["last_used"] = time.time()
+        self._write_entry(key, entry)
+        logger.info(f"Caché de etapas: {entry['stage']} sin cambios en sus entradas "
+                    f"({key[:12]}), se restauran {len(outputs)} artefactos")
+        return True
+
+    def store(self, key, stage, outputs):
+        """Guarda ``outputs`` bajo ``key`` (se añaden a la entrada si ya existe).
+
+        Los artefactos que la etapa no llegó a escribir (p. ej. la muestra de
+        una tabla vacía) se omiten; la entrada no servirá a quien los pida.
+        """
+        entry_dir = self.cache_dir / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._read_entry(key) or {"stage": stage, "files": {}}
+        for path in map(Path, outputs):
+            if not path.exists():
+                continue
+            _link_or_copy(path, entry_dir / path.name)
+            entry["files"][path.name] = path.stat().st_size
+        entry["size"] = sum(entry["files"].values())
+        entry["last_used"] = time.time()
+        self._write_entry(key, entry)
+        self.evict(keep=key)
+
+    def entries(self):
+        """Entradas de la caché como (clave, entry.json)"""
+        if not self.cache_dir.exists():
+            return []
+        found = []
+        for entry_dir in self.cache_dir.iterdir():
+            entry = self._read_entry(entry_dir.name) if entry_dir.is_dir() else None
+            if entry is not None:  # sin manifiesto: un store en curso o interrumpido
+                found.append((entry_dir.name, entry))
+        return found
+
+    def evict(self, keep=None):
+        """Descarta las entradas menos usadas hasta quedar por debajo de ``max_bytes``"""
+        entries = sorted(self.entries(), key=lambda item: item[1]["last_used"])
+        total = sum(entry["size"] for _, entry in entries)
+        for key, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+            total -= entry["size"]
+            logger.info(f"Caché de etapas: se descarta {entry['stage']} ({key[:12]})")
+
+
+STAGE_CACHE = StageCache()
@@ -0,0 +1,370 @@
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from lazy import lazy_import
+from metrics import instrument
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pa_csv = lazy_import("pyarrow.csv")
+feather = lazy_import("pyarrow.feather")
+ipc = lazy_import("pyarrow.ipc")
+pq = lazy_import("pyarrow.parquet")
+openpyxl = lazy_import("openpyxl")
+
+# Formatos soportados para el intercambio entre etapas
+PARQUET = "parquet"
+FEATHER = "feather"
+XLSX = "xlsx"
+CSV_GZIP = "csv.gz"
+CSV_ZSTD = "csv.zst"
+STAGE_FORMATS = {PARQUET: ".parquet", FEATHER: ".feather", XLSX: ".xlsx",
+                 CSV_GZIP: ".csv.gz", CSV_ZSTD: ".csv.zst"}
+CSV_COMPRESSION = {CSV_GZIP: "gzip", CSV_ZSTD: "zstd"}
+DEFAULT_STAGE_FORMAT = PARQUET
+
+# Filas exportadas a Excel como muestra para revisión humana
+XLSX_SAMPLE_ROWS = 1000
+# Límite de filas de una hoja de Excel (incluida la cabecera): por encima
+# se reparten en hojas Sheet1, Sheet2...
+XLSX_MAX_ROWS = 1_048_576
+# Filas por bloque (y por row group de Parquet) al escribir en streaming
+WRITE_CHUNK_ROWS = 131_072
+# Bloques en cola hacia el hilo escritor de ``BackgroundWriter``
+WRITE_QUEUE_CHUNKS = 2
+_END_OF_STREAM = object()
+
+# Esquema explícito de la salida de limpieza (tabla jobs limpia), como pares
+# (columna, tipo de pyarrow) para no importar pyarrow al cargar el módulo
+CLEANED_JOBS_SCHEMA = (
+    ("id", "int64"),
+    ("title", "string"),
+    ("company_name", "string"),
+    ("location", "string"),
+    ("remote", "bool_"),
+    ("url", "string"),
+)
+
+
+def stage_path(path, fmt=DEFAULT_STAGE_FORMAT):
+    """Devuelve la ruta del artefacto de etapa con la extensión del formato"""
+    if fmt not in STAGE_FORMATS:
+        raise ValueError(f"Formato de etapa no soportado: {fmt}")
+    return Path(path).with_suffix(STAGE_FORMATS[fmt])
+
+
+def _detect_format(path):
+    name = Path(path).name.lower()
+    # Primero las extensiones compuestas (.csv.gz) que terminan igual que otras
+    for fmt, ext in sorted(STAGE_FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(ext):
+            return fmt
+    raise ValueError(f"No se reconoce el formato del archivo: {path}")
+
+
+def _tmp_path(path):
+    # Oculto (prefijo "."): pyarrow lo ignora al leer la carpeta como dataset
+    return path.with_name(f".{path.name}.tmp")
+
+
+@contextmanager
+def atomic_path(path):
+    """Ruta temporal que reemplaza a ``path`` solo si el bloque termina sin errores.
+
+    Una ejecución que falla a mitad de escritura no deja artefactos a medias:
+    ``path`` conserva su versión anterior (o no existe).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _tmp_path(path)
+    # Un temporal que quedó de otra ejecución podría ser un enlace a la caché
+    # de etapas: se borra en lugar de sobrescribirlo
+    tmp_path.unlink(missing_ok=True)
+    try:
+        yield tmp_path
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(path)
+
+
+def write_report(path, text):
+    """Escribe un reporte de auditoría de forma atómica"""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return Path(path)
+
+
+def iter_chunks(df, rows=WRITE_CHUNK_ROWS):
+    """Bloques consecutivos de ``df`` (al menos uno, aunque esté vacío)"""
+    for start in range(0, max(len(df), 1), rows):
+        yield df.iloc[start:start + rows]
+
+
+def _arrow_schema(schema):
+    """``pa.Schema`` a partir de un esquema de pyarrow o de pares (columna, tipo)"""
+    if schema is None or isinstance(schema, pa.Schema):
+        return schema
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in schema])
+
+
+def _to_table(df, schema=None):
+    schema = _arrow_schema(schema)
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    # Solo se fuerzan los campos presentes; el resto se infiere
+    fields = [schema.field(name) for name in schema.names if name in df.columns]
+    extra = [name for name in df.columns if name not in schema.names]
+    table = pa.Table.from_pandas(df[[f.name for f in fields]], schema=pa.schema(fields),
+                                 preserve_index=False)
+    for name in extra:
+        table = table.append_column(name, pa.Array.from_pandas(df[name]))
+    return table.select(list(df.columns))
+
+
+@instrument
+def write_stage(df, path, fmt=None, schema=None):
+    """Escribe la salida de una etapa en formato columnar (o XLSX/CSV si se pide).
+
+    El archivo se escribe a un temporal y se renombra al terminar. XLSX y CSV
+    se escriben por bloques con ``StageWriter``.
+    """
+    fmt = fmt or _detect_format(path)
+    path = Path(path)
+    if fmt not in (PARQUET, FEATHER):
+        with StageWriter(path, fmt=fmt, schema=schema) as writer:
+            for chunk in iter_chunks(df):
+                writer.write(chunk)
+        return path
+    with atomic_path(path) as tmp_path:
+        if fmt == PARQUET:
+            pq.write_table(_to_table(df, schema), tmp_path, compression="snappy")
+        else:
+            feather.write_feather(_to_table(df, schema), tmp_path, compression="uncompressed")
+    return path
+
+
+class _XlsxWriter:
+    """Libro de Excel en modo write-only de openpyxl: las filas van a disco al
+    añadirlas y no se guarda el libro en memoria. Reparte las filas en hojas
+    de hasta ``XLSX_MAX_ROWS`` (con cabecera)."""
+
+    def __init__(self, path, max_rows=XLSX_MAX_ROWS):
+        self.path = path
+        self.max_rows = max_rows
+        self.sheets = 0
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = None
+        self._sheet_rows = 0
+        self._header = None
+
+    def _new_sheet(self):
+        self.sheets += 1
+        self._sheet = self._workbook.create_sheet(f"Sheet{self.sheets}")
+        self._sheet.append(self._header)
+        self._sheet_rows = 1
+
+    def write(self, df):
+        if self._header is None:
+            self._header = [str(col) for col in df.columns]
+        # Valores de Python, con los nulos (NaN, NA, NaT) como celdas vacías
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self._sheet is None or self._sheet_rows == self.max_rows:
+                self._new_sheet()
+            self._sheet.append(row)
+            self._sheet_rows += 1
+
+    def close(self):
+        if self._sheet is None:
+            self._new_sheet()
+        self._workbook.save(self.path)
+
+
+class _CsvWriter:
+    """CSV comprimido (gzip o zstd) escrito por bloques con el escritor de pyarrow"""
+
+    def __init__(self, path, schema, compression):
+        self._stream = pa.CompressedOutputStream(str(path), compression)
+        self._writer = pa_csv.CSVWriter(self._stream, schema)
+
+    def write_table(self, table):
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+        self._stream.close()
+
+
+class StageWriter:
+    """Escritor incremental de una salida de etapa, por bloques de filas.
+
+    Parquet escribe un row group por bloque, Feather un record batch, CSV
+    añade las filas al flujo comprimido y XLSX las añade a la hoja en modo
+    write-only, de modo que la etapa no necesita tener toda la salida en
+    memoria. Se escribe a un temporal que solo reemplaza a ``path`` al cerrar
+    sin errores; si el bloque ``with`` falla, el temporal se descarta.
+    """
+
+    def __init__(self, path, fmt=None, schema=None):
+        self.path = Path(path)
+        self.fmt = fmt or _detect_format(path)
+        if self.fmt not in STAGE_FORMATS:
+            raise ValueError(f"Formato de etapa no soportado: {self.fmt}")
+        self.schema = schema
+        self.rows = 0
+        self._tmp_path = _tmp_path(self.path)
+        self._writer = None
+        self._table_schema = None
+
+    def _open(self, table_schema):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path.unlink(missing_ok=True)  # ver atomic_path
+        self._table_schema = table_schema
+        if self.fmt == PARQUET:
+            return pq.ParquetWriter(self._tmp_path, table_schema, compression="snappy")
+        if self.fmt == FEATHER:
+            return ipc.new_file(self._tmp_path, table_schema)
+        return _CsvWriter(self._tmp_path, table_schema, CSV_COMPRESSION[self.fmt])
+
+    def write(self, df):
+        if self.fmt == XLSX:
+            if self._writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._tmp_path.unlink(missing_ok=True)  # ver atomic_path
+                self._writer = _XlsxWriter(self._tmp_path, XLSX_MAX_ROWS)
+            self._writer.write(df)
+            self.rows += len(df)
+            return
+        table = _to_table(df, self.schema)
+        if self._writer is None:
+            self._writer = self._open(table.schema)
+        elif not table.schema.equals(self._table_schema, check_metadata=False):
+            # Columnas fuera del esquema que en este bloque se infieren distinto
+            # (p. ej. vacías o todo nulos): se ajustan a las del primer bloque
+            table = table.cast(self._table_schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._tmp_path.replace(self.path)
+
+    def abort(self):
+        """Descarta lo escrito: ``path`` queda como estaba"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            finally:
+                self._writer = None
+                self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BackgroundWriter:
+    """Envuelve un ``StageWriter`` para escribir sus bloques en un hilo aparte.
+
+    ``write`` deja el bloque en una cola acotada (``queue_size``) y vuelve
+    enseguida, así que codificar y comprimir un bloque se solapa con el
+    cálculo del siguiente (pyarrow libera el GIL al escribir). Un error del
+    hilo escritor se relanza en el siguiente ``write`` o al cerrar, y en ese
+    caso el artefacto se descarta.
+    """
+
+    def __init__(self, writer, queue_size=WRITE_QUEUE_CHUNKS):
+        self.writer = writer
+        self._chunks = queue.Queue(maxsize=queue_size)
+        self._errors = []
+        self._thread = threading.Thread(target=self._run, name=f"writer-{writer.path.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def rows(self):
+        return self.writer.rows
+
+    def _run(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _END_OF_STREAM:
+                return
+            if self._errors:
+                continue  # se vacía la cola para no bloquear al productor
+            try:
+                self.writer.write(chunk)
+            except Exception as e:
+                self._errors.append(e)
+
+    def write(self, df):
+        if self._errors:
+            raise self._errors[0]
+        self._chunks.put(df)
+
+    def _finish(self):
+        if self._thread.is_alive():
+            self._chunks.put(_END_OF_STREAM)
+            self._thread.join()
+
+    def close(self):
+        self._finish()
+        if self._errors:
+            self.writer.abort()
+            raise self._errors[0]
+        self.writer.close()
+
+    def abort(self):
+        self._finish()
+        self.writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+@instrument
+def read_stage(path, fmt=None, columns=None, memory_map=True):
+    """Lee la salida de una etapa anterior.
+
+    Parquet y Feather se leen con ``memory_map`` para evitar copias del
+    archivo en el heap de Python; Feather sin comprimir permite además
+    lecturas sin copia de las columnas numéricas.
+    """
+    fmt = fmt or _detect_format(path)
+    if fmt == XLSX:
+        # Todas las hojas: las salidas grandes se reparten en varias
+        sheets = pd.read_excel(path, usecols=columns, sheet_name=None)
+        return pd.concat(sheets.values(), ignore_index=True)
+    if fmt in CSV_COMPRESSION:
+        # Se descomprime según la extensión; los textos vacíos vuelven a ser nulos
+        options = pa_csv.ConvertOptions(include_columns=columns, strings_can_be_null=True)
+        return pa_csv.read_csv(path, convert_options=options).to_pandas()
+    if fmt == PARQUET:
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+    elif fmt == FEATHER:
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    else:
+        raise ValueError(f"Formato de etapa no soportado: {fmt}")
+    return table.to_pandas()
+
+
+def export_xlsx_sample(df, path, rows=XLSX_SAMPLE_ROWS):
+    """Exporta una muestra de la salida a Excel, solo para consulta humana"""
+    return write_stage(df.head(rows), path, fmt=XLSX)
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+from config import active_config
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Base de datos de ingesta compartida por todas las etapas
+DB_PATH = active_config().db_path
+
+# Ajustes de cada conexión. WAL permite leer mientras el hilo de ingesta
+# escribe y, con synchronous=NORMAL, solo sincroniza en los checkpoints;
+# mmap_size y cache_size (negativo = KiB) evitan releer páginas del disco
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 30_000,
+}
+
+# Índices de jobs: nombre -> (columnas, único). La URL es la clave natural
+# que necesita el upsert; empresa y ubicación sirven a filtros y agregados y
+# se crean al terminar la carga, porque construirlos de una vez es más barato
+# que mantenerlos fila a fila durante una carga masiva
+KEY_INDEXES = {
+    "ux_jobs_url": (("url",), True),
+}
+QUERY_INDEXES = {
+    "ix_jobs_company_name": (("company_name",), False),
+    "ix_jobs_location": (("location",), False),
+}
+JOB_INDEXES = {**KEY_INDEXES, **QUERY_INDEXES}
+
+_pool = threading.local()
+
+
+def connect(path=DB_PATH, read_only=False):
+    """Abre una conexión nueva con los ajustes de ``PRAGMAS``.
+
+    Para el uso normal conviene ``get_connection``; una conexión propia solo
+    hace falta cuando su ciclo de vida es distinto (p. ej. un hilo escritor).
+    """
+    path = Path(path)
+    if read_only:
+        conn = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path))
+    for name, value in PRAGMAS.items():
+        if read_only and name == "journal_mode":
+            continue  # el modo WAL se guarda en el archivo; solo lo fija quien escribe
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def get_connection(path=DB_PATH, read_only=False):
+    """Conexión reutilizable del proceso (una por hilo y base de datos).
+
+    sqlite3 no permite compartir una conexión entre hilos sin serializar sus
+    transacciones, así que el "pool" guarda una por hilo. Tras un ``fork``
+    el proceso hijo abre las suyas en lugar de heredar las del padre.
+    """
+    connections = getattr(_pool, "connections", None)
+    if connections is None or _pool.pid != os.getpid():
+        connections = _pool.connections = {}
+        _pool.pid = os.getpid()
+    key = (str(Path(path).resolve()), read_only)
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = connect(path, read_only)
+    return conn
+
+
+def close_connections():
+    """Cierra las conexiones del hilo actual"""
+    connections = getattr(_pool, "connections", None) or {}
+    if getattr(_pool, "pid", None) == os.getpid():
+        for conn in connections.values():
+            conn.close()
+    connections.clear()
+
+
+def ensure_indexes(conn, table="jobs", indexes=JOB_INDEXES):
+    """Crea los índices que falten y actualiza las estadísticas del planificador"""
+    with conn:
+        for name, (columns, unique) in indexes.items():
+            conn.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+                f"ON {table} ({', '.join(columns)})"
+            )
+    conn.execute("PRAGMA optimize")
+
+
+def ensure_table_version(conn, table="jobs"):
+    """Crea el contador de versión de ``table`` si aún no existe.
+
+    Dos triggers incrementan ``table_versions.version`` con cada fila
+    actualizada o borrada (el upsert de la ingesta no reescribe las filas sin
+    cambios). Las inserciones no necesitan trigger, que duplicaría el coste de
+    la carga masiva: con AUTOINCREMENT cada fila nueva sube ``MAX(rowid)``,
+    que ``table_version`` añade a la versión. ``token`` se genera al crear el
+    contador, así que distingue bases de datos distintas y datos cargados
+    antes de los triggers.
+    """
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                version INTEGER NOT NULL
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO table_versions (name, token, version) VALUES (?, ?, 0)",
+                     (table, uuid.uuid4().hex))
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_version_insert")
+        for event in ("UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+
+def table_version(conn, table="jobs"):
+    """Versión del contenido de ``table`` (``token:contador:max_rowid``) sin recorrer sus filas"""
+    ensure_table_version(conn, table)
+    token, version = conn.execute(
+        "SELECT token, version FROM table_versions WHERE name = ?", (table,)
+    ).fetchone()
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0]
+    return f"{token}:{version}:{max_rowid or 0}"
+
+
+def query(sql, params=(), path=DB_PATH, chunksize=None):
+    """Ejecuta una consulta en la conexión del proceso y devuelve un DataFrame"""
+    return pd.read_sql_query(sql, get_connection(path), params=params, chunksize=chunksize)
+
+
+def read_jobs(columns=None, where=None, params=(), path=DB_PATH, chunksize=None):
+    """Lee jobs con la proyección y el filtro resueltos en SQLite.
+
+    ``columns`` limita las columnas leídas y ``where`` (con marcadores ``?``
+    y ``params``) filtra antes de materializar filas en pandas.
+    """
+    sql = f"SELECT {', '.join(columns) if columns else '*'} FROM jobs"
+    if where:
+        sql += f" WHERE {where}"
+    return query(sql, params, path, chunksize)
+
+
+def count_by(column, where=None, params=(), path=DB_PATH):
+    """Registros de jobs por valor de ``column`` (GROUP BY sobre su índice)"""
+    sql = f"SELECT {column}, COUNT(*) AS records FROM jobs"
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" GROUP BY {column} ORDER BY records DESC, {column}"
+    return query(sql, params, path).set_index(column)["records"]
@@ -0,0 +1,22 @@
+"""Configuración común de las pruebas.
+
+Las etapas toman sus rutas de la configuración activa al importarse: antes de
+importarlas se apunta ``BIGDATA_STATIC_DIR`` a una carpeta temporal (con una
+copia de las reglas de limpieza del repositorio) para no tocar
+``src/static``. ``src`` se añade a ``sys.path`` para importar las etapas como
+módulos; cada prueba apunta además la base de datos a ``tmp_path``.
+
+Uso: python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STATIC_DIR = Path(tempfile.mkdtemp(prefix="bigdata_tests_"))
+shutil.copytree(ROOT / "src" / "static" / "config", STATIC_DIR / "config")
+os.environ["BIGDATA_STATIC_DIR"] = str(STATIC_DIR)
+os.environ.pop("BIGDATA_DB_PATH", None)
+sys.path.insert(0, str(ROOT / "src"))
@@ -0,0 +1,126 @@
+"""La limpieza por bloques y la particionada coinciden con ``clean_data``.
+
+Ambas recorren ``jobs`` en varias pasadas y alinean la máscara de filas
+conservadas por posición, así que cualquier lectura en otro orden (por
+ejemplo, SQLite respondiendo desde un índice de ``company_name`` que cubre
+la consulta) desalinea el resultado. Las tablas tienen los índices de la
+ingesta, filas repetidas y nulos en todas las columnas o solo en
+``company_name``.
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleaning
+import enrichement
+import partitioned
+import storage
+from dtypes import optimize_dtypes
+from stage_io import read_stage
+
+ROWS = 3_000
+CHUNKSIZE = 700
+TITLES = ["Data Engineer", "Backend Developer", "Product Manager", "Data Analyst"]
+# Muchas empresas poco repetidas: la moda de relleno depende de qué filas se conservan
+COMPANIES = ["acme gmbh", "globex ag", "initech"] + [f"company {i}" for i in range(400)]
+LOCATIONS = ["Berlin", "Munich", "Hamburg", "Remote"]
+
+
+def make_references():
+    """Fuentes de referencia pequeñas: parte de los valores de ``jobs`` coincide"""
+    return {
+        "companies_info.json": pd.DataFrame({
+            "name": ["Acme GmbH", "Globex AG", "Initech"],
+            "founded_year": [1990, 2005, 1999],
+            "employees": [120, 4_500, 300],
+            "industry": ["tech", "finance", "tech"],
+        }),
+        "salary_ranges.csv": pd.DataFrame({
+            "job_title": ["Data Engineer", "Backend Developer", "Data Analyst (m/w/d)"],
+            "min_salary": [55_000, 50_000, 45_000],
+            "max_salary": [80_000, 70_000, 65_000],
+            "currency": ["EUR", "EUR", "EUR"],
+        }),
+        "locations.xlsx": pd.DataFrame({
+            "city": ["Berlin", "Munich", "Hamburgo"],
+            "country": ["Germany", "Germany", "Germany"],
+            "continent": ["Europe", "Europe", "Europe"],
+            "cost_of_living_index": [70, 80, 75],
+        }),
+        "industry_data.xml": pd.DataFrame({
+            "industry_id": ["tech", "finance"],
+            "industry_name": ["Tech", "Finance"],
+            "growth_rate": [8.5, 3.2],
+            "avg_salary": [75_000.0, 82_000.0],
+        }),
+    }
+
+
+def make_jobs_table(db_path, null_columns, rows=ROWS, seed=1):
+    """Tabla jobs sin NOT NULL con ~10 % de ofertas repetidas y ~10 % de nulos"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "title": rng.choice(TITLES, rows).astype(object),
+        "company_name": rng.choice(COMPANIES, rows).astype(object),
+        "location": rng.choice(LOCATIONS, rows).astype(object),
+        "remote": rng.integers(0, 2, rows),
+        "url": [f"https://www.arbeitnow.com/jobs/job-{i}" for i in range(rows)],
+    })
+    for col in null_columns:
+        df.loc[rng.random(rows) < 0.1, col] = None
+    # Las repeticiones copian una oferta anterior completa (misma URL)
+    repeated = np.flatnonzero(rng.random(rows) < 0.1)
+    repeated = repeated[repeated > 0]
+    source = (rng.random(len(repeated)) * repeated).astype(int)
+    df.iloc[repeated] = df.iloc[source].to_numpy()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT, company_name TEXT, location TEXT, remote BOOLEAN, url TEXT
+            )
+        """)
+        df.to_sql("jobs", conn, if_exists="append", index=False)
+    return db_path
+
+
+@pytest.fixture(params=["all_columns", "company_name_only"])
+def jobs_db(request, tmp_path, monkeypatch):
+    """Tabla jobs con los índices de empresa y ubicación de la ingesta"""
+    null_columns = (["title", "company_name", "location"] if request.param == "all_columns"
+                    else ["company_name"])
+    db_path = make_jobs_table(tmp_path / "jobs.db", null_columns)
+    with sqlite3.connect(db_path) as conn:
+        storage.ensure_indexes(conn, indexes=storage.QUERY_INDEXES)
+
+    storage.close_connections()
+    monkeypatch.setattr(cleaning, "DB_PATH", db_path)
+    yield db_path
+    storage.close_connections()
+
+
+@pytest.fixture
+def expected_clean(jobs_db):
+    clean_df, _ = cleaning.clean_data(cleaning.load_data())
+    return clean_df
+
+
+def test_chunked_cleaning_matches_clean_data(jobs_db, expected_clean, tmp_path):
+    output_path = tmp_path / "cleaned_data.parquet"
+    cleaning.clean_data_chunked(output_path=output_path, chunksize=CHUNKSIZE)
+
+    result, _ = optimize_dtypes(read_stage(output_path))
+    pd.testing.assert_frame_equal(result.reset_index(drop=True),
+                                  expected_clean.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_partitioned_matches_single_process(jobs_db, expected_clean, workers):
+    references = make_references()
+    expected, _ = enrichement.enrich_data(expected_clean, source_frames=references)
+
+    result = partitioned.clean_and_enrich(workers=workers, partitions=4, chunksize=CHUNKSIZE,
+                                          source_frames=references)[3]
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,15 @@
+"""``MemoryDedupIndex`` por bloques marca lo mismo que ``duplicated`` sobre todo el lote."""
+import numpy as np
+import pandas as pd
+
+from dedup import MemoryDedupIndex
+
+
+def test_memory_index_matches_duplicated_across_chunks():
+    hashes = np.random.default_rng(0).integers(0, 20_000, 50_000)
+    index = MemoryDedupIndex()
+    seen = [index.check_and_add(hashes[start:start + 700])[0]
+            for start in range(0, len(hashes), 700)]
+
+    np.testing.assert_array_equal(np.concatenate(seen), pd.Series(hashes).duplicated().to_numpy())
+    assert len(index.blocks) <= np.log2(len(hashes))
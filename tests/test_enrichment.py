@@ -0,0 +1,62 @@
+"""Coincidencias exactas y aproximadas del enriquecimiento."""
+import pandas as pd
+import pytest
+
+import enrichement
+
+SALARIES = pd.DataFrame({
+    "job_title": ["Backend Developer", "Product Manager", "Data Engineer"],
+    "min_salary": [50_000, 60_000, 55_000],
+    "max_salary": [70_000, 85_000, 80_000],
+    "currency": ["EUR", "EUR", "EUR"],
+})
+
+
+@pytest.fixture
+def salary_source(tmp_path, monkeypatch):
+    """Fuente de salarios en ``tmp_path`` (sin caché de referencias)"""
+    SALARIES.to_csv(tmp_path / "salary_ranges.csv", index=False)
+    monkeypatch.setattr(enrichement, "DATA_SOURCES_DIR", tmp_path)
+    monkeypatch.setattr(enrichement, "USE_REFERENCE_CACHE", False)
+
+
+def test_fuzzy_fallback_fills_keys_without_exact_match(salary_source):
+    base_df = pd.DataFrame({"title": ["Backend Developer", "Backend Develper", "Chef"]})
+
+    enriched_df, report = enrichement.enrich_data(base_df, sources=["salary_ranges.csv"])
+
+    info = report["sources"]["salary_ranges.csv"]
+    assert info["matched_records"] == 2
+    assert info["fuzzy_matches"] == 1
+    scores = enriched_df["salary_match_score"].tolist()
+    assert scores[0] == 1.0
+    assert 0.6 <= scores[1] < 1.0
+    assert pd.isna(scores[2])
+    assert enriched_df["min_salary"].tolist()[:2] == [50_000, 50_000]
+    assert pd.isna(enriched_df["min_salary"].iloc[2])
+
+
+def test_without_fuzzy_only_exact_keys_match(salary_source):
+    base_df = pd.DataFrame({"title": ["Backend Developer", "Backend Develper", "Chef"]})
+
+    enriched_df, report = enrichement.enrich_data(base_df, sources=["salary_ranges.csv"],
+                                                  fuzzy=False)
+
+    assert report["sources"]["salary_ranges.csv"]["matched_records"] == 1
+    assert "salary_match_score" not in enriched_df.columns
+
+
+def test_fuzzy_match_with_full_score_is_not_counted_as_exact():
+    # Las mismas palabras en otro orden tienen los mismos n-gramas: la
+    # coincidencia aproximada puntúa 1.0 aunque la clave no sea exacta
+    base_df = pd.DataFrame({"title": ["Backend Developer", "Developer Backend", "Chef"]})
+
+    enriched_df, report = enrichement.enrich_data(
+        base_df, sources=["salary_ranges.csv"], source_frames={"salary_ranges.csv": SALARIES},
+    )
+
+    info = report["sources"]["salary_ranges.csv"]
+    assert info["matched_records"] == 2
+    assert info["fuzzy_matches"] == 1
+    assert enriched_df["salary_match_score"].tolist()[:2] == [1.0, 1.0]
+    assert "(1 exactos, 1 aproximados)" in report["operations"][0]
@@ -0,0 +1,236 @@
+"""Ingesta contra un API local (``http.server``) que sirve páginas fijas.
+
+El servidor imita la paginación de Arbeitnow (``links.next``, ofertas más
+recientes primero) y puede responder errores transitorios en páginas
+concretas para probar los reintentos con backoff de ``create_session``.
+"""
+import json
+import sqlite3
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import ingesta
+
+PAGE_SIZE = 10
+FIRST_CREATED_AT = 1_700_000_000
+
+
+def make_jobs(count, newest=FIRST_CREATED_AT, prefix="job"):
+    """Ofertas ordenadas de la más reciente a la más antigua, como el API"""
+    return [
+        {
+            "title": f"Data Engineer {i}",
+            "company_name": f"Company {i % 7}",
+            "location": "Berlin",
+            "remote": bool(i % 2),
+            "url": f"https://www.arbeitnow.com/jobs/{prefix}-{i}",
+            "created_at": newest - i * 60,
+        }
+        for i in range(count)
+    ]
+
+
+class StubAPI:
+    """API paginado en un hilo; ``failures[page]`` lista los códigos a devolver antes del 200"""
+
+    def __init__(self, jobs, page_size=PAGE_SIZE):
+        self.jobs = jobs
+        self.page_size = page_size
+        self.failures = {}
+        self.requests = Counter()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = int(parse_qs(urlparse(self.path).query).get("page", ["1"])[0])
+                api.requests[page] += 1
+                pending = api.failures.get(page)
+                if pending:
+                    self._send(pending.pop(0), {"message": "error transitorio"})
+                else:
+                    self._send(200, api.page(page))
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/job-board-api"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def page(self, number):
+        start = (number - 1) * self.page_size
+        has_next = start + self.page_size < len(self.jobs)
+        return {
+            "data": self.jobs[start:start + self.page_size],
+            "links": {"next": f"{self.url}?page={number + 1}" if has_next else None},
+        }
+
+    @property
+    def pages_requested(self):
+        return sorted(self.requests)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Base de datos de ingesta vacía en ``tmp_path``"""
+    monkeypatch.setattr(ingesta, "DB_PATH", tmp_path / "ingestion.db")
+    ingesta.create_database()
+    return ingesta.DB_PATH
+
+
+def fetch_all(sql, params=()):
+    conn = sqlite3.connect(ingesta.DB_PATH)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def ingest(api, incremental=True, max_retries=3):
+    session = ingesta.create_session(max_retries=max_retries, backoff_factor=0.01)
+    try:
+        return ingesta.ingest_from_api(api.url, session=session, incremental=incremental)
+    finally:
+        session.close()
+
+
+def stored_urls():
+    return {row[0] for row in fetch_all("SELECT url FROM jobs")}
+
+
+def test_follows_links_next_across_all_pages(db_path):
+    jobs = make_jobs(35)
+    with StubAPI(jobs) as api:
+        stats = ingest(api)
+
+    assert api.pages_requested == [1, 2, 3, 4]
+    assert stats == {"received": 35, "inserted": 35, "updated": 0, "unchanged": 0}
+    assert stored_urls() == {job["url"] for job in jobs}
+    assert ingesta.get_high_water_mark() == FIRST_CREATED_AT
+
+
+def test_incremental_run_stops_at_high_water_mark(db_path):
+    old_jobs = make_jobs(30)
+    with StubAPI(old_jobs) as api:
+        ingest(api)
+
+    # Doce ofertas nuevas por delante: la página 2 aún mezcla nuevas y
+    # antiguas; la 3 es anterior a la marca de agua y detiene el recorrido
+    new_jobs = make_jobs(12, newest=FIRST_CREATED_AT + 12 * 60, prefix="new")
+    with StubAPI(new_jobs + old_jobs) as api:
+        stats = ingest(api)
+
+    assert api.pages_requested == [1, 2, 3]
+    assert stats["inserted"] == 12
+    assert stats["unchanged"] == 18
+    assert len(stored_urls()) == 42
+    assert ingesta.get_high_water_mark() == FIRST_CREATED_AT + 12 * 60
+
+
+def test_full_run_walks_past_high_water_mark(db_path):
+    jobs = make_jobs(30)
+    with StubAPI(jobs) as api:
+        ingest(api)
+
+    jobs[25]["title"] = "Senior Data Engineer"
+    with StubAPI(jobs) as api:
+        stats = ingest(api, incremental=False)
+
+    assert api.pages_requested == [1, 2, 3]
+    assert stats["updated"] == 1
+    title = fetch_all("SELECT title FROM jobs WHERE url = ?", (jobs[25]["url"],))[0][0]
+    assert title == "Senior Data Engineer"
+
+
+def test_retries_rate_limit_and_server_errors(db_path):
+    jobs = make_jobs(25)
+    with StubAPI(jobs) as api:
+        api.failures = {2: [429, 503], 3: [500]}
+        stats = ingest(api)
+
+    assert api.requests == {1: 1, 2: 3, 3: 2}
+    assert stats["inserted"] == 25
+    assert stored_urls() == {job["url"] for job in jobs}
+
+
+def test_writer_error_on_final_batch_is_raised(db_path):
+    # Cinco ofertas caben en el último lote parcial, que se escribe después
+    # de recibir el fin de la cola; la ubicación nula viola NOT NULL
+    jobs = make_jobs(5)
+    jobs[3]["location"] = None
+    outcome = {}
+
+    def run():
+        try:
+            ingest(api)
+        except Exception as e:
+            outcome["error"] = e
+
+    with StubAPI(jobs) as api:
+        caller = threading.Thread(target=run, daemon=True)
+        caller.start()
+        caller.join(timeout=30)
+
+    assert not caller.is_alive(), "ingest_from_api quedó bloqueado esperando al escritor"
+    assert isinstance(outcome.get("error"), sqlite3.IntegrityError)
+    assert ingesta.get_high_water_mark() is None
+
+
+def test_failed_walk_keeps_previous_high_water_mark(db_path):
+    jobs = make_jobs(30)
+    with StubAPI(jobs) as api:
+        api.failures = {2: [503] * 10}
+        with pytest.raises(Exception, match="503"):
+            ingest(api, max_retries=2)
+
+    # La página 1 quedó escrita, pero sin marca de agua: la siguiente
+    # ejecución vuelve a recorrer las páginas que faltaron
+    assert len(stored_urls()) == PAGE_SIZE
+    assert ingesta.get_high_water_mark() is None
+
+    with StubAPI(jobs) as api:
+        stats = ingest(api)
+    assert api.pages_requested == [1, 2, 3]
+    assert stats["inserted"] == 20
+    assert ingesta.get_high_water_mark() == FIRST_CREATED_AT
+
+
+def test_audit_compares_inserted_with_table_growth(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingesta, "AUDIT_PATH", tmp_path / "ingestion.txt")
+    with StubAPI(make_jobs(20)) as api:
+        ingest(api)
+    jobs = make_jobs(30)
+    stored_before = ingesta.count_jobs()
+    with StubAPI(jobs) as api:
+        stats = ingest(api, incremental=False)
+
+    ingesta.generate_audit_file(stats, stored_before)
+    report = ingesta.AUDIT_PATH.read_text(encoding="utf-8")
+    assert "Registros insertados: 10\n" in report
+    assert "Comparación de integridad: OK" in report
+
+    # Una oferta que falta en la tabla ya no cuadra con los insertados contados
+    with sqlite3.connect(ingesta.DB_PATH) as conn:
+        conn.execute("DELETE FROM jobs WHERE url = ?", (jobs[0]["url"],))
+    ingesta.generate_audit_file(stats, stored_before)
+    assert "Comparación de integridad: ERROR" in ingesta.AUDIT_PATH.read_text(encoding="utf-8")
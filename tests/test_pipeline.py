@@ -0,0 +1,111 @@
+"""Ejecuciones seguidas de ``pipeline.py`` sobre una base de ingesta real.
+
+Las de ``--changed-only`` son procesos aparte, como en el uso real: la base
+usa WAL y el archivo ``-wal`` desaparece al cerrar el proceso, así que las
+firmas de entrada no pueden depender de los archivos de la base. Las de
+``--incremental`` corren en el mismo proceso para contar las cargas de las
+fuentes de referencia.
+"""
+import os
+import shutil
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+import cleaning
+import enrichement
+import incremental
+import ingesta
+import pipeline
+import storage
+from conftest import ROOT
+
+UNCHANGED_MESSAGE = "Entradas sin cambios"
+
+
+def make_jobs(first, count):
+    return [
+        {
+            "title": f"Data Engineer {i % 5}",
+            "company_name": f"Company {i % 7}",
+            "location": "Berlin",
+            "remote": bool(i % 2),
+            "url": f"https://www.arbeitnow.com/jobs/job-{i}",
+            "created_at": 1_700_000_000 - i * 60,
+        }
+        for i in range(first, first + count)
+    ]
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    """Carpeta de datos con reglas, fuentes de referencia y una base con 50 ofertas"""
+    static_dir = tmp_path / "static"
+    for name in ("config", "data_sources"):
+        shutil.copytree(ROOT / "src" / "static" / name, static_dir / name)
+    (static_dir / "db").mkdir()
+    storage.close_connections()
+    monkeypatch.setattr(ingesta, "DB_PATH", static_dir / "db" / "ingestion.db")
+    ingesta.create_database()
+    ingesta.insert_data_into_db(make_jobs(0, 50))
+    storage.close_connections()
+    return static_dir
+
+
+def run_changed_only(static_dir):
+    """Lanza ``pipeline.py run --skip-ingest --changed-only`` y devuelve su log"""
+    log_dir = static_dir.parent / "logs"
+    log_dir.mkdir(exist_ok=True)
+    (log_dir / "pipeline.log").unlink(missing_ok=True)
+    env = dict(os.environ, BIGDATA_STATIC_DIR=str(static_dir), BIGDATA_LOG_DIR=str(log_dir))
+    env.pop("BIGDATA_DB_PATH", None)
+    subprocess.run(
+        [sys.executable, str(ROOT / "src" / "pipeline.py"), "run", "--skip-ingest",
+         "--changed-only", "--no-cache"],
+        env=env, check=True, capture_output=True, timeout=300,
+    )
+    return (log_dir / "pipeline.log").read_text(encoding="utf-8")
+
+
+def test_changed_only_skips_second_run_until_jobs_change(static_dir):
+    assert UNCHANGED_MESSAGE not in run_changed_only(static_dir)
+    assert UNCHANGED_MESSAGE in run_changed_only(static_dir)
+
+    ingesta.insert_data_into_db(make_jobs(50, 5))
+    storage.close_connections()
+    assert UNCHANGED_MESSAGE not in run_changed_only(static_dir)
+
+
+@pytest.fixture
+def counted_loads(static_dir, monkeypatch):
+    """Etapas apuntadas a ``static_dir`` y cargas de cada fuente de referencia contadas"""
+    monkeypatch.setattr(cleaning, "DB_PATH", ingesta.DB_PATH)
+    monkeypatch.setattr(enrichement, "DATA_SOURCES_DIR", static_dir / "data_sources")
+    loads = Counter()
+
+    def counted(source, loader):
+        def load():
+            loads[source] += 1
+            return loader()
+        return load
+
+    monkeypatch.setattr(enrichement, "ENRICHMENT_SOURCES", {
+        source: (counted(source, loader), *rest)
+        for source, (loader, *rest) in enrichement.ENRICHMENT_SOURCES.items()
+    })
+    incremental.reset_parts()
+    yield loads
+    incremental.reset_parts()
+    storage.close_connections()
+
+
+def test_incremental_run_without_new_jobs_skips_reference_sources(counted_loads):
+    results = pipeline.run(skip_ingest=True, incremental_mode=True, use_cache=False)
+    assert len(results["enrich"]) > 0
+    assert set(counted_loads.values()) == {1}
+
+    results = pipeline.run(skip_ingest=True, incremental_mode=True, use_cache=False)
+    assert results["enrich"] is None
+    assert set(counted_loads.values()) == {1}